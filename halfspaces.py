@@ -0,0 +1,300 @@
+# --- START OF FILE halfspaces.py ---
+"""Headless entry point: python -m halfspaces build --leagues ... --seasons ... --workers N,
+python -m halfspaces ingest --league ... --season ... --csv new_events.csv,
+python -m halfspaces convert [legacy league files],
+python -m halfspaces compare-engines --league ... --season ...,
+python -m halfspaces serve --port 8502
+and python -m halfspaces export --format parquet --min-90s 10"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import halfspaces_percentiles
+import halfspaces_pipeline
+import halfspaces_profile
+import halfspaces_store
+import halfspaces_warehouse
+import halfspaces_zones
+from halfspaces_pipeline import EVENTS_PATH
+
+logger = logging.getLogger("halfspaces")
+
+TABLE_FORMATS = ('parquet', 'csv')
+ZONES_HELP = ("Zone registry: 'halfspaces', 'standard', or a JSON file of custom zones added to the standard ones "
+              "(default: $HALFSPACES_ZONES or halfspaces)")
+
+
+def _entry_name(league: str, season) -> str:
+    return os.path.basename(halfspaces_store.entry_dir(league, season))
+
+
+def _write_table(df, path_without_ext: str, table_format: str) -> str:
+    path = f"{path_without_ext}.{table_format}"
+    if table_format == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    return path
+
+
+def _write_plots(combined_prog_df, indexes, plot_dir: str, min_90s: float, plot_format: str, plot_dpi: int):
+    import halfspaces_plot # Plotting stack is only imported when plots are requested
+
+    os.makedirs(plot_dir, exist_ok=True)
+    players = combined_prog_df[(combined_prog_df['90s'] >= min_90s) & (combined_prog_df['prog_HS_actions'] > 0)]
+    for _, player_data in players.iterrows():
+        image = halfspaces_plot.plot_player_halfspace_actions(
+            player_data, player_data['playerId'], *indexes, "All Half-Space Actions",
+            dpi=plot_dpi, fmt=plot_format
+        )
+        safe_team = "".join(ch if ch.isalnum() else "_" for ch in str(player_data['team']))
+        with open(os.path.join(plot_dir, f"{player_data['playerId']:.0f}_{safe_team}.{plot_format}"), "wb") as f:
+            f.write(image)
+    return len(players)
+
+
+def build_league(league: str, seasons, out_dir: str, data_path: str = EVENTS_PATH,
+                 store_dir: str = halfspaces_store.STORE_DIR, force: bool = False, table_format: str = 'parquet',
+                 plots: bool = False, min_90s: float = 0.0, plot_format: str = 'png', plot_dpi: int = 150,
+                 profile: bool = False, engine: str = None, zones: str = None):
+    """Builds (or loads from the store) every season of one league and writes its tables; runs in a worker.
+
+    zones is a halfspaces_zones.load_registry spec, so it can be sent to a worker process.
+    """
+    registry = halfspaces_zones.load_registry(zones)
+    written = []
+    for season in seasons:
+        started = time.perf_counter()
+        with halfspaces_profile.profiling(halfspaces_profile.Profile() if profile else None) as season_profile:
+            built = _build_season(league, season, out_dir, data_path, store_dir, force, table_format,
+                                  plots, min_90s, plot_format, plot_dpi, engine, registry)
+        if season_profile is not None:
+            _write_profile(season_profile, league, season, out_dir)
+        if built is None:
+            continue
+        table_path, n_players, n_plots = built
+        logger.info("%s %s: %d players, %d plots in %.1fs -> %s", league, season, n_players,
+                    n_plots, time.perf_counter() - started, table_path)
+        written.append((league, season, table_path))
+    return written
+
+
+def _build_season(league: str, season, out_dir: str, data_path: str, store_dir: str, force: bool,
+                  table_format: str, plots: bool, min_90s: float, plot_format: str, plot_dpi: int, engine: str = None,
+                  registry=None):
+    """Writes one league/season's table (and plots); returns (table_path, players, plots) or None without events."""
+    fingerprint = halfspaces_pipeline.tables_fingerprint(league, season, data_path, registry=registry)
+    if force:
+        halfspaces_store.remove_entry(league, season, store_dir,
+                                      (halfspaces_pipeline.ZONES if registry is None else registry).signature())
+    teams, frames = halfspaces_pipeline.load_halfspace_tables(data_path, league, season, fingerprint, store_dir,
+                                                              engine=engine, registry=registry)
+    if frames is None:
+        logger.warning("%s %s: no event data, skipped", league, season)
+        return None
+
+    combined_prog_df = frames[0]
+    name = _entry_name(league, season)
+    table_path = _write_table(combined_prog_df, os.path.join(out_dir, "tables", name), table_format)
+    n_plots = 0
+    if plots:
+        with halfspaces_profile.span('plots'):
+            n_plots = _write_plots(combined_prog_df, frames[1:], os.path.join(out_dir, "plots", name),
+                                   min_90s, plot_format, plot_dpi)
+    return table_path, len(combined_prog_df), n_plots
+
+
+def _write_profile(profile, league: str, season, out_dir: str) -> str:
+    """Logs the stage records of one league/season and writes them to <out_dir>/profile/<entry>.json."""
+    profile.log(prefix=f"{league} {season} | ")
+    path = os.path.join(out_dir, "profile", f"{_entry_name(league, season)}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(profile.to_json(league=league, season=season))
+    return path
+
+
+def _combine_tables(written, out_dir: str, table_format: str, distributions=None):
+    """Concatenates the per-league tables of each season into one file per season.
+
+    distributions maps a season to its cross-league percentile pools, looked up into the combined table.
+    """
+    by_season = {}
+    for league, season, path in written:
+        df = pd.read_csv(path) if table_format == 'csv' else pd.read_parquet(path)
+        # Categorical columns differ per league; plain strings concatenate cleanly
+        df = df.astype({col: str for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+        by_season.setdefault(season, []).append(df.assign(league=league, season=season))
+    paths = []
+    for season, frames in sorted(by_season.items()):
+        combined = pd.concat(frames, ignore_index=True)
+        if distributions and season in distributions:
+            combined = halfspaces_percentiles.lookup_percentiles(combined, distributions[season])
+        paths.append(_write_table(combined, os.path.join(out_dir, f"halfspaces_{season}"), table_format))
+        logger.info("Season %s: %d leagues, %d players -> %s", season, len(frames), len(combined), paths[-1])
+    return paths
+
+
+def build(leagues=None, seasons=None, workers: int = 1, out_dir: str = "output", data_path: str = EVENTS_PATH,
+          **options):
+    """Builds all requested leagues, one league per worker process, then writes the combined tables."""
+    available = halfspaces_pipeline.league_seasons(data_path)
+    leagues = leagues or list(available)
+    unknown = [league for league in leagues if league not in available]
+    if unknown:
+        raise ValueError(f"Unknown leagues {unknown}. Choose from {list(available)}.")
+    # Each league builds only the requested seasons it actually has partitions for
+    league_seasons = {league: [season for season in available[league] if not seasons or season in seasons]
+                      for league in leagues}
+    os.makedirs(os.path.join(out_dir, "tables"), exist_ok=True)
+
+    written = []
+    if workers <= 1:
+        for league in leagues:
+            try:
+                written += build_league(league, league_seasons[league], out_dir, data_path, **options)
+            except Exception:
+                logger.exception("%s: build failed", league)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(build_league, league, league_seasons[league], out_dir, data_path, **options): league
+                       for league in leagues}
+            for future in as_completed(futures):
+                try:
+                    written += future.result()
+                except Exception:
+                    logger.exception("%s: build failed", futures[future])
+    # Cross-league pools and the similarity index need every league's table, so they are built here once the workers are done
+    store_dir = options.get('store_dir', halfspaces_store.STORE_DIR)
+    registry = halfspaces_zones.load_registry(options.get('zones'))
+    distributions = {}
+    for season in sorted({season for _, season, _ in written}):
+        entries = halfspaces_pipeline.current_entries(data_path, season, store_dir, registry)
+        distributions[season] = halfspaces_pipeline.cross_league_distribution(season, entries, store_dir)
+        players = len(halfspaces_pipeline.similarity_index(season, entries, store_dir))
+        logger.info("Season %s: cross-league percentiles and similarity index (%d players) over %d leagues",
+                    season, players, len(entries))
+    return _combine_tables(written, out_dir, options.get('table_format', 'parquet'), distributions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m halfspaces", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Compute half-space tables for leagues/seasons")
+    build_parser.add_argument("--leagues", nargs="*", help="Leagues to build (default: every league in the warehouse)")
+    build_parser.add_argument("--seasons", nargs="*", type=int, help="Internal season values, e.g. 2425 (default: all)")
+    build_parser.add_argument("--workers", type=int,
+                              help="Worker processes, one league each (default: one per core, or 1 with the "
+                                   "polars engine, which already uses every core for a league)")
+    build_parser.add_argument("--out-dir", default="output")
+    build_parser.add_argument("--events-path", default=EVENTS_PATH, help="Event warehouse (local path or fsspec URL)")
+    build_parser.add_argument("--store-dir", default=halfspaces_store.STORE_DIR)
+    build_parser.add_argument("--force", action="store_true", help="Rebuild even if the stored tables are current")
+    build_parser.add_argument("--table-format", choices=TABLE_FORMATS, default="parquet")
+    build_parser.add_argument("--plots", action="store_true", help="Also render every player's half-space plot")
+    build_parser.add_argument("--min-90s", type=float, default=0.0, help="Minimum 90s played for plotted players")
+    build_parser.add_argument("--plot-format", choices=("png", "webp", "svg"), default="png")
+    build_parser.add_argument("--plot-dpi", type=int, default=150)
+    build_parser.add_argument("--profile", action="store_true",
+                              help="Log per-stage timings and write them to <out-dir>/profile/<league_season>.json")
+    build_parser.add_argument("--engine", choices=halfspaces_pipeline.ENGINES, default=halfspaces_pipeline.ENGINE,
+                              help="Engine computing tables from raw events (default: $HALFSPACES_ENGINE or pandas)")
+    build_parser.add_argument("--zones", default=os.environ.get("HALFSPACES_ZONES"), help=ZONES_HELP)
+
+    ingest_parser = commands.add_parser("ingest", help="Append new games from an event CSV and update the stored tables")
+    ingest_parser.add_argument("--league", required=True, help="League name as in the events' 'league' column")
+    ingest_parser.add_argument("--season", required=True, type=int, help="Internal season value, e.g. 2425")
+    ingest_parser.add_argument("--csv", required=True, help="Event CSV (may repeat games that are already stored)")
+    ingest_parser.add_argument("--mins-csv", help="Refreshed minutes CSV to install alongside")
+    ingest_parser.add_argument("--events-path", default=EVENTS_PATH)
+    ingest_parser.add_argument("--store-dir", default=halfspaces_store.STORE_DIR)
+    ingest_parser.add_argument("--zones", default=os.environ.get("HALFSPACES_ZONES"), help=ZONES_HELP)
+
+    convert_parser = commands.add_parser("convert", help="Copy monolithic league Parquet files into the warehouse")
+    convert_parser.add_argument("files", nargs="*", help="Parquet files (default: the legacy per-league files)")
+    convert_parser.add_argument("--events-path", default=EVENTS_PATH)
+
+    compare_parser = commands.add_parser("compare-engines",
+                                         help="Check that the pandas and polars engines give identical tables")
+    compare_parser.add_argument("--league", required=True)
+    compare_parser.add_argument("--season", required=True, type=int, help="Internal season value, e.g. 2425")
+    compare_parser.add_argument("--events-path", default=EVENTS_PATH)
+    compare_parser.add_argument("--zones", default=os.environ.get("HALFSPACES_ZONES"), help=ZONES_HELP)
+
+    serve_parser = commands.add_parser("serve", help="Serve the precomputed tables as a local JSON API")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8502)
+    serve_parser.add_argument("--workers", type=int, default=8, help="Threads answering requests")
+    serve_parser.add_argument("--keep-alive", type=float, default=5.0,
+                              help="Seconds before an idle connection is closed and its thread freed")
+    serve_parser.add_argument("--events-path", default=EVENTS_PATH)
+    serve_parser.add_argument("--store-dir", default=halfspaces_store.STORE_DIR)
+    serve_parser.add_argument("--zones", default=os.environ.get("HALFSPACES_ZONES"), help=ZONES_HELP)
+
+    export_parser = commands.add_parser("export", help="Write filtered player tables and their actions, per season")
+    export_parser.add_argument("--leagues", nargs="*", help="Leagues to export (default: every league in the warehouse)")
+    export_parser.add_argument("--seasons", nargs="*", type=int, help="Internal season values, e.g. 2425 (default: all)")
+    export_parser.add_argument("--teams", nargs="*", help="Only players of these teams (default: every team)")
+    export_parser.add_argument("--min-90s", type=float, default=0.0)
+    export_parser.add_argument("--format", choices=("parquet", "arrow", "csv"), default="parquet")
+    export_parser.add_argument("--out-dir", default="exports")
+    export_parser.add_argument("--events-path", default=EVENTS_PATH)
+    export_parser.add_argument("--store-dir", default=halfspaces_store.STORE_DIR)
+    export_parser.add_argument("--zones", default=os.environ.get("HALFSPACES_ZONES"), help=ZONES_HELP)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "build":
+        workers = args.workers or (1 if args.engine == 'polars' else os.cpu_count() or 1)
+        build(args.leagues, args.seasons, workers=max(1, min(workers, len(args.leagues or halfspaces_pipeline.league_seasons(args.events_path)))),
+              out_dir=args.out_dir, data_path=args.events_path, store_dir=args.store_dir, force=args.force, table_format=args.table_format,
+              plots=args.plots, min_90s=args.min_90s, plot_format=args.plot_format, plot_dpi=args.plot_dpi,
+              profile=args.profile, engine=args.engine, zones=args.zones)
+    elif args.command == "ingest":
+        import halfspaces_ingest
+
+        events = pd.read_csv(args.csv)
+        halfspaces_ingest.ingest_games(args.events_path, args.league, args.season, events,
+                                       mins_csv=args.mins_csv, store_dir=args.store_dir,
+                                       registry=halfspaces_zones.load_registry(args.zones))
+    elif args.command == "convert":
+        for file in halfspaces_warehouse.migrate_files(args.files, args.events_path):
+            logger.info("Converted %s into %s", file, args.events_path)
+    elif args.command == "compare-engines":
+        import halfspaces_polars
+
+        differences = halfspaces_polars.compare_engines(args.events_path, args.league, args.season,
+                                                        halfspaces_zones.load_registry(args.zones))
+        for difference in differences:
+            logger.error("%s %s: %s", args.league, args.season, difference)
+        if differences:
+            return 1
+        logger.info("%s %s: pandas and polars engines give identical tables", args.league, args.season)
+    elif args.command == "serve":
+        import halfspaces_serve
+
+        halfspaces_serve.serve(args.host, args.port, workers=args.workers, data_path=args.events_path,
+                               store_dir=args.store_dir, registry=halfspaces_zones.load_registry(args.zones),
+                               keep_alive=args.keep_alive)
+    elif args.command == "export":
+        import halfspaces_export
+
+        for path in halfspaces_export.export_seasons(args.out_dir, args.leagues, args.seasons, args.teams, args.min_90s,
+                                                     args.format, data_path=args.events_path, store_dir=args.store_dir,
+                                                     registry=halfspaces_zones.load_registry(args.zones)):
+            logger.info("Exported %s", path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE halfspaces.py ---
@@ -2,517 +2,242 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from mplsoccer import Pitch
-import io
-import base64
-import fsspec
-import pyarrow.dataset as ds # Needed for load_data_filtered
-import pyarrow as pa       # Potentially needed
-import gc                  # For garbage collection
-import gdown
+import os
+import halfspaces_cache
+import halfspaces_export
+import halfspaces_heatmaps
+import halfspaces_percentiles
+import halfspaces_pipeline
+import halfspaces_plot
+import halfspaces_profile
+import halfspaces_warehouse
+from halfspaces_pipeline import (
+    EVENTS_PATH, MINS_CSV_PATH,
+    filter_results, league_seasons, load_halfspace_tables, tables_fingerprint
+)
+from halfspaces_percentiles import ALL_LEAGUES_PCT_SUFFIX, PCT_SUFFIX, RANK_SUFFIX
+
+SIMILAR_PLAYERS = 10
+COMPARE_MAX_PLAYERS = 12
+COMPARE_COLUMNS = 4
+PLOT_VIEWS = ["Action lines", "Start-location heatmap", "End-location heatmap"]
 
 # --- Function Definitions ---
+# The title font is registered by halfspaces_plot when the plotting stack is first imported
 
-try:
-    font_path = Path(__file__).parent / "fonts" / "Arial Rounded Bold.ttf"
-    if font_path.exists():
-        fm.fontManager.addfont(str(font_path))
-        font_prop = fm.FontProperties(fname=str(font_path))
-        mpl.rcParams['font.family'] = font_prop.get_name()
-    else:
-        print("Font file not found, using default font")
-except Exception as e:
-    print(f"Font loading error: {e}")
-
-@st.cache_data(show_spinner="Loading data...", max_entries=5)
-def load_data_filtered(data_path: str, league: str, season_internal: str, columns=None):
-    """Loads data filtered by league and season directly from the source."""
-    # Use season_internal which should match the Parquet data format (e.g., '2324')
-    # file_id = "1tKjuZ-bDM7NYe-C8hWmIcCNkdqqt8Hfp"
-    # url = f"https://drive.google.com/uc?export=download&id={file_id}"
+@halfspaces_profile.stage('plot')
+@halfspaces_cache.memoize(lambda a: None if a['tables_key'] is None else
+                          (a['tables_key'], a['player_id'], a['player_data'].get('team'), a['action_type'],
+                           a['fmt'], a['dpi']))
+def plot_player_halfspace_actions(player_data, player_id, prog_rhs_passes, prog_lhs_passes,
+                                   prog_rhs_carries, prog_lhs_carries, action_type, tables_key=None,
+                                   fmt=halfspaces_plot.DEFAULT_FORMAT, dpi=halfspaces_plot.DEFAULT_DPI):
+    """Generates the pitch plot for a selected player and returns the raw image bytes."""
+    return halfspaces_plot.plot_player_halfspace_actions(
+        player_data, player_id, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries,
+        action_type, dpi=dpi, fmt=fmt
+    )
 
-    try:
-        # output = "Top_5_Leagues_23_24.parquet"
-        # gdown.download(url, output, quiet=False)
 
-        df = pd.read_parquet(data_path, columns=columns)
-        df = df[(df["league"] == league) & (df["season"] == season_internal)]
+def show_image(container, plot_data):
+    if halfspaces_plot.DEFAULT_FORMAT == 'svg':
+        plot_data = plot_data.decode() # st.image takes SVG as markup
+    container.image(plot_data)
 
-        return df
 
-    except Exception as e:
-        st.error(f"Failed to load data from Google Drive: {e}")
-        return pd.DataFrame()
-
-@st.cache_data
-def add_carries(_game_df):
-    """Adds Carry events based on consecutive actions."""
-    if _game_df.empty:
-        return _game_df # Return immediately if input is empty
-
-    game_df = _game_df.copy()
-    # Ensure required columns exist before proceeding
-    required_cols = ['minute', 'second', 'gameId', 'teamId', 'endX', 'endY', 'x', 'y', 'period', 'playerId', 'team', 'player', 'expandedMinute']
-    if not all(col in game_df.columns for col in required_cols):
-        st.error("Cannot add carries: Input data is missing required columns.")
-        return _game_df # Return original data
-
-    game_df['time_seconds'] = game_df['minute']*60+game_df['second']
-    next_actions = game_df.shift(-1)
-
-    same_game = game_df.gameId == next_actions.gameId
-    same_team = game_df.teamId == next_actions.teamId
-    dx = game_df.endX - next_actions.x
-    dy = game_df.endY - next_actions.y
-    far_enough = (dx**2 + dy**2) >= 0.0**2
-    not_too_far = (dx**2 + dy**2) <= 100.0**2
-    dt = next_actions.time_seconds - game_df.time_seconds
-    same_phase = dt < 20.0
-    same_period = game_df.period == next_actions.period
-
-    dribble_idx = same_team & far_enough & not_too_far & same_phase & same_period & same_game
-    valid_dribble_idx = dribble_idx.fillna(False)
-
-    if not valid_dribble_idx.any():
-         return game_df # No carries found
-
-    prev = game_df.loc[valid_dribble_idx] # Use .loc for boolean indexing safety
-    nex = next_actions.loc[valid_dribble_idx]
-
-    if nex.empty:
-        return game_df
-
-    dribbles = pd.DataFrame({
-        'gameId': nex['gameId'].values,
-        'period': nex['period'].values,
-        'expandedMinute': nex['expandedMinute'].values,
-        'passKey': False,
-        'assist': False,
-        'isTouch': True,
-        'playerId': nex['playerId'].values,
-        'team': nex['team'].values,
-        'player': nex['player'].values,
-        'time_seconds': (prev['time_seconds'].values + nex['time_seconds'].values) / 2,
-        'teamId': nex['teamId'].values,
-        'x': prev['endX'].values,
-        'y': prev['endY'].values,
-        'endX': nex['x'].values,
-        'endY': nex['y'].values,
-        'type': 'Carry',
-        'outcomeType': 'Successful'
-    })
-
-    game_df_with_carries = pd.concat([game_df, dribbles], ignore_index=True, sort=False)
-    # Drop temporary time_seconds if not needed later, or recalculate minute/second
-    # For sorting, time_seconds is reliable
-    game_df_with_carries = game_df_with_carries.sort_values(
-        ['gameId', 'period', 'time_seconds']
-    ).reset_index(drop=True)
-    # Optional: Re-calculate minute/second from time_seconds if needed downstream
-    # game_df_with_carries['minute'] = (game_df_with_carries['time_seconds'] // 60).astype(int)
-    # game_df_with_carries['second'] = (game_df_with_carries['time_seconds'] % 60).astype(int)
-    game_df_with_carries['action_id'] = game_df_with_carries.index # Simpler action_id
-
-    return game_df_with_carries
-
-@st.cache_data
-def prepare_data(data):
-    """Scales coordinates and identifies half-space actions."""
-    if data.empty:
-        return pd.DataFrame(), pd.DataFrame() # Return empty dfs
-
-    data = data.copy()
-    # Check for coordinate columns
-    coord_cols = ['x', 'y', 'endX', 'endY']
-    if not all(col in data.columns for col in coord_cols):
-        st.error("Cannot prepare data: Coordinate columns (x, y, endX, endY) missing.")
-        return pd.DataFrame(), pd.DataFrame()
-
-    data['x'] = data['x']*1.2
-    data['y'] = data['y']*.8
-    data['endX'] = data['endX']*1.2
-    data['endY'] = data['endY']*.8
-
-    left_halfspace_x_min, left_halfspace_x_max = 60, 102
-    left_halfspace_y_min, left_halfspace_y_max = 50, 62
-    right_halfspace_x_min, right_halfspace_x_max = 60, 102
-    right_halfspace_y_min, right_halfspace_y_max = 18, 30
-
-    data_carries = data[data['type'] == 'Carry'].copy()
-    data_passes = data[(data['type'] == 'Pass') & (data['outcomeType'] == 'Successful')].copy()
-
-    # Flag actions IN half-spaces
-    for df in [data_passes, data_carries]:
-        if not df.empty:
-            df['in_rhs'] = (df['x'].between(right_halfspace_x_min, right_halfspace_x_max) &
-                            df['y'].between(right_halfspace_y_min, right_halfspace_y_max))
-            df['in_lhs'] = (df['x'].between(left_halfspace_x_min, left_halfspace_x_max) &
-                            df['y'].between(left_halfspace_y_min, left_halfspace_y_max))
-            # Initialize 'into' columns as False - keep if needed, remove otherwise
-            df['into_rhs'] = False
-            df['into_lhs'] = False
-
-    return data_passes, data_carries
-
-@st.cache_data
-def calculate_progressive_actions(df):
-    """Identifies progressive actions based on distance to goal center."""
-    if df.empty or not all(col in df.columns for col in ['x', 'y', 'endX', 'endY']):
-        return pd.DataFrame()
-
-    df_prog = df.copy()
-    goal_x, goal_y = 120, 40
-
-    df_prog['beginning'] = np.sqrt(np.square(goal_x - df_prog['x']) + np.square(goal_y - df_prog['y']))
-    df_prog['end'] = np.sqrt(np.square(goal_x - df_prog['endX']) + np.square(goal_y - df_prog['endY']))
-
-    # Calculate progression ratio safely
-    df_prog['progressive'] = np.where(
-        (df_prog['beginning'].notna()) & (df_prog['beginning'] > 1), # Avoid division by zero/small numbers
-        (df_prog['end'] / df_prog['beginning']) < 0.75,
-        False
-    )
-    # Consider adding other progressive criteria if needed (e.g., end in opp half)
-    # df_prog['progressive'] = df_prog['progressive'] & (df_prog['endX'] >= 60)
-
-    return df_prog[df_prog['progressive']].copy()
-
-
-@st.cache_data
-def process_halfspace_data(data_passes, data_carries, mins_data):
-    """Groups actions, merges, and calculates p90 stats."""
-    # --- Calculate Progressive Actions ---
-    prog_rhs_passes = calculate_progressive_actions(data_passes[data_passes['in_rhs']])
-    prog_lhs_passes = calculate_progressive_actions(data_passes[data_passes['in_lhs']])
-    prog_rhs_carries = calculate_progressive_actions(data_carries[data_carries['in_rhs']])
-    prog_lhs_carries = calculate_progressive_actions(data_carries[data_carries['in_lhs']])
-
-    # --- Group by Player ---
-    group_cols = ['playerId', 'player', 'team']
-    def safe_group(df, name):
-        # Check if grouping columns exist before grouping
-        if df.empty or not all(col in df.columns for col in group_cols):
-             return pd.DataFrame(columns=group_cols + [name])
-        try:
-            return df.groupby(group_cols).size().reset_index(name=name)
-        except KeyError as e:
-             st.warning(f"Grouping error for '{name}': Missing column {e}. Returning empty group.")
-             return pd.DataFrame(columns=group_cols + [name])
-
-    prog_rhs_passes_grouped = safe_group(prog_rhs_passes, 'prog_rhs_passes')
-    prog_lhs_passes_grouped = safe_group(prog_lhs_passes, 'prog_lhs_passes')
-    prog_rhs_carries_grouped = safe_group(prog_rhs_carries, 'prog_rhs_carries')
-    prog_lhs_carries_grouped = safe_group(prog_lhs_carries, 'prog_lhs_carries')
-
-    # --- Merge Grouped Data (Targeted fillna) ---
-    def merge_and_fill_counts(df1, df2, on_cols, count_cols_df1, count_cols_df2):
-        # Check keys exist before merge
-        valid_merge = True
-        for df in [df1, df2]:
-            if not all(col in df.columns for col in on_cols):
-                valid_merge = False
-                break
-        if not valid_merge:
-             st.warning(f"Cannot merge: Missing key columns {on_cols} in one of the dataframes.")
-             # Decide how to handle: return df1? return empty? Here we return df1 for partial result.
-             # Ensure df1 has the expected count columns, filled with 0 if they should exist
-             for col in count_cols_df1:
-                 if col not in df1.columns: df1[col] = 0
-             return df1
+def plot_comparison(players, indexes, action_type, tables_key, tiles, dpi=halfspaces_plot.DISPLAY_DPI):
+    """Fills one tile per player row: cached plots at once, the rest from the render pool as each finishes.
 
-        try:
-            merged_df = pd.merge(df1, df2, on=on_cols, how='outer')
-        except Exception as merge_error:
-             st.error(f"Error during merge: {merge_error}")
-             # Return df1 as fallback, ensure its count cols exist
-             for col in count_cols_df1:
-                 if col not in df1.columns: df1[col] = 0
-             return df1
-
-        all_count_cols = count_cols_df1 + count_cols_df2
-        for col in all_count_cols:
-            if col not in merged_df.columns:
-                merged_df[col] = 0
-            else:
-                 if pd.api.types.is_numeric_dtype(merged_df[col]):
-                    # Ensure NaNs introduced by outer merge are filled
-                    merged_df[col] = merged_df[col].fillna(0).astype(int)
-                 # else: # Column not numeric, do not fill with 0
-                     # This case shouldn't happen for count columns if grouping was correct
-        return merged_df
-
-    # Merge RHS
-    rhs_count_cols_p = ['prog_rhs_passes']
-    rhs_count_cols_c = ['prog_rhs_carries']
-    prog_result_df_rhs = merge_and_fill_counts(prog_rhs_passes_grouped, prog_rhs_carries_grouped, group_cols, rhs_count_cols_p, rhs_count_cols_c)
-    if 'prog_rhs_passes' not in prog_result_df_rhs: prog_result_df_rhs['prog_rhs_passes'] = 0 # Ensure columns exist after potential failed merge
-    if 'prog_rhs_carries' not in prog_result_df_rhs: prog_result_df_rhs['prog_rhs_carries'] = 0
-    prog_result_df_rhs['prog_rhs_actions'] = prog_result_df_rhs['prog_rhs_passes'] + prog_result_df_rhs['prog_rhs_carries']
-
-    # Merge LHS
-    lhs_count_cols_p = ['prog_lhs_passes']
-    lhs_count_cols_c = ['prog_lhs_carries']
-    prog_result_df_lhs = merge_and_fill_counts(prog_lhs_passes_grouped, prog_lhs_carries_grouped, group_cols, lhs_count_cols_p, lhs_count_cols_c)
-    if 'prog_lhs_passes' not in prog_result_df_lhs: prog_result_df_lhs['prog_lhs_passes'] = 0
-    if 'prog_lhs_carries' not in prog_result_df_lhs: prog_result_df_lhs['prog_lhs_carries'] = 0
-    prog_result_df_lhs['prog_lhs_actions'] = prog_result_df_lhs['prog_lhs_passes'] + prog_result_df_lhs['prog_lhs_carries']
-
-    # Combine RHS and LHS
-    rhs_action_cols = ['prog_rhs_passes', 'prog_rhs_carries', 'prog_rhs_actions']
-    lhs_action_cols = ['prog_lhs_passes', 'prog_lhs_carries', 'prog_lhs_actions']
-    combined_prog_df = merge_and_fill_counts(prog_result_df_rhs, prog_result_df_lhs, group_cols, rhs_action_cols, lhs_action_cols)
-    if 'prog_rhs_actions' not in combined_prog_df: combined_prog_df['prog_rhs_actions'] = 0
-    if 'prog_lhs_actions' not in combined_prog_df: combined_prog_df['prog_lhs_actions'] = 0
-    combined_prog_df['prog_HS_actions'] = combined_prog_df['prog_rhs_actions'] + combined_prog_df['prog_lhs_actions']
-
-    # --- Merge with Minutes Data ---
-    # Initialize p90 cols to avoid errors if merge fails or mins_data is bad
-    combined_prog_df['90s'] = np.nan
-    combined_prog_df['position'] = 'Unknown'
-    combined_prog_df['prog_act_HS_p90'] = 0.0
-    combined_prog_df['prog_rhs_act_p90'] = 0.0
-    combined_prog_df['prog_lhs_act_p90'] = 0.0
-
-    if not mins_data.empty:
-        mins_cols_to_merge = ['player', 'team', '90s', 'position']
-        if all(col in mins_data.columns for col in mins_cols_to_merge):
-             try:
-                # Use a temporary df for merge to avoid modifying original combined_prog_df inplace yet
-                merged_with_mins = pd.merge(
-                    combined_prog_df[group_cols + rhs_action_cols + lhs_action_cols + ['prog_HS_actions']], # Select only needed cols
-                    mins_data[mins_cols_to_merge],
-                    on=['player', 'team'],
-                    how='left'
-                )
-                # Assign back columns that were successfully merged
-                combined_prog_df['90s'] = merged_with_mins['90s']
-                combined_prog_df['position'] = merged_with_mins['position']
-
-                # --- Calculate p90 Metrics --- (Only if merge succeeded and 90s exist)
-                if '90s' in combined_prog_df.columns and combined_prog_df['90s'].notna().any():
-                    combined_prog_df['prog_act_HS_p90'] = (combined_prog_df['prog_HS_actions'] / combined_prog_df['90s']).replace([np.inf, -np.inf], np.nan).fillna(0)
-                    combined_prog_df['prog_rhs_act_p90'] = (combined_prog_df['prog_rhs_actions'] / combined_prog_df['90s']).replace([np.inf, -np.inf], np.nan).fillna(0)
-                    combined_prog_df['prog_lhs_act_p90'] = (combined_prog_df['prog_lhs_actions'] / combined_prog_df['90s']).replace([np.inf, -np.inf], np.nan).fillna(0)
-
-             except Exception as merge_error:
-                 st.warning(f"Could not merge with minutes data: {merge_error}. p90 stats will be zero.")
+    Plots share plot_player_halfspace_actions' cache, so a player already viewed (or compared) is not redrawn.
+    """
+    cache = plot_player_halfspace_actions.cache
+    jobs, keys = {}, {}
+    for i, (tile, (_, player_data)) in enumerate(zip(tiles, players.iterrows())):
+        player_id = player_data['playerId']
+        keys[i] = plot_player_halfspace_actions.cache_key(player_data, player_id, *indexes, action_type,
+                                                          tables_key=tables_key, dpi=dpi)
+        plot_data = cache.get(keys[i]) if keys[i] is not None else None
+        if plot_data is not None:
+            show_image(tile, plot_data)
         else:
-            missing_mins_cols = [col for col in mins_cols_to_merge if col not in mins_data.columns]
-            st.warning(f"Minutes data missing columns: {missing_mins_cols}. Cannot calculate p90 stats.")
+            tile.caption(f"Rendering {player_data['player']}...")
+            jobs[i] = halfspaces_plot.player_plot_args(player_data, player_id, *indexes, action_type)
+    for i, plot_data in halfspaces_plot.render_many(jobs, dpi=dpi):
+        if keys[i] is not None:
+            cache.put(keys[i], plot_data)
+        show_image(tiles[i], plot_data)
+
+
+def show_comparison(players_df, indexes, action_type, tables_key):
+    """Small-multiples grid of several players' plots, picked by hand or as one team's top players."""
+    pick = st.radio("Compare", ["Selected players", "Team top players"], horizontal=True)
+    if pick == "Selected players":
+        labels = players_df['player'].astype(str) + " (" + players_df['team'].astype(str) + ")"
+        chosen = st.multiselect("Players", list(players_df.index), default=list(players_df.index[:4]),
+                                format_func=labels.get, max_selections=COMPARE_MAX_PLAYERS)
+        players = players_df.loc[chosen]
     else:
-        st.warning("Minutes data is empty. Cannot calculate p90 stats.")
-
-
-    # --- Final Filtering & Cleanup ---
-    if 'position' in combined_prog_df.columns:
-        # Ensure position column is not all NaN before filtering
-        if combined_prog_df['position'].notna().any():
-             combined_prog_df = combined_prog_df[combined_prog_df['position'] != 'GK'].copy()
-
-    # Drop duplicates based on most reliable key available
-    if 'playerId' in combined_prog_df.columns and combined_prog_df['playerId'].notna().any():
-         combined_prog_df = combined_prog_df.drop_duplicates(subset=['playerId'], keep='first')
-    elif all(col in combined_prog_df.columns for col in ['player', 'team']):
-         combined_prog_df = combined_prog_df.drop_duplicates(subset=['player', 'team'], keep='first')
-
-    return combined_prog_df, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries
-
-@st.cache_data
-def plot_player_halfspace_actions(player_data, player_id, prog_rhs_passes, prog_lhs_passes,
-                                   prog_rhs_carries, prog_lhs_carries, action_type):
-    """Generates the pitch plot for a selected player - REVERTED APPEARANCE."""
-    fig, ax = plt.subplots(figsize=(15, 10), facecolor='#1e1e1e')
-
-    pitch = Pitch(pitch_type='statsbomb', pitch_color='#1e1e1e', line_color='#FFFFFF', line_zorder=2)
-    pitch.draw(ax=ax)
-    ax.invert_yaxis() # StatsBomb pitch vertical orientation
-
-    # Watermark - REVERTED
-    ax.text(60, 78, '@pranav_m28', fontsize=17, color='white', alpha=0.75, ha='center', va='center', zorder=1)
-
-    # Filter actions for the specific player ID
-    player_prog_rhs_passes = prog_rhs_passes[prog_rhs_passes['playerId'] == player_id]
-    player_prog_lhs_passes = prog_lhs_passes[prog_lhs_passes['playerId'] == player_id]
-    player_prog_rhs_carries = prog_rhs_carries[prog_rhs_carries['playerId'] == player_id]
-    player_prog_lhs_carries = prog_lhs_carries[prog_lhs_carries['playerId'] == player_id]
-
-    pass_color = '#24a8ff'
-    carry_color = '#FF5959'
-
-    # Plot based on selected action type
-    if action_type == "Right Half-Space Actions":
-        pitch.lines(player_prog_rhs_passes.x, player_prog_rhs_passes.y, player_prog_rhs_passes.endX, player_prog_rhs_passes.endY,
-                    lw=3, transparent=True, comet=True, color=pass_color, ax=ax, alpha=1)
-        pitch.scatter(player_prog_rhs_passes.endX, player_prog_rhs_passes.endY, s=40, c=pass_color, edgecolors='none', ax=ax, zorder=2, alpha=1)
-        pitch.lines(player_prog_rhs_carries.x, player_prog_rhs_carries.y, player_prog_rhs_carries.endX, player_prog_rhs_carries.endY,
-                    ls='dashed', lw=3, color=carry_color, ax=ax)
-        pitch.scatter(player_prog_rhs_carries.endX, player_prog_rhs_carries.endY, s=40, c=carry_color, edgecolors='none', ax=ax, alpha=1)
-        # Title - REVERTED
-        title_text = f'{player_data["player"]} - Right Half-Space Progressive Actions\nRight Half-Space Actions p90: {player_data["prog_rhs_act_p90"]:.2f}'
-
-    elif action_type == "Left Half-Space Actions":
-        pitch.lines(player_prog_lhs_passes.x, player_prog_lhs_passes.y, player_prog_lhs_passes.endX, player_prog_lhs_passes.endY,
-                    lw=3, transparent=True, comet=True, color=pass_color, ax=ax, alpha=1)
-        pitch.scatter(player_prog_lhs_passes.endX, player_prog_lhs_passes.endY, s=40, c=pass_color, edgecolors='none', ax=ax, zorder=2, alpha=1)
-        pitch.lines(player_prog_lhs_carries.x, player_prog_lhs_carries.y, player_prog_lhs_carries.endX, player_prog_lhs_carries.endY,
-                    ls='dashed', lw=3, color=carry_color, ax=ax)
-        pitch.scatter(player_prog_lhs_carries.endX, player_prog_lhs_carries.endY, s=40, c=carry_color, edgecolors='none', ax=ax, alpha=1)
-        # Title - REVERTED
-        title_text = f'{player_data["player"]} - Left Half-Space Progressive Actions\nLeft Half-Space Actions p90: {player_data["prog_lhs_act_p90"]:.2f}'
-
-    else: # "All Half-Space Actions"
-        # Plot RHS
-        pitch.lines(player_prog_rhs_passes.x, player_prog_rhs_passes.y, player_prog_rhs_passes.endX, player_prog_rhs_passes.endY,
-                    lw=3, transparent=True, comet=True, color=pass_color, ax=ax, alpha=1)
-        pitch.scatter(player_prog_rhs_passes.endX, player_prog_rhs_passes.endY, s=40, c=pass_color, edgecolors='none', ax=ax, zorder=2, alpha=1)
-        pitch.lines(player_prog_rhs_carries.x, player_prog_rhs_carries.y, player_prog_rhs_carries.endX, player_prog_rhs_carries.endY,
-                    ls='dashed', lw=3, color=carry_color, ax=ax)
-        pitch.scatter(player_prog_rhs_carries.endX, player_prog_rhs_carries.endY, s=40, c=carry_color, edgecolors='none', ax=ax, alpha=1)
-        # Plot LHS
-        pitch.lines(player_prog_lhs_passes.x, player_prog_lhs_passes.y, player_prog_lhs_passes.endX, player_prog_lhs_passes.endY,
-                    lw=3, transparent=True, comet=True, color=pass_color, ax=ax, alpha=1)
-        pitch.scatter(player_prog_lhs_passes.endX, player_prog_lhs_passes.endY, s=40, c=pass_color, edgecolors='none', ax=ax, zorder=2, alpha=1)
-        pitch.lines(player_prog_lhs_carries.x, player_prog_lhs_carries.y, player_prog_lhs_carries.endX, player_prog_lhs_carries.endY,
-                    ls='dashed', lw=3, color=carry_color, ax=ax)
-        pitch.scatter(player_prog_lhs_carries.endX, player_prog_lhs_carries.endY, s=40, c=carry_color, edgecolors='none', ax=ax, alpha=1)
-        # Title - REVERTED
-        title_text = f'{player_data["player"]} - Half-Space Progressive Actions\nTotal Half-Space Actions p90: {player_data["prog_act_HS_p90"]:.2f}'
-
-    # Apply title using Axes method for better control - REVERTED POSITIONING similar to original
-    ax.set_title(title_text, font='Arial Rounded MT Bold', fontsize=24, color='white', fontweight='bold', pad=20) # Use pad for spacing
-    ax.text(48, 84, 'Progressive Carries', font='Arial Rounded MT Bold', fontsize=16, color=carry_color, ha='center', va='center', fontweight='bold')
-    ax.text(74, 84, 'Progressive Passes', font='Arial Rounded MT Bold', fontsize=16, color=pass_color, ha='center', va='center', fontweight='bold')
-    # Save plot to buffer
-    buffer = io.BytesIO()
-    plt.tight_layout() # Adjust layout automatically
-    plt.savefig(buffer, format='png', facecolor='#1e1e1e', edgecolor='none', dpi=300)
-    buffer.seek(0)
-    plot_data = base64.b64encode(buffer.read()).decode()
-    plt.close(fig)
-
-    return plot_data
+        team = st.selectbox("Team", sorted(players_df['team'].astype(str).unique()))
+        top_k = st.slider("Top players by half-space actions p90", 2, COMPARE_MAX_PLAYERS, 8)
+        players = players_df[players_df['team'].astype(str) == team].nlargest(top_k, 'prog_act_HS_p90')
+    if players.empty:
+        st.info("Select at least one player to compare.")
+        return
+
+    # Tiles are laid out row by row and filled in whatever order the renders finish
+    columns = st.columns(COMPARE_COLUMNS)
+    tiles = [columns[i % COMPARE_COLUMNS].empty() for i in range(len(players))]
+    try:
+        with halfspaces_profile.span('compare_plots', rows_in=len(players)):
+            plot_comparison(players, indexes, action_type, tables_key, tiles)
+    except Exception as plot_error:
+        st.error(f"Could not generate the comparison plots: {plot_error}")
+
+
+def show_export(players_df, indexes, league, season):
+    """Download buttons for the filtered table and its players' actions; files are written on click."""
+    with st.expander("Export"):
+        fmt = st.selectbox("Format", halfspaces_export.EXPORT_FORMATS)
+        name = f"{league}_{season}".replace(" ", "_")
+        left, right = st.columns(2)
+        # Callables, so the (batch-by-batch) files are only built when a button is pressed
+        left.download_button(
+            "Player table", lambda: halfspaces_export.to_bytes(
+                halfspaces_export.table_batches(players_df, league=league, season=season), fmt),
+            file_name=f"players_{name}.{fmt}", mime=halfspaces_export.MIME_TYPES[fmt], on_click="ignore")
+        right.download_button(
+            "Progressive actions", lambda: halfspaces_export.to_bytes(
+                halfspaces_export.index_action_batches(indexes, players_df, league=league, season=season), fmt),
+            file_name=f"actions_{name}.{fmt}", mime=halfspaces_export.MIME_TYPES[fmt], on_click="ignore")
+
+
+def show_debug_panel(profile):
+    """Sidebar table of this rerun's pipeline stages, plus the same records as a JSON download."""
+    with st.sidebar.expander("Debug: pipeline stages", expanded=True):
+        stages = profile.to_frame()
+        if stages.empty:
+            st.caption("No pipeline stages ran on this rerun.")
+            return
+        stages['stage'] = ["\u2003" * depth + name for name, depth in zip(stages['stage'], stages['depth'])]
+        st.dataframe(stages.drop(columns='depth'), hide_index=True, use_container_width=True)
+        cache = halfspaces_cache.PIPELINE_CACHE
+        st.caption(f"Memory cache: {len(cache)} entries, {cache.current_bytes / 2**20:.0f} MB, "
+                   f"{cache.hits} hits / {cache.misses} misses since start")
+        st.download_button("Download stages (JSON)", profile.to_json(), file_name="halfspaces_profile.json",
+                           mime="application/json")
+
+
+@halfspaces_profile.stage('heatmap')
+@halfspaces_cache.memoize(lambda a: (a['tables_key'], a['scope'], a['player_id'], a['team'], a['action_type'],
+                                     a['end'], a['fmt'], a['dpi']))
+def plot_heatmap(grids, scope, player_id, team, label, action_type, end, tables_key,
+                 fmt=halfspaces_plot.DEFAULT_FORMAT, dpi=halfspaces_plot.DEFAULT_DPI):
+    """Renders the start/end location heatmap of a player, their team or the league from the cached grids."""
+    layers = halfspaces_heatmaps.ACTION_TYPE_LAYERS[action_type]
+    if scope == "Player":
+        grid = grids.player(player_id, team, layers, end)
+    elif scope == "Team":
+        grid = grids.team(team, layers, end)
+    else:
+        grid = grids.league(layers, end)
+    title = f"{label} - {action_type}\nProgressive action {end} locations: {int(grid.sum())}"
+    return halfspaces_plot.render_heatmap(title, grid, dpi=dpi, fmt=fmt)
 
 
 # --- Main Application Logic ---
 def main():
+    # Pipeline errors/warnings go to the page rather than the log
+    halfspaces_pipeline.set_reporter(lambda level, message: getattr(st, level)(message))
     st.set_page_config(page_title="Half-Spaces Progressive Actions", layout="wide")
 
-    # --- Configuration ---
-    mins_csv_path = "T5_League_Mins_2025.csv"
-    required_event_columns = [
-        "league", "season", "gameId", "period", "minute", "second", "expandedMinute",
-        "type", "outcomeType", "teamId", "team", "playerId", "player",
-        "x", "y", "endX", "endY"
-    ]
-    # League and Season Definitions
-    leagues = ['ESP-La Liga', 'ENG-Premier League', 'ITA-Serie A', 'GER-Bundesliga', 'FRA-Ligue 1'] # Match Parquet 'league' column
-    # Season Mapping: Display Value -> Internal Value (for loading)
-    season_mapping = {
-        "2024/2025": 2425,
-        # Add more seasons here if needed, e.g., "2022/2023": "2223"
-    }
-    season_display_options = list(season_mapping.keys())
+    # Open the app with ?debug=1 (or set HALFSPACES_DEBUG=1) to time every pipeline stage of each rerun
+    debug = st.query_params.get("debug", os.environ.get("HALFSPACES_DEBUG", "0")) not in ("", "0")
+    profile = halfspaces_profile.Profile() if debug else None
+    try:
+        with halfspaces_profile.profiling(profile):
+            show_page()
+    finally:
+        if profile is not None:
+            show_debug_panel(profile)
 
 
+def show_page():
+    # Page chrome first, so a cold start shows something before any data is touched
     st.title("Top 5 Leagues Half-Spaces Progressive Actions")
     st.sidebar.header("Filters")
 
-    # --- Sidebar Widgets ---
-    # Season Selection with Mapping
-    selected_season_display = st.sidebar.selectbox("Select Season", season_display_options)
-    selected_season_internal = season_mapping[selected_season_display] # Get internal value for loading
+    # --- Configuration ---
+    # Leagues and seasons are whatever partitions the warehouse holds
+    available = league_seasons(EVENTS_PATH)
+    if not available:
+        st.error(f"No event data found in '{EVENTS_PATH}'. Convert the league files into the warehouse first.")
+        st.stop()
+    season_display_options = sorted({season for seasons in available.values() for season in seasons}, reverse=True)
 
-    selected_league = st.sidebar.selectbox("Select League", leagues)
+    # The default selection's tables and the plotting stack load in the background (once per process)
+    # while the sidebar renders; a later rerun of the same league only waits for what is left
+    default_league = next(league for league, seasons in available.items() if season_display_options[0] in seasons)
+    halfspaces_pipeline.start_warm_up(EVENTS_PATH, default_league, season_display_options[0],
+                                      then=halfspaces_plot.preload)
 
-    # --- Cache Clearing Logic ---
-    if 'previous_league' not in st.session_state:
-        st.session_state.previous_league = selected_league # Initialize
-        st.session_state.previous_season = selected_season_internal # Also track season changes
+    # --- Sidebar Widgets ---
+    # Season Selection with Mapping
+    selected_season_internal = st.sidebar.selectbox("Select Season", season_display_options,
+                                                    format_func=halfspaces_warehouse.season_label)
 
-    # Clear if EITHER league OR season changes
-    if (selected_league != st.session_state.previous_league or
-        selected_season_internal != st.session_state.previous_season):
-        # st.warning(f"Filters changed. Clearing processing caches...") # Simplified message
-        try:
-            add_carries.clear()
-            prepare_data.clear()
-            calculate_progressive_actions.clear()
-            process_halfspace_data.clear()
-            plot_player_halfspace_actions.clear()
-            # No success message needed, warning implies action
-        except Exception as e:
-            st.error(f"Error clearing caches: {e}") # Keep error for debugging
-        # Update session state
-        st.session_state.previous_league = selected_league
-        st.session_state.previous_season = selected_season_internal
-    # --- End Cache Clearing ---
+    selected_league = st.sidebar.selectbox(
+        "Select League", [league for league, seasons in available.items() if selected_season_internal in seasons])
 
     # --- Data Loading ---
-    leagues_to_file = {
-        'ESP-La Liga': 'La_Liga_24_25.parquet',
-        'ENG-Premier League': 'Premier_League_2425.parquet',
-        'ITA-Serie A': 'Serie_A_2425.parquet',
-        'GER-Bundesliga': 'Bundesliga_2425.parquet',
-        'FRA-Ligue 1': 'Ligue_1_2425.parquet'
-    }
-    
-    hf_url = leagues_to_file[selected_league] # Get the file name for the selected league
+    data_path = EVENTS_PATH
+
+    # Precomputed tables are keyed by the league/season partition + minutes CSV, so edits to either trigger a rebuild
+    try:
+        fingerprint = tables_fingerprint(selected_league, selected_season_internal, data_path)
+    except Exception as e:
+        st.error(f"Failed to access event data for {selected_league}: {e}")
+        st.stop()
 
     # Pass the INTERNAL season value to the loading function
-    data = load_data_filtered(hf_url, selected_league, selected_season_internal, columns=required_event_columns)
-    if data.empty:
+    # Everything downstream is memoized on small keys (league, season, fingerprint, player, ...),
+    # so switching back to a league seen earlier is served from memory
+    # The minutes CSV is only read when the tables have to be rebuilt
+    with st.spinner("Loading half-space tables..."):
+        halfspaces_pipeline.wait_for_warm_up(data_path, selected_league, selected_season_internal)
+        try:
+            league_teams, frames = load_halfspace_tables(data_path, selected_league, selected_season_internal, fingerprint)
+        except FileNotFoundError:
+            st.error(f"CRITICAL ERROR: Minutes data file not found at '{MINS_CSV_PATH}'. Place the file correctly.")
+            st.stop()
+        except Exception as e:
+            st.error(f"CRITICAL ERROR loading half-space tables: {e}")
+            st.stop()
+    tables_key = (selected_league, selected_season_internal, fingerprint)
+    if frames is None:
         # Warning was shown in load_data_filtered, maybe add specific guidance
         st.info("No event data found for the selected filters. Try different selections.")
         st.stop() # Stop if essential data is missing
-
-    # Load Minutes Data
-    try:
-        mins_data_full = pd.read_csv(mins_csv_path)
-        # Essential preprocessing
-        if 'Mins' not in mins_data_full.columns or 'player' not in mins_data_full.columns or 'team' not in mins_data_full.columns:
-             st.error("Minutes data file is missing required columns ('Mins', 'player', 'team'). Cannot proceed.")
-             st.stop()
-        if '90s' not in mins_data_full.columns:
-            mins_data_full['90s'] = mins_data_full['Mins'] / 90.0
-        if 'position' not in mins_data_full.columns:
-            mins_data_full['position'] = 'Unknown'
-    except FileNotFoundError:
-        st.error(f"CRITICAL ERROR: Minutes data file not found at '{mins_csv_path}'. Place the file correctly.")
-        st.stop()
-    except Exception as e:
-        st.error(f"CRITICAL ERROR loading or processing minutes data: {e}")
-        st.stop()
+    combined_prog_df, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries = frames
 
     # --- Team Selection ---
-    league_teams = sorted(data['team'].unique()) if not data.empty else []
     selected_teams = st.sidebar.multiselect("Select Teams", league_teams, default=league_teams)
     if not selected_teams:
         st.warning("No teams selected. Please select at least one team.")
         st.stop() # Stop if no teams are selected
 
     # --- Filter by Team ---
-    filtered_data = data[data['team'].isin(selected_teams)].copy()
-    filtered_mins_data = mins_data_full[mins_data_full['team'].isin(selected_teams)].copy()
-
-    # --- Memory Management ---
-    del data, mins_data_full
-    gc.collect()
-
-    # --- Check Filtered Data ---
-    if filtered_data.empty:
-         st.warning("No event data found for the selected teams after filtering.")
-         st.stop() # Stop if no data to process
-    # No need to stop if mins data is empty, process_halfspace_data handles it
+    # Tables are computed for the whole league, so team selection is applied in filter_results below;
+    # the slider default comes from the 90s already joined onto the table
+    team_90s = combined_prog_df.loc[combined_prog_df['team'].isin(selected_teams), '90s'] \
+        if '90s' in combined_prog_df.columns else pd.Series(dtype=float)
 
     # --- Minimum 90s Slider - CORRECTED MAX VALUE ---
     min_90s_value = 0.0
     max_90s_value = 38.0 # Set fixed maximum based on league games
     default_90s_value = 15.0
     # Adjust default if max available is lower than 15
-    if not filtered_mins_data.empty:
-         max_available = filtered_mins_data['90s'].max()
+    if team_90s.notna().any():
+         max_available = team_90s.max()
          if max_available < default_90s_value:
              default_90s_value = max(min_90s_value, max_available) # Ensure default is not negative
 
@@ -524,25 +249,10 @@ def main():
         step=0.5
     )
 
-    # --- Core Data Processing Pipeline ---
-    # No user info messages needed here, runs fairly quickly now
-    filtered_data_with_carries = add_carries(filtered_data)
-    del filtered_data; gc.collect()
-
-    data_passes, data_carries = prepare_data(filtered_data_with_carries)
-    del filtered_data_with_carries; gc.collect()
-
-    combined_prog_df, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries = process_halfspace_data(
-        data_passes, data_carries, filtered_mins_data
-    )
-    del data_passes, data_carries, filtered_mins_data; gc.collect()
-
     # --- Final Filtering (Post-Processing) ---
+    # Cheap filters over the 90s-sorted table; the league pipeline is not rerun
     if not combined_prog_df.empty:
-        final_df = combined_prog_df[
-            (combined_prog_df['90s'] >= selected_90s) &
-            (combined_prog_df['90s'].notna())
-        ].copy()
+        final_df = filter_results(combined_prog_df, selected_teams, selected_90s, league_teams)
     else:
         final_df = pd.DataFrame()
 
@@ -558,7 +268,14 @@ def main():
         }
         sort_col = sort_col_map.get(action_type, "prog_act_HS_p90")
 
-        display_columns = ['player', 'team', 'position', '90s', 'prog_act_HS_p90', 'prog_rhs_act_p90', 'prog_lhs_act_p90']
+        # League percentiles/ranks are stored with the table; cross-league ones are looked up against the
+        # pools of every league already built for this season (from stored tables, never the events)
+        entries = halfspaces_pipeline.current_entries(data_path, selected_season_internal)
+        final_df = halfspaces_percentiles.lookup_percentiles(
+            final_df, halfspaces_pipeline.cross_league_distribution(selected_season_internal, entries))
+
+        display_columns = ['player', 'team', 'position', '90s', 'prog_act_HS_p90', 'prog_rhs_act_p90', 'prog_lhs_act_p90',
+                           sort_col + PCT_SUFFIX, sort_col + RANK_SUFFIX, sort_col + ALL_LEAGUES_PCT_SUFFIX]
         display_columns = [col for col in display_columns if col in final_df.columns] # Ensure cols exist
 
         # Check if sort column exists before sorting
@@ -569,32 +286,63 @@ def main():
             sorted_df = final_df # Display unsorted
 
         st.dataframe(sorted_df[display_columns].round(2), use_container_width=True)
+        st.caption(f"Percentiles and ranks are by position group among players with at least "
+                   f"{halfspaces_percentiles.PERCENTILE_MIN_90S:g} 90s and a progressive half-space action; '{ALL_LEAGUES_PCT_SUFFIX}' compares "
+                   f"against {len(entries)} league(s) with precomputed tables for this season.")
+        indexes = (prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries)
+        show_export(sorted_df, indexes, selected_league, selected_season_internal)
 
         # --- Player Visualization ---
         st.subheader("Player Actions Visualization")
-        player_list = sorted_df['player'].unique()
-        if len(player_list) > 0:
-            selected_player = st.selectbox("Select a Player for Visualization", player_list)
-
-            if selected_player:
-                # Find the row for the selected player in the sorted DataFrame
-                player_data_row = sorted_df[sorted_df['player'] == selected_player]
+        # One option per table row, so a player who changed clubs mid-season is listed once per club
+        player_labels = sorted_df['player'].astype(str) + " (" + sorted_df['team'].astype(str) + ")"
+        if len(sorted_df) > 1 and st.toggle("Compare players"):
+            show_comparison(sorted_df, indexes, action_type, tables_key)
+        elif len(sorted_df) > 0:
+            selected_row = st.selectbox("Select a Player for Visualization", list(sorted_df.index),
+                                        format_func=player_labels.get)
+
+            if selected_row is not None:
+                # Find the selected (player, team) row in the sorted DataFrame
+                player_data_row = sorted_df.loc[[selected_row]]
                 if not player_data_row.empty:
                     player_data = player_data_row.iloc[0]
+                    selected_player = player_data['player']
                     player_id = player_data.get('playerId', None) # Safely get playerId
 
                     if player_id is not None:
+                        # Heatmaps sum the stored per-player grids; only the line view slices individual actions
+                        view = st.radio("View", PLOT_VIEWS, horizontal=True)
+                        scope = st.radio("Heatmap of", ["Player", "Team", "League"], horizontal=True) \
+                            if view != PLOT_VIEWS[0] else "Player"
                         # Generate and display plot
                         try:
-                            plot_data = plot_player_halfspace_actions(
-                                player_data, player_id,
-                                prog_rhs_passes, prog_lhs_passes,
-                                prog_rhs_carries, prog_lhs_carries,
-                                action_type
-                            )
-                            st.image(f"data:image/png;base64,{plot_data}")
+                            if view == PLOT_VIEWS[0]:
+                                plot_data = plot_player_halfspace_actions(
+                                    player_data, player_id, *indexes,
+                                    action_type, tables_key=tables_key, dpi=halfspaces_plot.DISPLAY_DPI
+                                )
+                            else:
+                                label = {"Player": selected_player, "Team": player_data['team'], "League": selected_league}[scope]
+                                grids = halfspaces_pipeline.load_heatmaps(data_path, selected_league, selected_season_internal, fingerprint)
+                                plot_data = plot_heatmap(grids, scope, player_id, player_data['team'], label, action_type,
+                                                         'start' if view == PLOT_VIEWS[1] else 'end', tables_key,
+                                                         dpi=halfspaces_plot.DISPLAY_DPI)
+                            with halfspaces_profile.span('render'):
+                                show_image(st, plot_data)
                         except Exception as plot_error:
                              st.error(f"Could not generate plot for {selected_player}: {plot_error}")
+
+                        # --- Similar Players --- (nearest neighbours over every league built for the season)
+                        st.subheader(f"Players Similar to {selected_player}")
+                        similar = halfspaces_pipeline.similarity_index(selected_season_internal, entries).query(
+                            selected_league, player_id, player_data['team'], k=SIMILAR_PLAYERS)
+                        if similar.empty:
+                            st.info(f"{selected_player} has too few 90s for a reliable similarity profile.")
+                        else:
+                            st.dataframe(similar[[col for col in ['player', 'team', 'league', 'position', '90s', 'distance']
+                                                  if col in similar.columns]].round(2),
+                                         hide_index=True, use_container_width=True)
                     else:
                         st.error(f"Player ID not found for {selected_player}. Cannot generate plot.")
                 # else: No need for error here, selectbox handles selection
@@ -0,0 +1,198 @@
+# --- START OF FILE halfspaces_bench.py ---
+"""Pipeline benchmarks on synthetic events: python halfspaces_bench.py [--sizes ...] [--baseline FILE]
+
+Times and memory-profiles each pipeline stage per data size, writes the results as JSON and exits
+non-zero when a stage regressed against the stored baseline.
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import halfspaces_index
+import halfspaces_pipeline
+import halfspaces_schema
+import halfspaces_synthetic
+
+# name -> generate_events arguments; events_per_game is set separately
+SIZES = {
+    'team': dict(leagues=1, seasons=1, club=0), # One club's 38 fixtures
+    'league': dict(leagues=1, seasons=1),
+    'five_leagues': dict(leagues=5, seasons=1),
+    'five_leagues_3_seasons': dict(leagues=5, seasons=3),
+}
+DEFAULT_SIZES = ['team', 'league']
+PLOTS_PER_RUN = 5
+
+BASELINE_PATH = "bench_baseline.json"
+RESULTS_PATH = "bench_results.json"
+
+
+def _stage_functions(events, mins_data, plot: bool):
+    """Returns [(stage, fn)] where each fn consumes the previous stage's output."""
+    def plot_top_players(tables):
+        import halfspaces_plot # Only imported when plots are benchmarked
+
+        combined_prog_df, *frames = tables
+        indexes = [halfspaces_index.PlayerIndex(frame) for frame in frames]
+        top = combined_prog_df.nlargest(PLOTS_PER_RUN, 'prog_HS_actions')
+        for _, player_data in top.iterrows():
+            halfspaces_plot.plot_player_halfspace_actions(player_data, player_data['playerId'], *indexes,
+                                                           "All Half-Space Actions", dpi=halfspaces_plot.DISPLAY_DPI)
+        return tables
+
+    stages = [
+        ('add_carries', lambda _: halfspaces_pipeline.add_carries(events)),
+        ('prepare_data', halfspaces_pipeline.prepare_data),
+        ('count_zone_actions', halfspaces_pipeline.count_zone_actions),
+        ('attach_minutes', lambda counts: (halfspaces_pipeline.attach_minutes(counts[0], mins_data), *counts[1:])),
+    ]
+    if plot:
+        stages.append(('plot', plot_top_players))
+    return stages
+
+
+def _run_stages(stages, repeat: int):
+    """Best-of-repeat wall time of each stage (run on the previous stage's result)."""
+    timings, value = {}, None
+    for stage, fn in stages:
+        best = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            result = fn(value)
+            best = min(best, time.perf_counter() - started)
+        timings[stage] = best
+        value = result
+    return timings
+
+
+def _peak_memory(stages):
+    """Peak Python/NumPy allocation of each stage, traced in a separate pass (tracing slows the timings)."""
+    peaks, value = {}, None
+    for stage, fn in stages:
+        gc.collect()
+        tracemalloc.start()
+        value = fn(value)
+        peaks[stage] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return peaks
+
+
+def run_size(size: str, events_per_game: int = 1600, repeat: int = 3, plot: bool = True, seed: int = 0):
+    """Benchmarks every stage for one data size; returns one result record per stage."""
+    events = halfspaces_schema.compact_events(
+        halfspaces_synthetic.generate_events(events_per_game=events_per_game, seed=seed, **SIZES[size]))
+    mins_data = halfspaces_synthetic.generate_minutes(events, seed=seed)
+    stages = _stage_functions(events, mins_data, plot)
+    timings = _run_stages(stages, repeat)
+    peaks = _peak_memory(stages)
+    return [{'size': size, 'stage': stage, 'events': len(events), 'seconds': round(timings[stage], 5),
+             'peak_mb': round(peaks[stage], 2)} for stage, _ in stages]
+
+
+def run(sizes=None, events_per_game: int = 1600, repeat: int = 3, plot: bool = True, seed: int = 0):
+    """Benchmarks all sizes and returns the results document."""
+    results = []
+    for size in sizes or DEFAULT_SIZES:
+        results += run_size(size, events_per_game, repeat, plot, seed)
+    return {
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'events_per_game': events_per_game,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, time_tolerance: float = 0.3, memory_tolerance: float = 0.2,
+            min_seconds: float = 0.02):
+    """Rows where a (size, stage) got slower or heavier than the baseline by more than the tolerance.
+
+    Stages faster than min_seconds in both runs are too noisy to compare on time.
+    """
+    previous = {(row['size'], row['stage']): row for row in baseline['results']}
+    regressions = []
+    for row in results['results']:
+        base = previous.get((row['size'], row['stage']))
+        if base is None or base.get('events') != row['events']:
+            continue # Not comparable: new stage or different data size
+        slower = (row['seconds'] > base['seconds'] * (1 + time_tolerance)
+                  and max(row['seconds'], base['seconds']) >= min_seconds)
+        heavier = row['peak_mb'] > base['peak_mb'] * (1 + memory_tolerance) and row['peak_mb'] - base['peak_mb'] >= 1
+        if slower or heavier:
+            regressions.append({**row, 'baseline_seconds': base['seconds'], 'baseline_peak_mb': base['peak_mb']})
+    return regressions
+
+
+def format_results(results, baseline=None) -> str:
+    """Plain-text table of the results, with the change against the baseline when there is one."""
+    previous = {(row['size'], row['stage']): row for row in (baseline or {}).get('results', [])}
+    lines = [f"{'size':<24}{'stage':<20}{'events':>10}{'seconds':>10}{'peak MB':>10}{'vs base':>10}"]
+    for row in results['results']:
+        base = previous.get((row['size'], row['stage']))
+        change = f"{row['seconds'] / base['seconds'] - 1:+.0%}" if base and base['seconds'] else ""
+        lines.append(f"{row['size']:<24}{row['stage']:<20}{row['events']:>10}{row['seconds']:>10.3f}"
+                     f"{row['peak_mb']:>10.1f}{change:>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python halfspaces_bench.py", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="*", choices=list(SIZES), default=DEFAULT_SIZES)
+    parser.add_argument("--events-per-game", type=int, default=1600)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (the best one counts)")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the plotting stage")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.3)
+    parser.add_argument("--memory-tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.events_per_game, args.repeat, not args.no_plot)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = None
+    print(format_results(results, baseline))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    for row in regressions:
+        print(f"REGRESSION {row['size']}/{row['stage']}: {row['baseline_seconds']:.3f}s -> {row['seconds']:.3f}s, "
+              f"{row['baseline_peak_mb']:.1f} -> {row['peak_mb']:.1f} MB")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE halfspaces_bench.py ---
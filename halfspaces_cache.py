@@ -0,0 +1,129 @@
+# --- START OF FILE halfspaces_cache.py ---
+"""Key-based memoization backed by an LRU cache bounded by an estimated byte budget."""
+
+import functools
+import inspect
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import halfspaces_profile
+
+DEFAULT_MAX_BYTES = int(os.environ.get("HALFSPACES_CACHE_MB", "1024")) * 2**20
+
+
+def estimate_nbytes(value) -> int:
+    """Rough in-memory size of a cached value (DataFrames, arrays, bytes and containers of them)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(getattr(value, 'nbytes', None), int):
+        return value.nbytes # Array containers such as HeatmapGrids
+    return sys.getsizeof(value)
+
+
+class ByteBudgetLRU:
+    """Thread-safe LRU cache that evicts least recently used entries once max_bytes is exceeded."""
+
+    _MISSING = object()
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, self._MISSING)
+            if entry is self._MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        nbytes = estimate_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return # Larger than the whole budget: never cache
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self, prefix=None):
+        """Drops every entry, or only those whose key starts with prefix (a function name)."""
+        with self._lock:
+            for key in [k for k in self._entries if prefix is None or k[0] == prefix]:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+
+# Shared across Streamlit reruns and sessions: imported modules outlive the rerun of the app script
+PIPELINE_CACHE = ByteBudgetLRU()
+
+
+def memoize(key, cache=None):
+    """Caches a function's results under key(bound_arguments); a key of None bypasses the cache.
+
+    Only the small values picked by key are looked at, so DataFrame arguments are never hashed.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        store = cache if cache is not None else PIPELINE_CACHE
+
+        def full_key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            cache_key = key(bound.arguments)
+            return None if cache_key is None else (func.__qualname__, cache_key)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = full_key(*args, **kwargs)
+            if cache_key is None:
+                return func(*args, **kwargs)
+
+            result = store.get(cache_key, ByteBudgetLRU._MISSING)
+            halfspaces_profile.note('cache', 'miss' if result is ByteBudgetLRU._MISSING else 'hit')
+            if result is ByteBudgetLRU._MISSING:
+                result = func(*args, **kwargs)
+                store.put(cache_key, result)
+            return result
+
+        # For callers that fill the cache themselves (e.g. with results rendered in another process)
+        wrapper.cache_key = full_key
+        wrapper.cache = store
+        wrapper.clear = lambda: store.clear(func.__qualname__)
+        return wrapper
+    return decorator
+
+# --- END OF FILE halfspaces_cache.py ---
@@ -0,0 +1,138 @@
+# --- START OF FILE halfspaces_carries.py ---
+"""Carry and possession engine: works on the event arrays of each game and inserts carries by position."""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import halfspaces_schema
+
+
+class CarryThresholds(NamedTuple):
+    """When the gap between two consecutive actions of a team counts as a carry (raw 0-100 pitch units)."""
+    min_distance: float = 0.0
+    max_distance: float = 100.0
+    max_seconds: float = 20.0
+
+
+DEFAULT_THRESHOLDS = CarryThresholds()
+
+
+def _segment_starts(*columns):
+    """True where a row starts a new run of equal values in any of the columns (row 0 always does)."""
+    starts = np.zeros(len(columns[0]), dtype=bool)
+    starts[:1] = True
+    for values in columns:
+        starts[1:] |= values[1:] != values[:-1]
+    return starts
+
+
+def _codes(series):
+    # Comparable integer codes for categorical/object columns; NaN never equals its neighbour
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy(dtype=np.int64)
+        return np.where(codes < 0, np.arange(-1, -len(codes) - 1, -1), codes)
+    values = series.to_numpy()
+    if values.dtype.kind in 'fiub':
+        return values
+    codes, _ = pd.factorize(values)
+    return np.where(codes < 0, np.arange(-1, -len(codes) - 1, -1), codes)
+
+
+def detect_carries(game_ids, team_ids, periods, x, y, end_x, end_y, time_seconds,
+                   thresholds: CarryThresholds = DEFAULT_THRESHOLDS):
+    """Boolean mask of rows followed by a carry into the next row.
+
+    A carry joins an action's end location to the next action's start when both belong to the same
+    game, team and period, and the gap is within the distance and time thresholds. Arrays must be in
+    event order within each game.
+    """
+    n = len(game_ids)
+    carries = np.zeros(n, dtype=bool)
+    if n < 2:
+        return carries
+    with np.errstate(invalid='ignore'):
+        dist_sq = (end_x[:-1] - x[1:]) ** 2 + (end_y[:-1] - y[1:]) ** 2
+        dt = time_seconds[1:] - time_seconds[:-1]
+        carries[:-1] = ((game_ids[:-1] == game_ids[1:]) & (team_ids[:-1] == team_ids[1:])
+                        & (periods[:-1] == periods[1:])
+                        & (dist_sq >= thresholds.min_distance ** 2) & (dist_sq <= thresholds.max_distance ** 2)
+                        & (dt < thresholds.max_seconds))
+    return carries
+
+
+def possession_ids(game_ids, team_ids, periods):
+    """Possession sequence number per row, counted from 0 within each game.
+
+    A new sequence starts whenever the period or the team in possession changes, so (gameId, possession_id)
+    identifies a possession regardless of which other games were processed alongside.
+    """
+    if len(game_ids) == 0:
+        return np.array([], dtype=np.int32)
+    sequence = np.cumsum(_segment_starts(game_ids, periods, team_ids)) - 1
+    game_start = np.maximum.accumulate(np.where(_segment_starts(game_ids), np.arange(len(game_ids)), 0))
+    return (sequence - sequence[game_start]).astype(np.int32)
+
+
+def insertion_order(carries):
+    """Row order of [events, carries] that puts carry j directly after the event it starts from."""
+    n, n_carries = len(carries), int(carries.sum())
+    inserted_before = np.cumsum(carries) - carries # Carries placed ahead of each event
+    order = np.empty(n + n_carries, dtype=np.intp)
+    order[np.arange(n) + inserted_before] = np.arange(n)
+    source = np.flatnonzero(carries)
+    order[source + inserted_before[source] + 1] = n + np.arange(n_carries)
+    return order
+
+
+def add_carries(events, thresholds: CarryThresholds = DEFAULT_THRESHOLDS):
+    """Returns events with Carry rows inserted after the actions they follow, plus action_id and possession_id.
+
+    events must be in event order within each game (as stored in the warehouse); nothing is re-sorted.
+    """
+    game_df = events.reset_index(drop=True)
+    # Categorical type/outcome columns must already know the carry values for concat to keep their dtype
+    game_df['type'] = halfspaces_schema.with_categories(game_df['type'], 'Carry')
+    game_df['outcomeType'] = halfspaces_schema.with_categories(game_df['outcomeType'], 'Successful')
+    game_df['time_seconds'] = game_df['minute'].astype(np.float64)*60+game_df['second'] # Widen int16 minutes before scaling
+
+    game_ids = _codes(game_df['gameId'])
+    team_ids = _codes(game_df['teamId'])
+    periods = _codes(game_df['period'])
+    coords = {col: game_df[col].to_numpy(dtype=np.float64) for col in ('x', 'y', 'endX', 'endY')}
+    time_seconds = game_df['time_seconds'].to_numpy()
+    carries = detect_carries(game_ids, team_ids, periods, coords['x'], coords['y'], coords['endX'], coords['endY'],
+                             time_seconds, thresholds)
+    game_df['possession_id'] = possession_ids(game_ids, team_ids, periods)
+
+    prev = np.flatnonzero(carries)
+    nex = game_df.iloc[prev + 1]
+    dribbles = pd.DataFrame({
+        'gameId': nex['gameId'].values,
+        'period': nex['period'].values,
+        'expandedMinute': nex['expandedMinute'].values,
+        'passKey': False,
+        'assist': False,
+        'isTouch': True,
+        'playerId': nex['playerId'].values,
+        'team': nex['team'].values,
+        'player': nex['player'].values,
+        'time_seconds': (time_seconds[prev] + time_seconds[prev + 1]) / 2,
+        'teamId': nex['teamId'].values,
+        'x': game_df['endX'].to_numpy()[prev],
+        'y': game_df['endY'].to_numpy()[prev],
+        'endX': nex['x'].values,
+        'endY': nex['y'].values,
+        'type': pd.Series('Carry', index=range(len(nex)), dtype=game_df['type'].dtype),
+        'outcomeType': pd.Series('Successful', index=range(len(nex)), dtype=game_df['outcomeType'].dtype),
+        'possession_id': nex['possession_id'].values, # Same team, period and game on both sides
+    })
+
+    # One take puts every carry in place: no global sort of the event table
+    with_carries = pd.concat([game_df, dribbles], ignore_index=True, sort=False)
+    with_carries = with_carries.iloc[insertion_order(carries)].reset_index(drop=True)
+    with_carries['action_id'] = with_carries.index # Simpler action_id
+    return with_carries
+
+# --- END OF FILE halfspaces_carries.py ---
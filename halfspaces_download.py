@@ -0,0 +1,140 @@
+# --- START OF FILE halfspaces_download.py ---
+"""Concurrent, resumable league CSV downloads streamed into the event warehouse in fixed-schema chunks."""
+
+import asyncio
+import csv
+import logging
+import os
+
+import aiohttp
+import fsspec
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+
+from halfspaces_schema import EVENT_COLUMN_TYPES, to_event_types
+from halfspaces_warehouse import PARTITIONING, ROW_GROUP_ROWS, WAREHOUSE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Google Drive's direct download endpoint (confirm=t skips the large-file warning page); any URL template
+# with a {file_id} placeholder works, e.g. a local HTTP server serving <file_id>.csv
+DRIVE_URL = "https://drive.usercontent.google.com/download?id={file_id}&export=download&confirm=t"
+LEAGUE_SOURCES = {
+    'GER-Bundesliga': "1z_Bb2kf48NqwrRO_ZSZeJLhE9mJ1ps71",
+    'ESP-La Liga': "1zeJtDsuTNwd3EKc9fY5FhNBdfl9sV9an",
+    'FRA-Ligue 1': "154GIano_ASZIGf3cOayy7OCIF9NjJx2x",
+    'ENG-Premier League': "1mCq0wlrlnohawuuYCZPTulvkQwqdeYt6",
+    'ITA-Serie A': "1OVkg5E2whpoE_snZT2fxkN_8mMgnSU0i",
+}
+DOWNLOAD_DIR = "downloads"
+CHUNK_BYTES = 1 << 20
+CSV_BLOCK_BYTES = 16 << 20 # CSV bytes parsed per streamed block
+RETRIES = 5
+
+
+async def fetch(session, url: str, dest: str, retries: int = RETRIES) -> str:
+    """Downloads url to dest, resuming from dest + '.part' after an interruption or an earlier failed run.
+
+    A complete dest from an earlier run is kept as is.
+    """
+    if os.path.exists(dest):
+        return dest
+    part = f"{dest}.part"
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 416: # Range past the end: the part file is already complete
+                    break
+                response.raise_for_status()
+                if response.content_type == "text/html":
+                    raise ValueError(f"{url} returned an HTML page instead of a CSV (file not shared publicly?)")
+                # 206 continues the part file; a 200 means the server ignored the range, so start over
+                with open(part, "ab" if response.status == 206 else "wb") as f:
+                    async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+                        f.write(chunk)
+            break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                raise
+            logger.warning("%s: download interrupted (%s), resuming (attempt %d/%d)", url, e, attempt + 1, retries)
+            await asyncio.sleep(min(2 ** attempt, 30))
+    os.replace(part, dest)
+    return dest
+
+
+def convert_csv(csv_path: str, warehouse: str = WAREHOUSE_PATH, block_size: int = CSV_BLOCK_BYTES):
+    """Streams a league CSV into its warehouse partitions block by block, replacing those partitions.
+
+    Known event columns get EVENT_COLUMN_TYPES and every other column is read as a string, so the schema
+    is fixed up front and memory stays at a few blocks whatever the file size. Rows are written in file
+    order, which keeps each game's events together and in sequence.
+    """
+    with open(csv_path, newline="") as f:
+        header = next(csv.reader(f))
+    columns = [name for name in header if name] # Drop the unnamed index column pandas writes
+    target = pa.schema([(name, EVENT_COLUMN_TYPES.get(name, pa.string())) for name in columns])
+    # Integer columns are parsed as float64 first: pandas writes ids of columns with gaps as '123.0'
+    read_types = {field.name: pa.float64() if pa.types.is_integer(field.type) else field.type for field in target}
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(column_types=read_types, include_columns=columns),
+    )
+    fs, path = fsspec.core.url_to_fs(warehouse)
+    ds.write_dataset(
+        (to_event_types(batch) for batch in reader), path, schema=target, filesystem=fs,
+        format="parquet", partitioning=PARTITIONING,
+        basename_template=f"part-{os.path.basename(csv_path).rsplit('.', 1)[0]}-{{i}}.parquet",
+        existing_data_behavior="delete_matching",
+        max_rows_per_group=ROW_GROUP_ROWS, min_rows_per_group=ROW_GROUP_ROWS // 4,
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+async def refresh_async(sources=None, warehouse: str = WAREHOUSE_PATH, download_dir: str = DOWNLOAD_DIR,
+                        url_template: str = DRIVE_URL, max_downloads: int = 5):
+    """Downloads every league concurrently and converts each one in a worker thread as soon as it lands."""
+    sources = sources or LEAGUE_SOURCES
+    os.makedirs(download_dir, exist_ok=True)
+    limit = asyncio.Semaphore(max_downloads)
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=120)
+
+    async def refresh_league(session, league, file_id):
+        async with limit:
+            csv_path = await fetch(session, url_template.format(file_id=file_id),
+                                   os.path.join(download_dir, f"{file_id}.csv"))
+        # pyarrow releases the GIL while parsing and writing, so conversions overlap with the other downloads
+        await asyncio.to_thread(convert_csv, csv_path, warehouse)
+        os.remove(csv_path)
+        logger.info("%s: converted into %s", league, warehouse)
+        return league
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        results = await asyncio.gather(*(refresh_league(session, league, file_id)
+                                         for league, file_id in sources.items()), return_exceptions=True)
+    failed = {league: result for league, result in zip(sources, results) if isinstance(result, BaseException)}
+    for league, error in failed.items():
+        logger.error("%s: refresh failed: %s", league, error)
+    return [league for league in sources if league not in failed]
+
+
+def refresh(sources=None, warehouse: str = WAREHOUSE_PATH, download_dir: str = DOWNLOAD_DIR,
+            url_template: str = DRIVE_URL, max_downloads: int = 5):
+    """Synchronous wrapper around refresh_async; returns the leagues that were refreshed."""
+    return asyncio.run(refresh_async(sources, warehouse, download_dir, url_template, max_downloads))
+
+
+def download(file_id: str, download_dir: str = DOWNLOAD_DIR, url_template: str = DRIVE_URL) -> str:
+    """Downloads a single source CSV (resumable) and returns its local path."""
+    async def run():
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_read=120)) as session:
+            return await fetch(session, url_template.format(file_id=file_id),
+                               os.path.join(download_dir, f"{file_id}.csv"))
+
+    os.makedirs(download_dir, exist_ok=True)
+    return asyncio.run(run())
+
+# --- END OF FILE halfspaces_download.py ---
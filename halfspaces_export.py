@@ -0,0 +1,195 @@
+# --- START OF FILE halfspaces_export.py ---
+"""Streaming export of filtered player tables and their progressive-action events (Parquet, Arrow IPC, CSV).
+
+Everything is written as record batches: a league's frames are read (or sliced) a batch at a time and
+appended to one open writer, so exporting several leagues never builds one combined in-memory frame.
+"""
+
+import io
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import halfspaces_pipeline
+import halfspaces_store
+from halfspaces_pipeline import EVENTS_PATH
+
+EXPORT_FORMATS = ('parquet', 'arrow', 'csv')
+MIME_TYPES = {'parquet': 'application/vnd.apache.parquet', 'arrow': 'application/vnd.apache.arrow.file',
+              'csv': 'text/csv'}
+EXPORT_BATCH_ROWS = 64_000
+ACTION_FRAMES = halfspaces_store.FRAME_NAMES[1:]
+
+
+def _plain(batch):
+    """Decodes dictionary (categorical) columns, so batches of different leagues share one schema."""
+    arrays = [pc.cast(col, col.type.value_type) if pa.types.is_dictionary(col.type) else col for col in batch.columns]
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def _with_columns(batch, **values):
+    """Prepends constant columns (e.g. league, season) to a record batch."""
+    arrays = [pa.array([value] * batch.num_rows, type=pa.scalar(value).type) for value in values.values()]
+    return pa.RecordBatch.from_arrays(arrays + batch.columns, names=list(values) + batch.schema.names)
+
+
+class BatchWriter:
+    """Writes record batches to a path or binary file object; the first batch fixes the schema.
+
+    Later batches are cast to that schema (a column that is all null in one league takes the type it has
+    in the first). Use as a context manager; rows holds the number of rows written.
+    """
+
+    def __init__(self, sink, fmt: str = 'parquet'):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{fmt}'. Choose from {list(EXPORT_FORMATS)}.")
+        self.sink = sink
+        self.fmt = fmt
+        self.schema = None
+        self.rows = 0
+        self._writer = None
+
+    def _open(self, schema):
+        if self.fmt == 'parquet':
+            return pq.ParquetWriter(self.sink, schema, compression='zstd')
+        if self.fmt == 'arrow':
+            return pa.ipc.new_file(self.sink, schema)
+        return pa_csv.CSVWriter(self.sink, schema)
+
+    def write(self, batch):
+        table = pa.Table.from_batches([_plain(batch)])
+        if self._writer is None:
+            self.schema = table.schema
+            self._writer = self._open(self.schema)
+        elif table.schema != self.schema:
+            table = table.select(self.schema.names).cast(self.schema)
+        if table.num_rows:
+            self._writer.write_table(table)
+            self.rows += table.num_rows
+
+    def write_all(self, batches):
+        for batch in batches:
+            self.write(batch)
+        return self
+
+    def close(self, empty_schema=None):
+        if self._writer is None and empty_schema is not None:
+            self._writer = self._open(empty_schema) # Nothing matched: still write a valid, empty file
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close(pa.schema([]))
+
+
+# --- Batch Sources ---
+def table_batches(df, batch_size: int = EXPORT_BATCH_ROWS, **columns):
+    """Record batches of a (filtered) player table, with constant columns such as league/season in front.
+
+    An empty table still gives one empty batch, so its columns reach the file header.
+    """
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    for batch in table.to_batches(max_chunksize=batch_size) or [pa.RecordBatch.from_pylist([], schema=table.schema)]:
+        yield _with_columns(batch, **columns) if columns else batch
+
+
+def _player_keys(players):
+    """'playerId|team' keys of a player table, matching actions to the club row they were made for."""
+    return pa.array([f"{int(pid)}|{team}" for pid, team in zip(players['playerId'], players['team'].astype(str))],
+                    type=pa.string())
+
+
+def _matching(batch, keys):
+    key = pc.binary_join_element_wise(pc.cast(batch.column('playerId'), pa.string()),
+                                      pc.cast(batch.column('team'), pa.string()), '|')
+    return batch.filter(pc.fill_null(pc.is_in(key, value_set=keys), False))
+
+
+def stored_action_batches(league: str, season, players, store_dir: str = halfspaces_store.STORE_DIR,
+                          frames=ACTION_FRAMES, batch_size: int = EXPORT_BATCH_ROWS, zones: str = None):
+    """The stored actions of the players (rows of a player table), read from the entry's Parquet files in
+    batches; each batch is tagged with its league, season and frame. zones is the entry's registry signature.
+
+    Batches without matching rows are yielded too, so an export with no matching actions keeps its columns.
+    """
+    keys = _player_keys(players)
+    for name in frames:
+        path = os.path.join(halfspaces_store.entry_dir(league, season, store_dir, zones), f"{name}.parquet")
+        if not os.path.exists(path):
+            continue
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield _with_columns(_matching(batch, keys), league=league, season=season, frame=name)
+
+
+def index_action_batches(indexes, players, frames=ACTION_FRAMES, **columns):
+    """The actions of the players from in-memory PlayerIndex objects (in frames order), one slice per
+    player and frame; constant columns (e.g. league) are added in front along with the frame name."""
+    keys = _player_keys(players)
+    player_ids = players['playerId'].drop_duplicates()
+    for name, index in zip(frames, indexes):
+        for player_id in player_ids:
+            actions = index.get(player_id)
+            if actions.empty:
+                continue
+            stored = actions[[col for col in halfspaces_store.ACTION_COLUMNS if col in actions.columns]]
+            for batch in pa.Table.from_pandas(stored, preserve_index=False).to_batches():
+                batch = _matching(batch, keys)
+                if batch.num_rows:
+                    yield _with_columns(batch, **columns, frame=name)
+
+
+def export_seasons(out_dir: str, leagues=None, seasons=None, teams=None, min_90s: float = 0.0,
+                   fmt: str = 'parquet', data_path: str = EVENTS_PATH, store_dir: str = halfspaces_store.STORE_DIR,
+                   registry=None):
+    """Writes players_<season>.<fmt> and actions_<season>.<fmt> for every requested season, league by league.
+
+    Each league's entry is rebuilt first if stale; its player table is filtered like the app's (teams,
+    minimum 90s) and its actions are streamed from the stored Parquet files. Returns the written paths.
+    """
+    available = halfspaces_pipeline.league_seasons(data_path)
+    leagues = leagues or list(available)
+    unknown = [league for league in leagues if league not in available]
+    if unknown:
+        raise ValueError(f"Unknown leagues {unknown}. Choose from {list(available)}.")
+    seasons = seasons or sorted({season for league in leagues for season in available[league]}, reverse=True)
+    zones = (halfspaces_pipeline.ZONES if registry is None else registry).signature()
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = []
+    for season in seasons:
+        players_path = os.path.join(out_dir, f"players_{season}.{fmt}")
+        actions_path = os.path.join(out_dir, f"actions_{season}.{fmt}")
+        with BatchWriter(players_path, fmt) as players_writer, BatchWriter(actions_path, fmt) as actions_writer:
+            for league in leagues:
+                if season not in available[league]:
+                    continue
+                fingerprint = halfspaces_pipeline.tables_fingerprint(league, season, data_path, registry=registry)
+                if not halfspaces_store.is_current(league, season, fingerprint, store_dir, zones):
+                    halfspaces_pipeline.load_halfspace_tables(data_path, league, season, fingerprint, store_dir,
+                                                              registry=registry)
+                meta = halfspaces_store.read_meta(league, season, store_dir, zones) or {}
+                combined_prog_df = halfspaces_store.load_frame(league, season, "combined_prog_df", store_dir, zones)
+                if combined_prog_df is None:
+                    continue
+                league_teams = meta.get('teams', [])
+                players = halfspaces_pipeline.filter_results(combined_prog_df, teams or league_teams, min_90s, league_teams)
+                players_writer.write_all(table_batches(players, league=league, season=season))
+                actions_writer.write_all(stored_action_batches(league, season, players, store_dir, zones=zones))
+        paths += [players_path, actions_path]
+    return paths
+
+
+def to_bytes(batches, fmt: str = 'parquet') -> bytes:
+    """Writes batches into an in-memory file of the given format (for downloads)."""
+    buffer = io.BytesIO()
+    with BatchWriter(buffer, fmt) as writer:
+        writer.write_all(batches)
+    return buffer.getvalue()
+
+# --- END OF FILE halfspaces_export.py ---
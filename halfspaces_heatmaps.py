@@ -0,0 +1,97 @@
+# --- START OF FILE halfspaces_heatmaps.py ---
+"""Binned progressive-action locations: one uint16 pitch grid per player, summed for team/league heatmaps."""
+
+import numpy as np
+import pandas as pd
+
+# Fixed grid on the 120x80 pitch the action frames are scaled to (5x5 cells)
+GRID_X_BINS, GRID_Y_BINS = 24, 16
+PITCH_LENGTH, PITCH_WIDTH = 120.0, 80.0
+X_EDGES = np.linspace(0, PITCH_LENGTH, GRID_X_BINS + 1)
+Y_EDGES = np.linspace(0, PITCH_WIDTH, GRID_Y_BINS + 1)
+
+# Layers of each grid: the four plotted action frames, in process_halfspace_data order
+LAYERS = ('prog_rhs_passes', 'prog_lhs_passes', 'prog_rhs_carries', 'prog_lhs_carries')
+ENDS = ('start', 'end')
+# Layers shown for each action type of the app
+ACTION_TYPE_LAYERS = {
+    "Right Half-Space Actions": ('prog_rhs_passes', 'prog_rhs_carries'),
+    "Left Half-Space Actions": ('prog_lhs_passes', 'prog_lhs_carries'),
+    "All Half-Space Actions": LAYERS,
+}
+
+
+def _cells(x, y):
+    gx = np.clip((np.asarray(x, dtype=float) / PITCH_LENGTH * GRID_X_BINS).astype(np.int64), 0, GRID_X_BINS - 1)
+    gy = np.clip((np.asarray(y, dtype=float) / PITCH_WIDTH * GRID_Y_BINS).astype(np.int64), 0, GRID_Y_BINS - 1)
+    return gx * GRID_Y_BINS + gy
+
+
+class HeatmapGrids:
+    """Start/end location counts of every player's progressive actions, shape (players, layers, 2, x, y).
+
+    Rows are (playerId, team) pairs, so a player who changed clubs has one grid per club. Counts are
+    uint16 (a player never makes 65k actions from one 5x5 cell); team and league grids are summed as int64.
+    """
+
+    def __init__(self, player_ids, teams, grids):
+        self.player_ids = np.asarray(player_ids)
+        self.teams = np.asarray(teams, dtype=str)
+        self.grids = grids
+        self._rows = {key: row for row, key in enumerate(zip(self.player_ids.tolist(), self.teams.tolist()))}
+
+    @classmethod
+    def from_frames(cls, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries):
+        """Bins the four action frames (DataFrames or PlayerIndex objects) in one histogram pass."""
+        frames = [frame.frame if hasattr(frame, 'frame') else frame
+                  for frame in (prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries)]
+        actions = pd.concat([frame[['playerId', 'team', 'x', 'y', 'endX', 'endY']].assign(layer=layer)
+                             for layer, frame in enumerate(frames)], ignore_index=True)
+        actions = actions[actions['playerId'].notna()]
+        keys = pd.MultiIndex.from_arrays([actions['playerId'].to_numpy(), actions['team'].astype(str).to_numpy()])
+        rows, players = pd.factorize(keys, sort=True)
+
+        cells = GRID_X_BINS * GRID_Y_BINS
+        per_player = len(LAYERS) * len(ENDS) * cells
+        base = rows * per_player + actions['layer'].to_numpy() * len(ENDS) * cells
+        flat = np.concatenate([base + _cells(actions['x'], actions['y']),
+                               base + cells + _cells(actions['endX'], actions['endY'])])
+        counts = np.bincount(flat, minlength=len(players) * per_player)
+        grids = np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16).reshape(
+            len(players), len(LAYERS), len(ENDS), GRID_X_BINS, GRID_Y_BINS)
+        return cls(players.get_level_values(0).to_numpy(), players.get_level_values(1).to_numpy(), grids)
+
+    def to_arrays(self):
+        return {'player_ids': self.player_ids, 'teams': self.teams, 'grids': self.grids}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['player_ids'], arrays['teams'], arrays['grids'])
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.grids.nbytes + self.player_ids.nbytes + self.teams.nbytes)
+
+    def _select(self, grids, layers, end: str):
+        layer_idx = [LAYERS.index(layer) for layer in layers]
+        return grids[..., layer_idx, ENDS.index(end), :, :].sum(axis=-3, dtype=np.int64)
+
+    def player(self, player_id, team, layers=LAYERS, end: str = 'start'):
+        """(x, y) count grid of one player's actions; all zeros if the player has none."""
+        row = self._rows.get((player_id, str(team)))
+        if row is None:
+            return np.zeros((GRID_X_BINS, GRID_Y_BINS), dtype=np.int64)
+        return self._select(self.grids[row], layers, end)
+
+    def team(self, team, layers=LAYERS, end: str = 'start'):
+        """(x, y) count grid summed over a team's players."""
+        return self._select(self.grids[self.teams == str(team)], layers, end).sum(axis=0)
+
+    def league(self, layers=LAYERS, end: str = 'start'):
+        """(x, y) count grid summed over every player."""
+        return self._select(self.grids, layers, end).sum(axis=0)
+
+# --- END OF FILE halfspaces_heatmaps.py ---
@@ -0,0 +1,74 @@
+# --- START OF FILE halfspaces_index.py ---
+"""Per-player event index: frames sorted by playerId with offsets, so a player's rows are a slice."""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def sort_by_player(frame, key: str = 'playerId'):
+    """Stable-sorts an action frame by player (no-op if it already is), ready for PlayerIndex."""
+    if frame.empty or key not in frame.columns or frame[key].is_monotonic_increasing:
+        return frame.reset_index(drop=True)
+    return frame.sort_values(key, kind='stable', na_position='last').reset_index(drop=True)
+
+
+class PlayerIndex:
+    """An action frame sorted by playerId plus a playerId -> (start, stop) offsets table."""
+
+    def __init__(self, frame, key: str = 'playerId'):
+        self.key = key
+        self.frame = sort_by_player(frame, key)
+        if self.frame.empty or key not in self.frame.columns:
+            self._ids = np.array([])
+            self._starts = self._stops = np.array([], dtype=np.intp)
+            return
+
+        ids = self.frame[key].to_numpy()
+        valid = len(ids) - int(pd.isna(ids).sum()) # Rows without a playerId sort last and are not indexed
+        boundaries = np.flatnonzero(ids[1:valid] != ids[:valid - 1]) + 1 if valid else np.array([], dtype=np.intp)
+        self._starts = np.concatenate(([0], boundaries)).astype(np.intp) if valid else boundaries
+        self._stops = np.concatenate((boundaries, [valid])).astype(np.intp) if valid else boundaries
+        self._ids = ids[self._starts]
+
+    def offsets(self, player_id):
+        """(start, stop) row offsets of a player's actions; (0, 0) if the player has none."""
+        pos = np.searchsorted(self._ids, player_id)
+        if pos < len(self._ids) and self._ids[pos] == player_id:
+            return int(self._starts[pos]), int(self._stops[pos])
+        return 0, 0
+
+    def get(self, player_id, team=None):
+        """A player's actions as a slice of the sorted frame (no row copy).
+
+        Tables have one row per (playerId, team), so pass team to keep only the actions made for that club
+        (a player who moved mid-season has actions for both).
+        """
+        start, stop = self.offsets(player_id)
+        actions = self.frame.iloc[start:stop]
+        if team is None or 'team' not in actions.columns:
+            return actions
+        same_team = actions['team'].astype(str).to_numpy() == str(team)
+        return actions if same_team.all() else actions[same_team]
+
+    def counts(self):
+        """Number of actions per player as a Series indexed by playerId."""
+        return pd.Series(self._stops - self._starts, index=pd.Index(self._ids, name=self.key), name='actions')
+
+    @property
+    def player_ids(self):
+        return self._ids
+
+    def __contains__(self, player_id):
+        return self.offsets(player_id) != (0, 0)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __sizeof__(self):
+        # Counted by the byte-bounded caches
+        return (sys.getsizeof(object()) + int(self.frame.memory_usage(index=True, deep=True).sum())
+                + self._ids.nbytes + self._starts.nbytes + self._stops.nbytes)
+
+# --- END OF FILE halfspaces_index.py ---
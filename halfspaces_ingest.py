@@ -0,0 +1,104 @@
+# --- START OF FILE halfspaces_ingest.py ---
+"""Incremental ingestion: appends only unseen games to a league/season partition and updates its stored tables."""
+
+import logging
+
+import fsspec
+import pandas as pd
+import pyarrow.dataset as ds
+
+import halfspaces_index
+import halfspaces_pipeline
+import halfspaces_store
+import halfspaces_warehouse
+from halfspaces_heatmaps import HeatmapGrids
+from halfspaces_pipeline import MINS_CSV_PATH, REQUIRED_EVENT_COLUMNS
+from halfspaces_schema import compact_events
+
+logger = logging.getLogger(__name__)
+
+
+def stored_game_ids(data_path: str, league: str, season_internal) -> set:
+    """gameIds already present in a league/season partition (only the gameId column is read)."""
+    fs, path = fsspec.core.url_to_fs(halfspaces_warehouse.partition_path(league, season_internal, data_path))
+    if not fs.exists(path):
+        return set()
+    dataset = halfspaces_warehouse.open_dataset(data_path)
+    row_filter = (ds.field("league") == league) & (ds.field("season") == season_internal)
+    game_ids = dataset.to_table(columns=["gameId"], filter=row_filter).column("gameId")
+    return set(pd.unique(game_ids.drop_null().to_numpy()).tolist())
+
+
+def install_minutes(mins_csv: str, mins_csv_path: str = MINS_CSV_PATH):
+    """Replaces the app's minutes CSV with a refreshed one (validated before it is copied in)."""
+    halfspaces_pipeline.read_minutes_data(mins_csv)
+    with fsspec.open(mins_csv, "rb") as src, fsspec.open(mins_csv_path, "wb") as dst:
+        dst.write(src.read())
+
+
+def _append_frame(stored, new):
+    frame = pd.concat([stored, new[[col for col in stored.columns if col in new.columns]]], ignore_index=True)
+    return halfspaces_index.sort_by_player(compact_events(frame.astype(
+        {col: str for col in frame.columns if isinstance(frame[col].dtype, pd.CategoricalDtype)})))
+
+
+def ingest_games(data_path: str, league: str, season_internal, events, mins_csv=None,
+                 store_dir: str = halfspaces_store.STORE_DIR, registry=None):
+    """Appends the games in events that are not stored yet and adds their counts to the stored tables.
+
+    Only the new games go through carries/classification. If the stored tables do not match the dataset
+    they were built from, the season is rebuilt in full instead. Returns the number of new games.
+    """
+    registry = halfspaces_pipeline.ZONES if registry is None else registry
+    zones = registry.signature()
+    events = events[(events['league'] == league) & (events['season'] == season_internal)]
+    known_games = stored_game_ids(data_path, league, season_internal)
+    new_events = events[~events['gameId'].isin(known_games)]
+    new_games = set(pd.unique(new_events['gameId']).tolist())
+
+    # The stored counts can only be extended if they were built from exactly the partition on disk now
+    previous = None
+    if known_games:
+        fingerprint = halfspaces_pipeline.tables_fingerprint(league, season_internal, data_path, registry=registry)
+        entry = halfspaces_store.load_entry(league, season_internal, fingerprint, store_dir, zones)
+        counts = halfspaces_store.load_counts(league, season_internal, store_dir, zones)
+        if entry is not None and counts is not None and set(entry[0].get('game_ids', [])) == known_games:
+            previous = entry, counts
+
+    if not new_games and mins_csv is None and previous is not None:
+        logger.info("%s %s: no new games", league, season_internal)
+        return 0
+
+    if new_games:
+        halfspaces_warehouse.write_events(new_events, data_path, replace=False)
+    if mins_csv is not None:
+        install_minutes(mins_csv)
+    fingerprint = halfspaces_pipeline.tables_fingerprint(league, season_internal, data_path, registry=registry)
+
+    if previous is None:
+        logger.info("%s %s: stored tables out of date, rebuilding the season", league, season_internal)
+        halfspaces_store.remove_entry(league, season_internal, store_dir, zones)
+        halfspaces_pipeline.load_halfspace_tables(data_path, league, season_internal, fingerprint, store_dir,
+                                                  registry=registry)
+        return len(new_games)
+
+    (meta, (_, *prog_frames)), counts_df = previous
+    teams = set(meta['teams'])
+    if new_games:
+        new_data = compact_events(new_events[[col for col in REQUIRED_EVENT_COLUMNS if col in new_events.columns]])
+        new_counts, *new_frames = halfspaces_pipeline.compute_halfspace_counts(new_data.reset_index(drop=True),
+                                                                                  registry=registry)
+        counts_df = halfspaces_pipeline.merge_counts(counts_df, new_counts)
+        prog_frames = [_append_frame(stored, new) for stored, new in zip(prog_frames, new_frames)]
+        teams |= set(new_data['team'].dropna().astype(str))
+
+    mins_data = halfspaces_pipeline.read_minutes_data(MINS_CSV_PATH)
+    combined_prog_df = halfspaces_pipeline.index_by_90s(halfspaces_pipeline.attach_minutes(counts_df, mins_data, registry))
+    halfspaces_store.write_entry(league, season_internal, fingerprint, (combined_prog_df, *prog_frames), teams,
+                                 store_dir, counts=counts_df, game_ids=known_games | new_games,
+                                 heatmaps=HeatmapGrids.from_frames(*prog_frames).to_arrays(), zones=zones)
+    logger.info("%s %s: added %d games (%d stored)", league, season_internal, len(new_games),
+                len(known_games | new_games))
+    return len(new_games)
+
+# --- END OF FILE halfspaces_ingest.py ---
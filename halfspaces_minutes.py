@@ -0,0 +1,111 @@
+# --- START OF FILE halfspaces_minutes.py ---
+"""Minutes table keyed by (playerId, team): names are resolved to event ids once, then p90 is an array gather."""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+KEY_COLS = ['playerId', 'team']
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_name(name) -> str:
+    """Accent-, case- and punctuation-insensitive form of a player or team name."""
+    if not isinstance(name, str):
+        return ''
+    if not name.isascii():
+        name = unicodedata.normalize('NFKD', name)
+        name = ''.join(ch for ch in name if not unicodedata.combining(ch))
+    return ' '.join(_PUNCTUATION.sub(' ', name.casefold()).split())
+
+
+def _normalized(series):
+    # Names repeat (teams especially), so each distinct value is normalized once
+    uniques = pd.unique(series)
+    return series.map(dict(zip(uniques, map(normalize_name, uniques))))
+
+
+class MinutesIndex:
+    """Minutes rows resolved to the playerIds seen in the events, for gathering 90s/position by (playerId, team).
+
+    Each minutes row is matched to event players in three passes, stopping at the first that resolves it:
+    exact (player, team) names, normalized (player, team) names, then normalized player name alone when it
+    identifies a single player and team in the events (team spelled differently in the two sources). The
+    name-only pass skips rows whose team is one of the event teams: such a row is about that club, and a
+    player with the same name at another club is someone else's row (e.g. a player listed at two clubs).
+    When several rows resolve to the same (playerId, team), the match from the strictest pass wins.
+    Rows that match several players, or that lose a player to a better match, are kept in conflicts
+    rather than guessed.
+    """
+
+    def __init__(self, mins_data, players):
+        players = players[['playerId', 'player', 'team']].dropna(subset=['playerId']).drop_duplicates()
+        event_players = players.astype({'player': str, 'team': str})
+        event_players = event_players.assign(event_team=event_players['team'])
+        mins = mins_data.reset_index(drop=True).astype({'player': str, 'team': str})
+        mins = mins.assign(row=np.arange(len(mins)))
+
+        resolved, conflicts = [], []
+        remaining = mins
+        for rank, on in enumerate((['player', 'team'], ['player_key', 'team_key'], ['player_key'])):
+            if remaining.empty:
+                break
+            if 'player_key' in on and 'player_key' not in remaining.columns:
+                # Normalized names are only computed if exact names left rows unresolved
+                remaining = remaining.assign(player_key=_normalized(remaining['player']),
+                                             team_key=_normalized(remaining['team']))
+                event_players = event_players.assign(player_key=_normalized(event_players['player']),
+                                                     team_key=_normalized(event_players['team']))
+            candidates_from = remaining
+            if on == ['player_key']:
+                # A row naming a club of this league is not re-assigned to another club by name alone
+                candidates_from = remaining[~remaining['team_key'].isin(event_players['team_key'])]
+            candidates = candidates_from[['row'] + on].merge(event_players[['playerId', 'event_team'] + on], on=on)
+            n_matches = candidates.groupby('row')[['playerId', 'event_team']].nunique().max(axis=1)
+            unique_rows = n_matches.index[n_matches == 1]
+            ambiguous_rows = n_matches.index[n_matches > 1]
+            resolved.append(candidates[candidates['row'].isin(unique_rows)].drop_duplicates('row')[
+                ['row', 'playerId', 'event_team']].assign(rank=rank))
+            conflicts.append(mins.loc[ambiguous_rows, ['player', 'team']].assign(reason='matches several players'))
+            remaining = remaining[~remaining['row'].isin(n_matches.index)]
+
+        matched = pd.concat(resolved, ignore_index=True).sort_values(['rank', 'row'], kind='stable')
+        # Two minutes rows resolving to the same player/team: the stricter match wins, then the earlier row
+        duplicated = matched.duplicated(['playerId', 'event_team'], keep='first')
+        conflicts.append(mins.loc[matched.loc[duplicated, 'row'], ['player', 'team']]
+                         .assign(reason='duplicate row for the same player'))
+        matched = matched[~duplicated].sort_values('row')
+
+        rows = matched['row'].to_numpy()
+        self.table = pd.DataFrame({
+            'playerId': matched['playerId'].to_numpy(),
+            'team': matched['event_team'].to_numpy(),
+            '90s': mins['90s'].to_numpy(dtype=float)[rows],
+            'position': mins['position'].to_numpy(dtype=object)[rows],
+        })
+        self._index = pd.MultiIndex.from_frame(self.table[KEY_COLS])
+        self.unmatched = remaining[['player', 'team']].reset_index(drop=True)
+        self.conflicts = pd.concat(conflicts, ignore_index=True)
+
+    def positions(self, player_ids, teams):
+        """Row of each (playerId, team) in table, -1 where the player has no minutes row."""
+        keys = pd.MultiIndex.from_arrays([np.asarray(player_ids), np.asarray(teams, dtype=object).astype(str)])
+        return self._index.get_indexer(keys)
+
+    def lookup(self, player_ids, teams):
+        """90s (NaN if unknown) and position (None if unknown) arrays aligned with the given keys."""
+        pos = self.positions(player_ids, teams)
+        found = pos >= 0
+        pos = np.where(found, pos, 0)
+        if not len(self.table):
+            return np.full(len(pos), np.nan), np.full(len(pos), None, dtype=object)
+        nineties = np.where(found, self.table['90s'].to_numpy()[pos], np.nan)
+        positions = np.where(found, self.table['position'].to_numpy()[pos], None)
+        return nineties, positions
+
+    def __len__(self):
+        return len(self.table)
+
+# --- END OF FILE halfspaces_minutes.py ---
@@ -0,0 +1,125 @@
+# --- START OF FILE halfspaces_percentiles.py ---
+"""Percentiles and ranks of every p90 metric by position group, within a league and across leagues.
+
+A player's percentile is measured against a reference pool: the players of the same position group with at
+least PERCENTILE_MIN_90S 90s (so a 20-minute cameo cannot top the distribution) and at least one progressive
+half-space action, the players the tables have rows for. Pools are kept as sorted value arrays, so any table
+can be looked up against them with a binary search.
+"""
+
+import numpy as np
+import pandas as pd
+
+PERCENTILE_MIN_90S = 5.0
+POSITION_GROUP_COL = 'position_group'
+PCT_SUFFIX = '_pct' # Within the league
+RANK_SUFFIX = '_rank' # Within the league, 1 = best; pool players only
+ALL_LEAGUES_PCT_SUFFIX = '_pct_all' # Across every league of the season
+
+# WhoScored positions list the main role first, e.g. 'AM(CLR),FW'; 'Forward'/'Midfielder'/'Defender' are
+# FBref-style fallbacks used for some players in the minutes CSVs
+POSITION_GROUPS = {'GK': 'Goalkeeper', 'D': 'Defender', 'Defender': 'Defender', 'DMC': 'Midfielder',
+                   'M': 'Midfielder', 'Midfielder': 'Midfielder', 'AM': 'Attacking Midfielder',
+                   'FW': 'Forward', 'Forward': 'Forward'}
+
+
+def _group_of(position) -> str:
+    if not isinstance(position, str) or not position:
+        return 'Unknown'
+    main = position.split(',', 1)[0].strip()
+    return POSITION_GROUPS.get(main.split('(', 1)[0], 'Unknown')
+
+
+def position_groups(positions):
+    """Position group of each position string (each distinct value is parsed once)."""
+    positions = pd.Series(positions, dtype=object)
+    uniques = pd.unique(positions)
+    return positions.map(dict(zip(uniques, map(_group_of, uniques)))).to_numpy(dtype=object)
+
+
+def p90_metrics(df):
+    return [col for col in df.columns if col.endswith('_p90')]
+
+
+def _in_pool(df, min_90s: float):
+    in_pool = df['90s'].to_numpy(dtype=float) >= min_90s
+    if 'prog_HS_actions' in df.columns:
+        # Same pool whatever other rows a table carries (e.g. tables stored before zero-action rows were dropped)
+        in_pool &= df['prog_HS_actions'].to_numpy() > 0
+    return in_pool
+
+
+def _percentile_of(pool, values):
+    """Mid-rank percentile (0-100) of values within the sorted pool; NaN for NaN values or an empty pool."""
+    if len(pool) == 0:
+        return np.full(len(values), np.nan)
+    below = np.searchsorted(pool, values, side='left')
+    not_above = np.searchsorted(pool, values, side='right')
+    return np.where(np.isnan(values), np.nan, 50.0 * (below + not_above) / len(pool))
+
+
+def add_position_percentiles(df, min_90s: float = PERCENTILE_MIN_90S):
+    """Adds position_group plus a league percentile and rank column for each p90 metric of a league table."""
+    df = df.copy()
+    metrics = p90_metrics(df)
+    groups = position_groups(df['position']) if 'position' in df.columns else np.full(len(df), 'Unknown', dtype=object)
+    df[POSITION_GROUP_COL] = groups
+    if df.empty or '90s' not in df.columns:
+        for metric in metrics:
+            df[metric + PCT_SUFFIX] = np.nan
+            df[metric + RANK_SUFFIX] = np.nan
+        return df
+
+    in_pool = _in_pool(df, min_90s)
+    pct = {metric: np.full(len(df), np.nan) for metric in metrics}
+    rank = {metric: np.full(len(df), np.nan) for metric in metrics}
+    for group in pd.unique(groups):
+        rows = groups == group
+        for metric in metrics:
+            values = df[metric].to_numpy(dtype=float)
+            pool = np.sort(values[rows & in_pool])
+            pct[metric][rows] = _percentile_of(pool, values[rows])
+            # Rank = pool players strictly better + 1
+            pool_rows = rows & in_pool
+            rank[metric][pool_rows] = len(pool) - np.searchsorted(pool, values[pool_rows], side='right') + 1
+    for metric in metrics:
+        df[metric + PCT_SUFFIX] = pct[metric].round(1)
+        df[metric + RANK_SUFFIX] = rank[metric]
+    return df
+
+
+def distribution(tables, min_90s: float = PERCENTILE_MIN_90S):
+    """Long table (position_group, metric, value) of the reference pools of several league tables, sorted."""
+    parts = []
+    for df in tables:
+        if df.empty or '90s' not in df.columns:
+            continue
+        pool = df[_in_pool(df, min_90s)]
+        groups = position_groups(pool['position']) if 'position' in pool.columns else 'Unknown'
+        for metric in p90_metrics(pool):
+            parts.append(pd.DataFrame({POSITION_GROUP_COL: groups, 'metric': metric,
+                                       'value': pool[metric].to_numpy(dtype=float)}))
+    if not parts:
+        return pd.DataFrame({POSITION_GROUP_COL: pd.Series(dtype=str), 'metric': pd.Series(dtype=str),
+                             'value': pd.Series(dtype=float)})
+    return (pd.concat(parts, ignore_index=True).dropna(subset=['value'])
+            .sort_values([POSITION_GROUP_COL, 'metric', 'value'], kind='stable').reset_index(drop=True))
+
+
+def lookup_percentiles(df, dist, suffix: str = ALL_LEAGUES_PCT_SUFFIX):
+    """Adds a percentile column per p90 metric, looked up against a distribution() table."""
+    df = df.copy()
+    groups = (df[POSITION_GROUP_COL].to_numpy(dtype=object) if POSITION_GROUP_COL in df.columns
+              else position_groups(df['position']) if 'position' in df.columns
+              else np.full(len(df), 'Unknown', dtype=object))
+    pools = {key: part['value'].to_numpy() for key, part in dist.groupby([POSITION_GROUP_COL, 'metric'], sort=False)}
+    for metric in p90_metrics(df):
+        values = df[metric].to_numpy(dtype=float)
+        pct = np.full(len(df), np.nan)
+        for group in pd.unique(groups):
+            rows = groups == group
+            pct[rows] = _percentile_of(pools.get((group, metric), np.array([])), values[rows])
+        df[metric + suffix] = pct.round(1)
+    return df
+
+# --- END OF FILE halfspaces_percentiles.py ---
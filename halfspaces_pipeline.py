@@ -0,0 +1,646 @@
+# --- START OF FILE halfspaces_pipeline.py ---
+"""Streamlit-free processing pipeline: event loading, carries, zone classification and per-player tables."""
+
+import gc                  # For garbage collection
+import logging
+import os
+import threading
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import halfspaces_cache
+import halfspaces_carries
+import halfspaces_heatmaps
+import halfspaces_index
+import halfspaces_minutes
+import halfspaces_percentiles
+import halfspaces_profile
+import halfspaces_schema
+import halfspaces_similarity
+import halfspaces_store
+import halfspaces_warehouse
+import halfspaces_zones
+
+logger = logging.getLogger(__name__)
+
+
+# --- Reporting ---
+def _log_report(level: str, message: str):
+    logger.log(logging.ERROR if level == 'error' else logging.WARNING, message)
+
+
+# Per thread: the app's st.* reporter only works in its script thread, so the warm-up thread and the
+# query service's workers keep logging
+_reporters = threading.local()
+
+
+def set_reporter(reporter):
+    """Routes the calling thread's pipeline errors/warnings to reporter(level, message); the app sends them to
+    st.error/st.warning. Other threads log them."""
+    _reporters.reporter = reporter or _log_report
+
+
+def _report(level: str, message: str):
+    getattr(_reporters, 'reporter', _log_report)(level, message)
+
+
+# --- Configuration ---
+MINS_CSV_PATH = "T5_League_Mins_2025.csv"
+REQUIRED_EVENT_COLUMNS = [
+    "league", "season", "gameId", "period", "minute", "second", "expandedMinute",
+    "type", "outcomeType", "teamId", "team", "playerId", "player",
+    "x", "y", "endX", "endY"
+]
+# Leagues and seasons come from the warehouse partitions; this only fixes the display order of known leagues
+LEAGUES = ['ESP-La Liga', 'ENG-Premier League', 'ITA-Serie A', 'GER-Bundesliga', 'FRA-Ligue 1'] # Match Parquet 'league' column
+EVENTS_PATH = halfspaces_warehouse.WAREHOUSE_PATH
+# Engine that computes the tables from raw events: 'pandas', or 'polars' (one lazy multi-threaded query,
+# see halfspaces_polars); both give the same tables
+ENGINES = ('pandas', 'polars')
+ENGINE = os.environ.get("HALFSPACES_ENGINE", "pandas")
+
+
+def league_seasons(data_path: str = EVENTS_PATH) -> dict:
+    """Discovered leagues (known leagues first, in LEAGUES order) mapped to their seasons, newest first."""
+    partitions = halfspaces_warehouse.discover_partitions(data_path)
+    order = {league: i for i, league in enumerate(LEAGUES)}
+    return {league: partitions[league] for league in sorted(partitions, key=lambda l: (order.get(l, len(order)), l))}
+
+
+def tables_fingerprint(league: str, season_internal, data_path: str = EVENTS_PATH,
+                       mins_csv_path: str = MINS_CSV_PATH, registry=None) -> str:
+    """Fingerprint of everything a league/season's tables depend on: its own partition, the minutes CSV and
+    the zone registry (default ZONES)."""
+    registry = ZONES if registry is None else registry
+    return halfspaces_store.combine_fingerprints((
+        halfspaces_store.combined_fingerprint(halfspaces_warehouse.partition_path(league, season_internal, data_path),
+                                              mins_csv_path),
+        registry.signature()))
+
+
+def events_fingerprint(data_path: str, league: str, season_internal):
+    """Fingerprint of the events a league/season load reads: its partition (or a legacy single file).
+
+    None if there is nothing to read.
+    """
+    fs, fs_path = fsspec.core.url_to_fs(data_path)
+    source = halfspaces_warehouse.partition_path(league, season_internal, data_path) if fs.isdir(fs_path) else data_path
+    try:
+        return halfspaces_store.source_fingerprint(source)
+    except FileNotFoundError:
+        return None
+
+
+def _events_key(a):
+    # The partition's fingerprint is part of the key, so events rewritten by ingest or a conversion are reloaded
+    fingerprint = events_fingerprint(a['data_path'], a['league'], a['season_internal'])
+    if fingerprint is None:
+        return None
+    return (a['data_path'], a['league'], a['season_internal'], fingerprint,
+            tuple(a['columns'] or ()), tuple(sorted(a['teams'] or ())), a['batch_size'])
+
+
+@halfspaces_profile.stage('load_events')
+@halfspaces_cache.memoize(_events_key)
+def load_data_filtered(data_path: str, league: str, season_internal: str, columns=None, teams=None,
+                       batch_size: int = 64_000):
+    """Loads data filtered by league and season directly from the source."""
+    # Use season_internal which should match the Parquet data format (e.g., '2324')
+    # file_id = "1tKjuZ-bDM7NYe-C8hWmIcCNkdqqt8Hfp"
+    # url = f"https://drive.google.com/uc?export=download&id={file_id}"
+
+    try:
+        # output = "Top_5_Leagues_23_24.parquet"
+        # gdown.download(url, output, quiet=False)
+
+        # Local paths and remote URLs alike; league/season are hive partitions of the warehouse
+        dataset = halfspaces_warehouse.open_dataset(data_path)
+
+        # The league/season predicate prunes whole partitions, and the rest is pushed down to row-group statistics
+        row_filter = (ds.field("league") == league) & (ds.field("season") == season_internal)
+        if teams is not None:
+            row_filter = row_filter & ds.field("team").isin(list(teams))
+
+        # Only project columns the file actually has (league/season are still usable in the filter)
+        if columns is not None:
+            columns = [col for col in columns if col in dataset.schema.names]
+
+        scanner = dataset.scanner(columns=columns, filter=row_filter, batch_size=batch_size)
+        # Stream record batches so only matching rows are ever held in memory,
+        # and cast each batch to the compact schema (dictionary strings, float32 coordinates) as it arrives
+        batches = [halfspaces_schema.compact_table(batch) for batch in scanner.to_batches() if batch.num_rows > 0]
+        if not batches:
+            return pd.DataFrame(columns=columns or scanner.projected_schema.names)
+        table = pa.Table.from_batches(batches)
+        df = table.to_pandas()
+
+        return df
+
+    except Exception as e:
+        _report('error', f"Failed to load data from Google Drive: {e}")
+        return pd.DataFrame()
+
+@halfspaces_profile.stage('add_carries')
+def add_carries(_game_df, thresholds=halfspaces_carries.DEFAULT_THRESHOLDS):
+    """Adds Carry events based on consecutive actions, plus action_id and possession_id columns."""
+    if _game_df.empty:
+        return _game_df # Return immediately if input is empty
+
+    # Ensure required columns exist before proceeding
+    required_cols = ['minute', 'second', 'gameId', 'teamId', 'endX', 'endY', 'x', 'y', 'period', 'playerId', 'team', 'player', 'expandedMinute']
+    if not all(col in _game_df.columns for col in required_cols):
+        _report('error', "Cannot add carries: Input data is missing required columns.")
+        return _game_df # Return original data
+
+    # Carries are found on each game's event arrays and slotted in by position, without re-sorting the table
+    return halfspaces_carries.add_carries(_game_df, thresholds)
+
+# --- Half-Space Classification ---
+GOAL_X, GOAL_Y = 120, 40
+DEFAULT_ZONES = halfspaces_zones.halfspace_registry()
+# Registry the stored tables are built with: HALFSPACES_ZONES names one ('halfspaces', 'standard') or a JSON file
+ZONES = halfspaces_zones.load_registry(os.environ.get("HALFSPACES_ZONES"))
+HALFSPACE_NAMES = ('rhs', 'lhs')
+
+# Action kinds returned by classify_actions
+KIND_OTHER, KIND_PASS, KIND_CARRY = 0, 1, 2
+KIND_SUFFIXES = {KIND_PASS: 'passes', KIND_CARRY: 'carries'}
+
+
+def classify_actions(x, y, end_x, end_y, event_type, outcome, registry=DEFAULT_ZONES):
+    """Fused kernel: action kind, start/end zone bitmasks and progressive flag for each raw (Opta 100x100) event."""
+    x = np.asarray(x, dtype=np.float64) * 1.2
+    y = np.asarray(y, dtype=np.float64) * .8
+    end_x = np.asarray(end_x, dtype=np.float64) * 1.2
+    end_y = np.asarray(end_y, dtype=np.float64) * .8
+
+    kind = np.full(len(x), KIND_OTHER, dtype=np.int8)
+    kind[np.asarray((event_type == 'Pass') & (outcome == 'Successful'), dtype=bool)] = KIND_PASS
+    kind[np.asarray(event_type == 'Carry', dtype=bool)] = KIND_CARRY
+
+    # Grid lookup keeps this O(1) per event however many zones are registered
+    start_zones = registry.classify(x, y)
+    end_zones = registry.classify(end_x, end_y)
+
+    # Progressive: ends at least 25% closer to the goal centre (compared on squared distances)
+    beginning_sq = np.square(GOAL_X - x) + np.square(GOAL_Y - y)
+    end_sq = np.square(GOAL_X - end_x) + np.square(GOAL_Y - end_y)
+    progressive = (beginning_sq > 1) & (end_sq < 0.75**2 * beginning_sq) # Avoid division by zero/small numbers
+
+    return kind, start_zones, end_zones, progressive
+
+
+def zone_count_columns(registry=DEFAULT_ZONES):
+    """Count columns produced per zone: progressive actions starting in it and going into it."""
+    columns = []
+    for name in registry.names:
+        for prefix in (f'prog_{name}', f'prog_into_{name}'):
+            columns += [f'{prefix}_passes', f'{prefix}_carries', f'{prefix}_actions']
+    return columns
+
+
+def row_indicator_columns(registry=DEFAULT_ZONES):
+    """Indicator columns that give a player a row: progressive actions starting in a half-space.
+
+    Other zones (and the into-counts) only add columns, so every registry yields the same rows.
+    """
+    names = [name for name in HALFSPACE_NAMES if name in registry] or registry.names
+    return [f'prog_{name}_{suffix}' for name in names for suffix in KIND_SUFFIXES.values()]
+
+
+@halfspaces_profile.stage('prepare_data')
+def prepare_data(data, registry=DEFAULT_ZONES):
+    """Scales coordinates and classifies passes/carries against the zone registry in a single pass."""
+    if data.empty:
+        return pd.DataFrame() # Return empty df
+
+    # Check for coordinate columns
+    required_cols = ['x', 'y', 'endX', 'endY', 'type', 'outcomeType']
+    if not all(col in data.columns for col in required_cols):
+        _report('error', "Cannot prepare data: Coordinate/type columns (x, y, endX, endY, type, outcomeType) missing.")
+        return pd.DataFrame()
+
+    kind, start_zones, end_zones, progressive = classify_actions(
+        data['x'], data['y'], data['endX'], data['endY'], data['type'], data['outcomeType'], registry
+    )
+    keep = (kind != KIND_OTHER) & ((start_zones | end_zones) != 0)
+
+    # Only passes/carries touching a zone are copied out of the event frame
+    actions = data.loc[keep].copy()
+    actions['x'] = actions['x']*1.2
+    actions['y'] = actions['y']*.8
+    actions['endX'] = actions['endX']*1.2
+    actions['endY'] = actions['endY']*.8
+    actions['kind'] = kind[keep]
+    actions['start_zones'] = start_zones[keep]
+    actions['end_zones'] = end_zones[keep]
+    actions['progressive'] = progressive[keep]
+
+    return actions
+
+
+GROUP_COLS = ['playerId', 'player', 'team']
+RHS_ACTION_COLS = ['prog_rhs_passes', 'prog_rhs_carries', 'prog_rhs_actions']
+LHS_ACTION_COLS = ['prog_lhs_passes', 'prog_lhs_carries', 'prog_lhs_actions']
+
+
+def process_halfspace_data(actions, mins_data, registry=DEFAULT_ZONES):
+    """Groups actions, merges, and calculates p90 stats."""
+    counts_df, *prog_frames = count_zone_actions(actions, registry)
+    return (attach_minutes(counts_df, mins_data, registry), *prog_frames)
+
+
+@halfspaces_profile.stage('count_zone_actions')
+def count_zone_actions(actions, registry=DEFAULT_ZONES):
+    """Per-(playerId, team) progressive action counts for every zone, plus the four plotted action frames."""
+    group_cols = GROUP_COLS
+    count_cols = zone_count_columns(registry)
+    rhs_action_cols = RHS_ACTION_COLS
+    lhs_action_cols = LHS_ACTION_COLS
+
+    # --- Progressive Actions ---
+    if actions.empty or not all(col in actions.columns for col in group_cols + ['kind', 'start_zones', 'end_zones', 'progressive']):
+        prog_actions = pd.DataFrame(columns=group_cols + ['kind', 'start_zones', 'end_zones'])
+    else:
+        prog_actions = actions[actions['progressive'].to_numpy()]
+    kind = prog_actions['kind'].to_numpy()
+    start_zones = prog_actions['start_zones'].to_numpy(dtype=np.uint64)
+    end_zones = prog_actions['end_zones'].to_numpy(dtype=np.uint64)
+
+    # Per-row indicators for every zone/direction/kind, summed in one groupby
+    indicators = {}
+    for name in registry.names:
+        starts_in = registry.membership(start_zones, name)
+        ends_in = registry.membership(end_zones, name)
+        for kind_code, suffix in KIND_SUFFIXES.items():
+            is_kind = kind == kind_code
+            indicators[f'prog_{name}_{suffix}'] = (is_kind & starts_in).astype(np.int32)
+            indicators[f'prog_into_{name}_{suffix}'] = (is_kind & ends_in & ~starts_in).astype(np.int32)
+
+    # The plotted frames: progressive passes/carries starting in each half-space
+    def starting_in(name, kind_code):
+        if name not in registry:
+            return prog_actions.iloc[0:0]
+        return prog_actions[(kind == kind_code) & registry.membership(start_zones, name)]
+    prog_rhs_passes = starting_in('rhs', KIND_PASS)
+    prog_lhs_passes = starting_in('lhs', KIND_PASS)
+    prog_rhs_carries = starting_in('rhs', KIND_CARRY)
+    prog_lhs_carries = starting_in('lhs', KIND_CARRY)
+
+    # --- Group by Player (one groupby for all zone counts) ---
+    indicator_df = pd.DataFrame(indicators, index=prog_actions.index)
+    row_cols = row_indicator_columns(registry)
+    counted = indicator_df[row_cols].to_numpy().any(axis=1) if len(indicators) else np.zeros(len(indicator_df), dtype=bool)
+    combined_prog_df = (
+        pd.concat([prog_actions[group_cols], indicator_df], axis=1)[counted]
+        .groupby(group_cols, observed=True).sum()
+        .astype(int)
+        .reset_index()
+    )
+    for name in registry.names:
+        for prefix in (f'prog_{name}', f'prog_into_{name}'):
+            combined_prog_df[f'{prefix}_actions'] = combined_prog_df[f'{prefix}_passes'] + combined_prog_df[f'{prefix}_carries']
+    for col in rhs_action_cols + lhs_action_cols:
+        if col not in combined_prog_df.columns:
+            combined_prog_df[col] = 0
+    combined_prog_df['prog_HS_actions'] = combined_prog_df['prog_rhs_actions'] + combined_prog_df['prog_lhs_actions']
+    zone_cols = [col for col in count_cols if col not in rhs_action_cols + lhs_action_cols]
+    combined_prog_df = combined_prog_df[group_cols + rhs_action_cols + lhs_action_cols + ['prog_HS_actions'] + zone_cols]
+
+    return combined_prog_df, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries
+
+
+def merge_counts(*counts_dfs):
+    """Adds count tables from count_zone_actions together (e.g. stored season + newly ingested games)."""
+    counts_dfs = [df for df in counts_dfs if not df.empty]
+    if not counts_dfs:
+        return pd.DataFrame(columns=GROUP_COLS)
+    if len(counts_dfs) == 1:
+        return counts_dfs[0]
+    # Categorical columns carry per-load categories; plain strings group cleanly across sources
+    counts_dfs = [df.astype({col: str for col in ['player', 'team'] if isinstance(df[col].dtype, pd.CategoricalDtype)})
+                  for df in counts_dfs]
+    merged = pd.concat(counts_dfs, ignore_index=True)
+    count_cols = [col for col in merged.columns if col not in GROUP_COLS]
+    merged[count_cols] = merged[count_cols].fillna(0)
+    merged = merged.groupby(GROUP_COLS, sort=False)[count_cols].sum().astype(int).reset_index()
+    return merged.astype({'player': 'category', 'team': 'category'})
+
+
+@halfspaces_profile.stage('attach_minutes')
+def attach_minutes(counts_df, mins_data, registry=DEFAULT_ZONES):
+    """Joins minutes onto a count table and derives the p90 columns (GKs dropped) and their league percentiles."""
+    group_cols = GROUP_COLS
+    count_cols = zone_count_columns(registry)
+    combined_prog_df = counts_df.copy()
+
+    # --- Merge with Minutes Data ---
+    # Initialize p90 cols to avoid errors if merge fails or mins_data is bad
+    combined_prog_df['90s'] = np.nan
+    combined_prog_df['position'] = 'Unknown'
+    combined_prog_df['prog_act_HS_p90'] = 0.0
+    combined_prog_df['prog_rhs_act_p90'] = 0.0
+    combined_prog_df['prog_lhs_act_p90'] = 0.0
+    # Every zone also gets from/into p90 columns (for 'rhs'/'lhs' these are the ones above)
+    p90_sources = {col[:-len('_actions')] + '_act_p90': col for col in count_cols if col.endswith('_actions')}
+    for p90_col in p90_sources:
+        combined_prog_df[p90_col] = 0.0
+
+    if not mins_data.empty:
+        mins_cols_needed = ['player', 'team', '90s', 'position']
+        if all(col in mins_data.columns for col in mins_cols_needed):
+            # Minutes rows are resolved to playerIds once; 90s/position are then gathered by (playerId, team)
+            minutes_index = halfspaces_minutes.MinutesIndex(mins_data, combined_prog_df[group_cols])
+            report_minutes_conflicts(minutes_index)
+            nineties, positions = minutes_index.lookup(combined_prog_df['playerId'], combined_prog_df['team'])
+            combined_prog_df['90s'] = nineties
+            combined_prog_df['position'] = positions
+
+            # --- Calculate p90 Metrics --- (as plain array divisions; unknown or zero 90s give 0)
+            if np.isfinite(nineties).any():
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    for p90_col, actions_col in {'prog_act_HS_p90': 'prog_HS_actions',
+                                                 'prog_rhs_act_p90': 'prog_rhs_actions',
+                                                 'prog_lhs_act_p90': 'prog_lhs_actions', **p90_sources}.items():
+                        p90 = combined_prog_df[actions_col].to_numpy(dtype=float) / nineties
+                        combined_prog_df[p90_col] = np.where(np.isfinite(p90), p90, 0.0)
+        else:
+            missing_mins_cols = [col for col in mins_cols_needed if col not in mins_data.columns]
+            _report('warning', f"Minutes data missing columns: {missing_mins_cols}. Cannot calculate p90 stats.")
+    else:
+        _report('warning', "Minutes data is empty. Cannot calculate p90 stats.")
+
+
+    # --- Final Filtering & Cleanup ---
+    if 'position' in combined_prog_df.columns:
+        # Ensure position column is not all NaN before filtering
+        if combined_prog_df['position'].notna().any():
+             combined_prog_df = combined_prog_df[combined_prog_df['position'] != 'GK'].copy()
+
+    # Rows are per (playerId, team) so players who moved mid-season keep one row per club; the minutes
+    # gather adds no rows, this only guards against one id appearing under two spellings in the events
+    if 'playerId' in combined_prog_df.columns and combined_prog_df['playerId'].notna().any():
+         combined_prog_df = combined_prog_df.drop_duplicates(subset=['playerId', 'team'], keep='first')
+    elif all(col in combined_prog_df.columns for col in ['player', 'team']):
+         combined_prog_df = combined_prog_df.drop_duplicates(subset=['player', 'team'], keep='first')
+
+    # League percentiles/ranks by position are part of the stored table, so display time only reads them
+    return halfspaces_percentiles.add_position_percentiles(combined_prog_df)
+
+
+def report_minutes_conflicts(minutes_index, limit: int = 5):
+    """Warns about minutes rows that could not be tied to a single event player."""
+    conflicts = minutes_index.conflicts
+    if conflicts.empty:
+        return
+    examples = "; ".join(f"{row.player} ({row.team}): {row.reason}" for row in conflicts.head(limit).itertuples())
+    more = f" and {len(conflicts) - limit} more" if len(conflicts) > limit else ""
+    _report('warning', f"{len(conflicts)} minutes rows could not be matched to a single player: {examples}{more}.")
+
+
+@halfspaces_profile.stage('read_minutes')
+@halfspaces_cache.memoize(lambda a: (a['mins_csv_path'], halfspaces_store.source_fingerprint(a['mins_csv_path'])))
+def read_minutes_data(mins_csv_path: str):
+    """Reads the minutes CSV and derives the 90s/position columns if absent."""
+    mins_data = pd.read_csv(mins_csv_path)
+    # Essential preprocessing
+    missing = [col for col in ['Mins', 'player', 'team'] if col not in mins_data.columns]
+    if missing:
+        raise ValueError(f"Minutes data file is missing required columns {missing}.")
+    if '90s' not in mins_data.columns:
+        mins_data['90s'] = mins_data['Mins'] / 90.0
+    if 'position' not in mins_data.columns:
+        mins_data['position'] = 'Unknown'
+    return mins_data
+
+
+def compute_halfspace_counts(data, carry_thresholds=halfspaces_carries.DEFAULT_THRESHOLDS, registry=DEFAULT_ZONES):
+    """Runs carries -> prepare -> count on events; carries never span games, so any set of whole games works."""
+    data_with_carries = add_carries(data, carry_thresholds)
+    actions = prepare_data(data_with_carries, registry)
+    del data_with_carries; gc.collect()
+    counts_df, *prog_frames = count_zone_actions(actions, registry)
+    # Action frames are stored sorted by playerId so PlayerIndex can slice them without re-sorting
+    return (counts_df, *(halfspaces_index.sort_by_player(frame) for frame in prog_frames))
+
+
+def compute_halfspace_tables(data, mins_data, registry=DEFAULT_ZONES):
+    """Runs the full carries -> prepare -> process pipeline on a league/season's events."""
+    counts_df, *prog_frames = compute_halfspace_counts(data, registry=registry)
+    return (index_by_90s(attach_minutes(counts_df, mins_data, registry)), *prog_frames)
+
+
+def index_by_90s(combined_prog_df):
+    """Sorts the results table by 90s (NaNs last) so the minimum-90s filter is a binary search."""
+    if combined_prog_df.empty or '90s' not in combined_prog_df.columns:
+        return combined_prog_df
+    return combined_prog_df.sort_values('90s', na_position='last', kind='stable').reset_index(drop=True)
+
+
+def filter_results(indexed_df, selected_teams, min_90s, league_teams=None):
+    """Applies the team and minimum-90s filters to a table sorted by index_by_90s."""
+    if indexed_df.empty or '90s' not in indexed_df.columns:
+        return indexed_df
+    nineties = indexed_df['90s'].to_numpy(dtype=float)
+    n_valid = len(nineties) - int(np.isnan(nineties).sum()) # NaNs are sorted to the end
+    start = np.searchsorted(nineties[:n_valid], min_90s, side='left')
+    view = indexed_df.iloc[start:n_valid]
+    # Skip the team mask entirely when the whole league is selected
+    if league_teams is None or set(selected_teams) != set(league_teams):
+        view = view[view['team'].isin(selected_teams)]
+    return view
+
+
+@halfspaces_profile.stage('load_halfspace_tables')
+@halfspaces_cache.memoize(lambda a: (a['league'], a['season_internal'], a['fingerprint'], a['store_dir'],
+                                      (ZONES if a['registry'] is None else a['registry']).signature()))
+def load_halfspace_tables(data_path: str, league: str, season_internal, fingerprint: str,
+                          store_dir: str = halfspaces_store.STORE_DIR, engine: str = None, registry=None):
+    """Loads a league/season's precomputed tables from the store, rebuilding them if the source changed.
+
+    Returns the league's teams and (combined_prog_df, *four PlayerIndex action indexes). engine picks how a
+    rebuild computes them (default ENGINE) and registry the zones they count (default ZONES); fingerprint
+    should come from tables_fingerprint with the same registry.
+    """
+    registry = ZONES if registry is None else registry
+    zones = registry.signature()
+    with halfspaces_profile.span('read_store'):
+        entry = halfspaces_store.load_entry(league, season_internal, fingerprint, store_dir, zones)
+    halfspaces_profile.note('store', 'miss' if entry is None else 'hit')
+    if entry is not None:
+        meta, (combined_prog_df, *prog_frames) = entry
+        return meta['teams'], (combined_prog_df, *(halfspaces_index.PlayerIndex(frame) for frame in prog_frames))
+
+    # Stale or missing entry: recompute from raw events once, then persist for later processes
+    engine = engine or ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}. Choose from {list(ENGINES)}.")
+    if engine == 'polars':
+        import halfspaces_polars # Polars is only imported when selected
+        result = halfspaces_polars.compute_halfspace_counts(data_path, league, season_internal, registry)
+        if result is None:
+            return [], None
+        teams, game_ids, counts_df, *prog_frames = result
+    else:
+        data = load_data_filtered(data_path, league, season_internal, columns=REQUIRED_EVENT_COLUMNS)
+        if data.empty:
+            return [], None
+        teams = sorted(data['team'].unique())
+        game_ids = data['gameId'].dropna().unique()
+        counts_df, *prog_frames = compute_halfspace_counts(data, registry=registry)
+        del data; gc.collect()
+    frames = (index_by_90s(attach_minutes(counts_df, read_minutes_data(MINS_CSV_PATH), registry)), *prog_frames)
+
+    try:
+        with halfspaces_profile.span('write_store'):
+            halfspaces_store.write_entry(league, season_internal, fingerprint, frames, teams, store_dir,
+                                         counts=counts_df, game_ids=game_ids,
+                                         heatmaps=halfspaces_heatmaps.HeatmapGrids.from_frames(*prog_frames).to_arrays(),
+                                         zones=zones)
+    except OSError as e:
+        _report('warning', f"Could not save precomputed tables: {e}")
+    combined_prog_df, *prog_frames = frames
+    return teams, (combined_prog_df, *(halfspaces_index.PlayerIndex(frame) for frame in prog_frames))
+
+
+@halfspaces_profile.stage('load_heatmaps')
+@halfspaces_cache.memoize(lambda a: (a['league'], a['season_internal'], a['fingerprint'], a['store_dir']))
+def load_heatmaps(data_path: str, league: str, season_internal, fingerprint: str,
+                  store_dir: str = halfspaces_store.STORE_DIR, registry=None):
+    """A league/season's per-player location grids, or None without events.
+
+    Read from the store alongside the tables; binned from the action frames if the entry predates them.
+    """
+    teams, frames = load_halfspace_tables(data_path, league, season_internal, fingerprint, store_dir,
+                                          registry=registry)
+    if frames is None:
+        return None
+    zones = (ZONES if registry is None else registry).signature()
+    arrays = None
+    if halfspaces_store.is_current(league, season_internal, fingerprint, store_dir, zones):
+        arrays = halfspaces_store.load_arrays(league, season_internal, halfspaces_store.HEATMAPS_NAME, store_dir,
+                                              zones)
+    if arrays is not None:
+        return halfspaces_heatmaps.HeatmapGrids.from_arrays(arrays)
+    return halfspaces_heatmaps.HeatmapGrids.from_frames(*frames[1:])
+
+
+# --- Cross-League Percentiles ---
+def current_entries(data_path: str, season_internal, store_dir: str = halfspaces_store.STORE_DIR, registry=None):
+    """(league, fingerprint, zones) of every league of the season whose stored tables match its partition."""
+    zones = (ZONES if registry is None else registry).signature()
+    entries = []
+    for league, seasons in league_seasons(data_path).items():
+        if season_internal in seasons:
+            fingerprint = tables_fingerprint(league, season_internal, data_path, registry=registry)
+            if halfspaces_store.is_current(league, season_internal, fingerprint, store_dir, zones):
+                entries.append((league, fingerprint, zones))
+    return tuple(entries)
+
+
+def _season_table(name: str, season_internal, entries, store_dir: str, build):
+    """Loads a season-wide table from the store, or builds it with build() and saves it.
+
+    The table is keyed by a fingerprint of the entries it is built from, so it is rebuilt only when a
+    league is added or rebuilt.
+    """
+    fingerprint = halfspaces_store.combine_fingerprints(f"{league}:{fp}" for league, fp, _ in entries)
+    if entries:
+        name = f"{name}__{entries[0][2]}" # One table per zone registry, like the entries
+    table = halfspaces_store.load_season_table(name, season_internal, fingerprint, store_dir)
+    halfspaces_profile.note('store', 'miss' if table is None else 'hit')
+    if table is None:
+        table = build()
+        try:
+            halfspaces_store.write_season_table(name, season_internal, fingerprint, table, store_dir)
+        except OSError as e:
+            _report('warning', f"Could not save {name} for {season_internal}: {e}")
+    return table
+
+
+@halfspaces_profile.stage('cross_league_distribution')
+@halfspaces_cache.memoize(lambda a: (a['season_internal'], a['entries'], a['store_dir']))
+def cross_league_distribution(season_internal, entries, store_dir: str = halfspaces_store.STORE_DIR):
+    """Reference pools of every p90 metric by position over the stored league tables in entries.
+
+    Built from the small stored tables only, never the events.
+    """
+    def build():
+        tables = [halfspaces_store.load_frame(league, season_internal, "combined_prog_df", store_dir, zones)
+                  for league, _, zones in entries]
+        return halfspaces_percentiles.distribution([table for table in tables if table is not None])
+
+    return _season_table(halfspaces_store.DISTRIBUTION_NAME, season_internal, entries, store_dir, build)
+
+
+@halfspaces_profile.stage('similarity_index')
+@halfspaces_cache.memoize(lambda a: (a['season_internal'], a['entries'], a['store_dir']))
+def similarity_index(season_internal, entries, store_dir: str = halfspaces_store.STORE_DIR):
+    """KD-tree over the half-space profiles of every player in the stored league tables in entries."""
+    def build():
+        parts = []
+        for league, _, zones in entries:
+            frames = [halfspaces_store.load_frame(league, season_internal, name, store_dir, zones)
+                      for name in halfspaces_store.FRAME_NAMES]
+            if all(frame is not None for frame in frames):
+                parts.append(halfspaces_similarity.player_features(*frames).assign(league=league))
+        if not parts:
+            return pd.DataFrame(columns=['playerId', 'player', 'team', 'position', '90s', 'league'])
+        return pd.concat(parts, ignore_index=True)
+
+    features = _season_table(halfspaces_store.SIMILARITY_FEATURES_NAME, season_internal, entries, store_dir, build)
+    return halfspaces_similarity.SimilarityIndex(features)
+
+
+# --- Warm-Up ---
+_warm_ups = {} # (data_path, league, season, store_dir) -> thread
+_warm_ups_lock = threading.Lock()
+
+
+def warm_up(data_path: str, league: str, season_internal, store_dir: str = halfspaces_store.STORE_DIR,
+            registry=None):
+    """Loads a league/season's tables, heatmaps, cross-league pools and similarity index into the memory cache."""
+    fingerprint = tables_fingerprint(league, season_internal, data_path, registry=registry)
+    _, frames = load_halfspace_tables(data_path, league, season_internal, fingerprint, store_dir, registry=registry)
+    if frames is None:
+        return
+    load_heatmaps(data_path, league, season_internal, fingerprint, store_dir, registry=registry)
+    entries = current_entries(data_path, season_internal, store_dir, registry=registry)
+    cross_league_distribution(season_internal, entries, store_dir)
+    similarity_index(season_internal, entries, store_dir)
+
+
+def start_warm_up(data_path: str, league: str, season_internal, store_dir: str = halfspaces_store.STORE_DIR,
+                  then=None):
+    """Runs warm_up (followed by then(), if given) in a daemon thread, once per process and league/season."""
+    key = (data_path, league, season_internal, store_dir)
+    with _warm_ups_lock:
+        if key in _warm_ups:
+            return _warm_ups[key]
+
+        def run():
+            try:
+                warm_up(data_path, league, season_internal, store_dir)
+                if then is not None:
+                    then()
+            except Exception:
+                logger.exception("Warm-up of %s %s failed", league, season_internal)
+
+        thread = threading.Thread(target=run, name=f"warm-up {league} {season_internal}", daemon=True)
+        _warm_ups[key] = thread
+        thread.start()
+        return thread
+
+
+def wait_for_warm_up(data_path: str, league: str, season_internal, store_dir: str = halfspaces_store.STORE_DIR):
+    """Blocks until a running warm-up of this league/season is done, so its tables are not computed twice."""
+    with _warm_ups_lock:
+        thread = _warm_ups.get((data_path, league, season_internal, store_dir))
+    if thread is not None and thread is not threading.current_thread():
+        thread.join()
+
+# --- END OF FILE halfspaces_pipeline.py ---
@@ -0,0 +1,239 @@
+# --- START OF FILE halfspaces_plot.py ---
+"""Pitch rendering: the pitch is drawn once per figure and only a player's artists are swapped per plot.
+
+matplotlib and mplsoccer take most of the app's import time, so they are only imported (and the title
+font registered) when the first figure is built, or ahead of time by preload().
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import halfspaces_heatmaps
+
+logger = logging.getLogger(__name__)
+
+PITCH_COLOR = '#1e1e1e'
+PASS_COLOR = '#24a8ff'
+CARRY_COLOR = '#FF5959'
+TITLE_FONT = 'Arial Rounded MT Bold'
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "Arial Rounded Bold.ttf")
+HEATMAP_CMAP = 'YlOrRd'
+
+# Output settings, overridable per deployment
+DEFAULT_DPI = int(os.environ.get("HALFSPACES_PLOT_DPI", "300"))
+# Streamlit downsizes images wider than 1460px on every rerun, so on-screen plots render at
+# 96 dpi (15in -> 1440px) and are served as-is
+DISPLAY_DPI = int(os.environ.get("HALFSPACES_DISPLAY_DPI", "96"))
+DEFAULT_FORMAT = os.environ.get("HALFSPACES_PLOT_FORMAT", "png")
+MIME_TYPES = {'png': 'image/png', 'webp': 'image/webp', 'svg': 'image/svg+xml'}
+# Processes rendering comparison grids (matplotlib is not thread-safe, so tiles render in separate processes)
+PLOT_WORKERS = int(os.environ.get("HALFSPACES_PLOT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+_stack_lock = threading.Lock()
+_stack = None
+
+
+def _plotting_stack():
+    """(Figure, Pitch), importing matplotlib/mplsoccer and registering the title font on first use."""
+    global _stack
+    with _stack_lock:
+        if _stack is None:
+            import matplotlib
+            from matplotlib import font_manager
+            from matplotlib.figure import Figure
+            from mplsoccer import Pitch
+
+            if os.path.exists(FONT_PATH):
+                font_manager.fontManager.addfont(FONT_PATH)
+                matplotlib.rcParams['font.family'] = font_manager.FontProperties(fname=FONT_PATH).get_name()
+            else:
+                logger.warning("Font file %s not found, using the default font", FONT_PATH)
+            _stack = (Figure, Pitch)
+    return _stack
+
+
+class PitchRenderer:
+    """Keeps one drawn pitch figure and renders player actions on top of it."""
+
+    def __init__(self, legend: bool = True):
+        self._legend = legend # Pass/carry colour key under the pitch
+        self._lock = threading.Lock() # matplotlib figures are not thread-safe
+        self._fig = None
+        self._ax = None
+        self._pitch = None
+        self._static_artists = set()
+
+    def _build(self):
+        Figure, Pitch = _plotting_stack()
+        fig = Figure(figsize=(15, 10), facecolor=PITCH_COLOR)
+        ax = fig.subplots()
+        pitch = Pitch(pitch_type='statsbomb', pitch_color=PITCH_COLOR, line_color='#FFFFFF', line_zorder=2)
+        pitch.draw(ax=ax)
+        ax.invert_yaxis() # StatsBomb pitch vertical orientation
+
+        # Watermark - REVERTED
+        ax.text(60, 78, '@pranav_m28', fontsize=17, color='white', alpha=0.75, ha='center', va='center', zorder=1)
+        if self._legend:
+            ax.text(48, 84, 'Progressive Carries', font=TITLE_FONT, fontsize=16, color=CARRY_COLOR, ha='center', va='center', fontweight='bold')
+            ax.text(74, 84, 'Progressive Passes', font=TITLE_FONT, fontsize=16, color=PASS_COLOR, ha='center', va='center', fontweight='bold')
+
+        # Lay the figure out once with a two-line placeholder title, matching the real titles
+        self._set_title(ax, 'Player\nActions p90')
+        fig.tight_layout()
+
+        self._fig, self._ax, self._pitch = fig, ax, pitch
+        self._static_artists = set(ax.get_children())
+
+    @staticmethod
+    def _set_title(ax, title_text):
+        ax.set_title(title_text, font=TITLE_FONT, fontsize=24, color='white', fontweight='bold', pad=20) # Use pad for spacing
+
+    def preload(self):
+        """Builds the pitch figure now rather than on the first render."""
+        with self._lock:
+            if self._fig is None:
+                self._build()
+
+    def render(self, title_text, pass_frames, carry_frames, dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT) -> bytes:
+        """Draws the given pass/carry frames (x, y, endX, endY) on the cached pitch and returns image bytes."""
+        def draw(ax, pitch):
+            for passes in pass_frames:
+                pitch.lines(passes.x, passes.y, passes.endX, passes.endY,
+                            lw=3, transparent=True, comet=True, color=PASS_COLOR, ax=ax, alpha=1)
+                pitch.scatter(passes.endX, passes.endY, s=40, c=PASS_COLOR, edgecolors='none', ax=ax, zorder=2, alpha=1)
+            for carries in carry_frames:
+                pitch.lines(carries.x, carries.y, carries.endX, carries.endY,
+                            ls='dashed', lw=3, color=CARRY_COLOR, ax=ax)
+                pitch.scatter(carries.endX, carries.endY, s=40, c=CARRY_COLOR, edgecolors='none', ax=ax, alpha=1)
+
+        return self.render_with(title_text, draw, dpi=dpi, fmt=fmt)
+
+    def render_with(self, title_text, draw, dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT) -> bytes:
+        """Calls draw(ax, pitch) on the cached pitch, saves the figure and strips the drawn artists again."""
+        if fmt not in MIME_TYPES:
+            raise ValueError(f"Unsupported plot format '{fmt}'. Choose from {sorted(MIME_TYPES)}.")
+
+        with self._lock:
+            if self._fig is None:
+                self._build()
+            ax, pitch = self._ax, self._pitch
+            try:
+                draw(ax, pitch)
+                self._set_title(ax, title_text)
+
+                buffer = io.BytesIO()
+                self._fig.savefig(buffer, format=fmt, facecolor=PITCH_COLOR, edgecolor='none', dpi=dpi)
+                return buffer.getvalue()
+            finally:
+                # Strip this player's artists so the pitch is clean for the next render
+                for artist in set(ax.get_children()) - self._static_artists:
+                    artist.remove()
+
+
+_RENDERER = PitchRenderer()
+_HEATMAP_RENDERER = PitchRenderer(legend=False)
+
+
+def preload():
+    """Imports the plotting stack and draws both cached pitches, e.g. from a warm-up thread."""
+    _RENDERER.preload()
+    _HEATMAP_RENDERER.preload()
+
+
+def render_player_actions(title_text, pass_frames, carry_frames, dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT) -> bytes:
+    """Renders a player's progressive passes/carries with the shared pitch renderer."""
+    return _RENDERER.render(title_text, pass_frames, carry_frames, dpi=dpi, fmt=fmt)
+
+
+def render_heatmap(title_text, grid, dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT) -> bytes:
+    """Renders an (x, y) count grid from halfspaces_heatmaps over the pitch; empty cells stay transparent."""
+    def draw(ax, pitch):
+        ax.pcolormesh(halfspaces_heatmaps.X_EDGES, halfspaces_heatmaps.Y_EDGES, np.ma.masked_equal(grid, 0).T, cmap=HEATMAP_CMAP, alpha=0.85,
+                      shading='flat', zorder=1)
+
+    return _HEATMAP_RENDERER.render_with(title_text, draw, dpi=dpi, fmt=fmt)
+
+
+def player_plot_args(player_data, player_id, prog_rhs_passes, prog_lhs_passes,
+                     prog_rhs_carries, prog_lhs_carries, action_type):
+    """(title, pass frames, carry frames) of a player's plot, the frames cut down to their coordinates.
+
+    The prog_* arguments are PlayerIndex objects, so each lookup is an O(k) slice.
+    """
+    # Slice out the actions for the specific player ID, made for the club of this table row
+    team = player_data.get('team')
+    player_prog_rhs_passes = prog_rhs_passes.get(player_id, team)
+    player_prog_lhs_passes = prog_lhs_passes.get(player_id, team)
+    player_prog_rhs_carries = prog_rhs_carries.get(player_id, team)
+    player_prog_lhs_carries = prog_lhs_carries.get(player_id, team)
+
+    # Plot based on selected action type
+    if action_type == "Right Half-Space Actions":
+        pass_frames, carry_frames = [player_prog_rhs_passes], [player_prog_rhs_carries]
+        # Title - REVERTED
+        title_text = f'{player_data["player"]} - Right Half-Space Progressive Actions\nRight Half-Space Actions p90: {player_data["prog_rhs_act_p90"]:.2f}'
+
+    elif action_type == "Left Half-Space Actions":
+        pass_frames, carry_frames = [player_prog_lhs_passes], [player_prog_lhs_carries]
+        # Title - REVERTED
+        title_text = f'{player_data["player"]} - Left Half-Space Progressive Actions\nLeft Half-Space Actions p90: {player_data["prog_lhs_act_p90"]:.2f}'
+
+    else: # "All Half-Space Actions"
+        pass_frames = [player_prog_rhs_passes, player_prog_lhs_passes]
+        carry_frames = [player_prog_rhs_carries, player_prog_lhs_carries]
+        # Title - REVERTED
+        title_text = f'{player_data["player"]} - Half-Space Progressive Actions\nTotal Half-Space Actions p90: {player_data["prog_act_HS_p90"]:.2f}'
+
+    coords = ['x', 'y', 'endX', 'endY'] # All the renderer reads; keeps the frames cheap to send to a worker
+    return (title_text, [frame[coords] for frame in pass_frames], [frame[coords] for frame in carry_frames])
+
+
+def plot_player_halfspace_actions(player_data, player_id, prog_rhs_passes, prog_lhs_passes,
+                                   prog_rhs_carries, prog_lhs_carries, action_type,
+                                   dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT) -> bytes:
+    """Generates the pitch plot for a selected player and returns the raw image bytes."""
+    # The pitch itself is drawn once and reused; only this player's lines/points are rendered
+    return render_player_actions(*player_plot_args(player_data, player_id, prog_rhs_passes, prog_lhs_passes,
+                                                   prog_rhs_carries, prog_lhs_carries, action_type),
+                                 dpi=dpi, fmt=fmt)
+
+
+# --- Concurrent Rendering ---
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def _preload_worker():
+    _RENDERER.preload()
+
+
+def _render_pool():
+    """The process pool shared by every session; each worker draws its pitch once when it starts."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: the app server already runs threads, which a fork would copy mid-state
+            _pool = ProcessPoolExecutor(max_workers=PLOT_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_preload_worker)
+        return _pool
+
+
+def render_many(jobs, dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT):
+    """Renders {key: (title, pass frames, carry frames)} in the process pool, yielding (key, image bytes)
+    in completion order. A player_plot_args() result is one job."""
+    if not jobs:
+        return
+    pool = _render_pool()
+    futures = {pool.submit(render_player_actions, title, pass_frames, carry_frames, dpi, fmt): key
+               for key, (title, pass_frames, carry_frames) in jobs.items()}
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+# --- END OF FILE halfspaces_plot.py ---
@@ -0,0 +1,246 @@
+# --- START OF FILE halfspaces_polars.py ---
+"""Polars engine: carries, zone classification and per-player counts as lazy queries over the warehouse.
+
+The event query scans the league/season partition's Parquet files itself, so only the columns it uses are
+read, and runs multi-threaded on all cores. Its output matches the pandas path (compute_halfspace_counts);
+see compare_engines.
+"""
+
+import fsspec
+import numpy as np
+import pandas as pd
+import polars as pl
+
+import halfspaces_carries
+import halfspaces_pipeline
+import halfspaces_profile
+import halfspaces_store
+import halfspaces_warehouse
+from halfspaces_pipeline import (DEFAULT_ZONES, GOAL_X, GOAL_Y, GROUP_COLS, KIND_CARRY, KIND_OTHER, KIND_PASS,
+                                 KIND_SUFFIXES, LHS_ACTION_COLS, RHS_ACTION_COLS)
+
+EVENT_COLUMNS = [col for col in halfspaces_pipeline.REQUIRED_EVENT_COLUMNS if col not in ('league', 'season')]
+COORDINATES = ['x', 'y', 'endX', 'endY']
+CATEGORICAL_COLUMNS = ['period', 'type', 'outcomeType', 'team', 'player']
+
+
+def scan_events(data_path: str, league: str, season_internal):
+    """Lazy scan of one league/season's events, or None if the warehouse has no such partition."""
+    fs, fs_path = fsspec.core.url_to_fs(data_path)
+    if not fs.isdir(fs_path):
+        # A legacy file keeps league/season as ordinary columns
+        return pl.scan_parquet(data_path).filter(
+            (pl.col('league') == league) & (pl.col('season').cast(pl.String) == str(season_internal)))
+    partition = halfspaces_warehouse.partition_path(league, season_internal, data_path)
+    if not fs.isdir(fsspec.core.url_to_fs(partition)[1]):
+        return None
+    return pl.scan_parquet(f"{partition}/**/*.parquet", hive_partitioning=False)
+
+
+def _changed(col: str):
+    # True where a row differs from the previous one; the first row and missing values always count as changed
+    return (pl.col(col) != pl.col(col).shift(1)).fill_null(True)
+
+
+def with_carries(events, thresholds=halfspaces_carries.DEFAULT_THRESHOLDS):
+    """Adds Carry rows and possession_id, as halfspaces_carries.add_carries does.
+
+    Rows are not physically interleaved; each gets an _order key (event 2i, its carry 2i + 1) that places
+    the carry directly after the event it starts from.
+    """
+    events = (
+        events.select(EVENT_COLUMNS)
+        .with_columns(pl.col(COORDINATES).cast(pl.Float32), pl.col('type', 'outcomeType').cast(pl.String))
+        .with_row_index('_order')
+        .with_columns(_order=pl.col('_order').cast(pl.Int64) * 2,
+                      time_seconds=pl.col('minute').cast(pl.Float64) * 60 + pl.col('second'))
+    )
+    # Window expressions evaluate per group, so the run counters are materialized before .over() uses them
+    events = events.with_columns(_sequence=(_changed('gameId') | _changed('period') | _changed('teamId')).cum_sum(),
+                                 _game_run=_changed('gameId').cum_sum())
+    events = events.with_columns(
+        possession_id=(pl.col('_sequence') - pl.col('_sequence').first().over('_game_run')).cast(pl.Int32)
+    ).drop('_sequence', '_game_run')
+
+    nxt = {col: pl.col(col).shift(-1) for col in ['gameId', 'teamId', 'period', 'x', 'y', 'time_seconds']}
+    dist_sq = ((pl.col('endX').cast(pl.Float64) - nxt['x'].cast(pl.Float64)) ** 2
+               + (pl.col('endY').cast(pl.Float64) - nxt['y'].cast(pl.Float64)) ** 2)
+    is_carry = ((pl.col('gameId') == nxt['gameId']) & (pl.col('teamId') == nxt['teamId'])
+                & (pl.col('period') == nxt['period'])
+                # Polars orders NaN above every number, so the upper bound also rules out NaN distances
+                & (dist_sq >= thresholds.min_distance ** 2) & (dist_sq <= thresholds.max_distance ** 2)
+                & (nxt['time_seconds'] - pl.col('time_seconds') < thresholds.max_seconds)).fill_null(False)
+
+    taken_from_next = ['gameId', 'period', 'expandedMinute', 'playerId', 'team', 'player', 'teamId', 'possession_id']
+    carries = (
+        events.with_columns(_is_carry=is_carry,
+                            **{f'_next_{col}': pl.col(col).shift(-1) for col in taken_from_next + ['x', 'y']},
+                            _next_time=nxt['time_seconds'])
+        .filter(pl.col('_is_carry'))
+        .select(
+            *(pl.col(f'_next_{col}').alias(col) for col in taken_from_next),
+            minute=pl.lit(None, dtype=pl.Int16), second=pl.lit(None, dtype=pl.Int16),
+            type=pl.lit('Carry'), outcomeType=pl.lit('Successful'),
+            x=pl.col('endX'), y=pl.col('endY'), endX=pl.col('_next_x'), endY=pl.col('_next_y'),
+            time_seconds=(pl.col('time_seconds') + pl.col('_next_time')) / 2,
+            _order=pl.col('_order') + 1,
+        )
+    )
+    return pl.concat([events, carries], how='diagonal_relaxed')
+
+
+def _zone_masks(x, y, registry):
+    """Zone bitmask expression of each (x, y) on the 120x80 pitch, as registry.classify computes it."""
+    table = pl.lit(pl.Series(registry.lookup_table.ravel()))
+    valid = (x.is_finite() & y.is_finite()).fill_null(False)
+    ix = (x / registry.cell_size).floor().clip(0, registry.n_x - 1).cast(pl.Int64)
+    iy = (y / registry.cell_size).floor().clip(0, registry.n_y - 1).cast(pl.Int64)
+    masks = table.gather(ix * registry.n_y + iy)
+    if registry.closed_bits:
+        # Points on a cell's lower edge also get the closed zones of the cell below (see registry.classify)
+        closed = pl.lit(int(registry.closed_bits), dtype=pl.UInt64)
+        none = pl.lit(0, dtype=pl.UInt64)
+        on_x = (ix > 0) & (x == ix * registry.cell_size)
+        on_y = (iy > 0) & (y == iy * registry.cell_size)
+        below_x, below_y = (ix - 1).clip(0), (iy - 1).clip(0)
+        masks = (masks
+                 | pl.when(on_x).then(table.gather(below_x * registry.n_y + iy) & closed).otherwise(none)
+                 | pl.when(on_y).then(table.gather(ix * registry.n_y + below_y) & closed).otherwise(none)
+                 | pl.when(on_x & on_y).then(table.gather(below_x * registry.n_y + below_y) & closed).otherwise(none))
+    return pl.when(valid).then(masks).otherwise(pl.lit(0, dtype=pl.UInt64))
+
+
+def classify(actions, registry=DEFAULT_ZONES):
+    """Scales coordinates and keeps the passes/carries touching a zone, with kind, zone masks and progressive."""
+    x, y = pl.col('x').cast(pl.Float64) * 1.2, pl.col('y').cast(pl.Float64) * .8
+    end_x, end_y = pl.col('endX').cast(pl.Float64) * 1.2, pl.col('endY').cast(pl.Float64) * .8
+    kind = (pl.when(pl.col('type') == 'Carry').then(KIND_CARRY)
+            .when((pl.col('type') == 'Pass') & (pl.col('outcomeType') == 'Successful')).then(KIND_PASS)
+            .otherwise(KIND_OTHER).cast(pl.Int8))
+    beginning_sq = (GOAL_X - x) ** 2 + (GOAL_Y - y) ** 2
+    end_sq = (GOAL_X - end_x) ** 2 + (GOAL_Y - end_y) ** 2
+    # NaN compares as the largest float in Polars, so missing coordinates are excluded explicitly
+    finite = pl.all_horizontal([c.is_finite() for c in (x, y, end_x, end_y)]).fill_null(False)
+    progressive = (finite & (beginning_sq > 1) & (end_sq < 0.75**2 * beginning_sq)).fill_null(False)
+    return (
+        actions.with_columns(kind=kind, start_zones=_zone_masks(x, y, registry),
+                             end_zones=_zone_masks(end_x, end_y, registry), progressive=progressive)
+        .filter((pl.col('kind') != KIND_OTHER) & ((pl.col('start_zones') | pl.col('end_zones')) != 0))
+        .with_columns(pl.col('x') * 1.2, pl.col('y') * .8, pl.col('endX') * 1.2, pl.col('endY') * .8)
+    )
+
+
+def _in_zone(col: str, registry, name: str):
+    return (pl.col(col) & pl.lit(int(registry.bit(name)), dtype=pl.UInt64)) != 0
+
+
+def count_zone_actions(actions, registry=DEFAULT_ZONES):
+    """Lazy counts table and the four lazy action frames (as halfspaces_pipeline.count_zone_actions)."""
+    prog_actions = actions.filter(pl.col('progressive'))
+    indicators = {}
+    for name in registry.names:
+        starts_in, ends_in = _in_zone('start_zones', registry, name), _in_zone('end_zones', registry, name)
+        for kind_code, suffix in KIND_SUFFIXES.items():
+            is_kind = pl.col('kind') == kind_code
+            indicators[f'prog_{name}_{suffix}'] = (is_kind & starts_in).cast(pl.Int64)
+            indicators[f'prog_into_{name}_{suffix}'] = (is_kind & ends_in & ~starts_in).cast(pl.Int64)
+
+    counts = (
+        prog_actions.filter(pl.all_horizontal(pl.col(GROUP_COLS).is_not_null()))
+        .select(*GROUP_COLS, **indicators)
+        .filter(pl.any_horizontal(pl.col(halfspaces_pipeline.row_indicator_columns(registry)) != 0)
+                if indicators else pl.lit(False))
+        .group_by(GROUP_COLS).agg(pl.col(list(indicators)).sum())
+        .sort(GROUP_COLS)
+    )
+    for name in registry.names:
+        counts = counts.with_columns(**{f'{prefix}_actions': pl.col(f'{prefix}_passes') + pl.col(f'{prefix}_carries')
+                                        for prefix in (f'prog_{name}', f'prog_into_{name}')})
+    counted = counts.collect_schema().names()
+    counts = counts.with_columns(**{col: pl.lit(0, dtype=pl.Int64) for col in RHS_ACTION_COLS + LHS_ACTION_COLS
+                                    if col not in counted})
+    counts = counts.with_columns(prog_HS_actions=pl.col('prog_rhs_actions') + pl.col('prog_lhs_actions'))
+    zone_cols = [col for col in halfspaces_pipeline.zone_count_columns(registry)
+                 if col not in RHS_ACTION_COLS + LHS_ACTION_COLS]
+    counts = counts.select(GROUP_COLS + RHS_ACTION_COLS + LHS_ACTION_COLS + ['prog_HS_actions'] + zone_cols)
+
+    def starting_in(name, kind_code):
+        if name not in registry:
+            return prog_actions.head(0)
+        # Sorted by player, event order within a player: the layout PlayerIndex and the store expect
+        return (prog_actions.filter((pl.col('kind') == kind_code) & _in_zone('start_zones', registry, name))
+                .sort(['playerId', '_order'], nulls_last=True))
+    return (counts, starting_in('rhs', KIND_PASS), starting_in('lhs', KIND_PASS),
+            starting_in('rhs', KIND_CARRY), starting_in('lhs', KIND_CARRY))
+
+
+def _to_pandas(frame, columns):
+    df = frame.select([col for col in columns if col in frame.columns]).to_pandas()
+    return df.astype({col: 'category' for col in CATEGORICAL_COLUMNS if col in df.columns})
+
+
+@halfspaces_profile.stage('polars_query')
+def compute_halfspace_counts(data_path: str, league: str, season_internal, registry=DEFAULT_ZONES,
+                             carry_thresholds=halfspaces_carries.DEFAULT_THRESHOLDS):
+    """Runs the whole query on a league/season partition.
+
+    Returns (teams, game_ids, counts_df, *four action frames) as pandas objects, or None without events.
+    """
+    events = scan_events(data_path, league, season_internal)
+    if events is None:
+        return None
+    actions = classify(with_carries(events, carry_thresholds), registry).filter(pl.col('progressive'))
+    # The event-level plan (scan, carries, classification) runs once; the counts table and the four frames
+    # are then grouped/filtered from its progressive actions (recomputing the shared plan per output is slower)
+    actions, teams, game_ids = pl.collect_all([
+        actions,
+        events.select(pl.col('team').drop_nulls().cast(pl.String).unique().sort()),
+        events.select(pl.col('gameId').drop_nulls().unique(maintain_order=True)),
+    ])
+    counts, *frames = pl.collect_all(count_zone_actions(actions.lazy(), registry))
+    if teams.is_empty() and game_ids.is_empty():
+        return None
+    counts_df = _to_pandas(counts, counts.columns)
+    action_columns = halfspaces_store.ACTION_COLUMNS + ['kind', 'start_zones', 'end_zones', 'progressive']
+    return (teams['team'].to_list(), game_ids['gameId'].to_numpy(), counts_df,
+            *(_to_pandas(frame, action_columns) for frame in frames))
+
+
+# --- Engine Check ---
+def compare_engines(data_path: str, league: str, season_internal, registry=DEFAULT_ZONES):
+    """Runs both engines on a league/season and lists every difference (an empty list means identical output).
+
+    Counts are compared per (playerId, team) and the action frames row by row on the stored columns.
+    """
+    data = halfspaces_pipeline.load_data_filtered(data_path, league, season_internal,
+                                                  columns=halfspaces_pipeline.REQUIRED_EVENT_COLUMNS)
+    result = compute_halfspace_counts(data_path, league, season_internal, registry)
+    if data.empty or result is None:
+        return [] if data.empty and result is None else ["events found by one engine only"]
+    expected = halfspaces_pipeline.compute_halfspace_counts(data, registry=registry)
+    _, _, *actual = result
+
+    differences = []
+    names = ['counts'] + list(halfspaces_store.FRAME_NAMES[1:])
+    for name, want, got in zip(names, expected, actual):
+        if name == 'counts':
+            want, got = (df.astype({col: str for col in ['player', 'team']})
+                         .sort_values(['playerId', 'team']).reset_index(drop=True) for df in (want, got))
+        else:
+            columns = [col for col in halfspaces_store.ACTION_COLUMNS if col in want.columns]
+            want, got = (df[columns].astype({col: str for col in CATEGORICAL_COLUMNS if col in columns})
+                         .reset_index(drop=True) for df in (want, got))
+        if list(want.columns) != list(got.columns) or len(want) != len(got):
+            differences.append(f"{name}: shape {want.shape} vs {got.shape}")
+            continue
+        for col in want.columns:
+            a, b = want[col].to_numpy(), got[col].to_numpy()
+            if a.dtype.kind == 'f' or b.dtype.kind == 'f':
+                same = np.array_equal(a.astype(float), b.astype(float), equal_nan=True)
+            else:
+                same = bool((pd.Series(a, dtype=object) == pd.Series(b, dtype=object)).all())
+            if not same:
+                differences.append(f"{name}: column {col} differs")
+    return differences
+
+# --- END OF FILE halfspaces_polars.py ---
@@ -0,0 +1,130 @@
+# --- START OF FILE halfspaces_profile.py ---
+"""Per-stage instrumentation: wall time, rows in/out, DataFrame memory and cache hits of pipeline calls.
+
+Nothing is recorded unless a Profile is active (``with profiling(Profile()):``), so the decorated
+pipeline functions cost one context-variable lookup per call otherwise.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_active_profile = contextvars.ContextVar("halfspaces_profile", default=None)
+_active_record = contextvars.ContextVar("halfspaces_profile_record", default=None)
+
+
+def _frames(value):
+    """DataFrames inside a stage's argument or result (tuples/lists and PlayerIndex frames included)."""
+    if isinstance(value, pd.DataFrame):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _frames(item)
+    elif isinstance(getattr(value, 'frame', None), pd.DataFrame):
+        yield value.frame
+
+
+def _rows(value):
+    frames = list(_frames(value))
+    return sum(len(frame) for frame in frames) if frames else None
+
+
+def _memory_mb(value):
+    frames = list(_frames(value))
+    if not frames:
+        return None
+    return round(sum(int(frame.memory_usage(index=True, deep=True).sum()) for frame in frames) / 2**20, 2)
+
+
+def _or_dash(value):
+    return "-" if value is None else value
+
+
+class Profile:
+    """Records of the stages run while this profile was active, in start order (nested stages have depth > 0)."""
+
+    def __init__(self):
+        self.records = []
+
+    def to_frame(self):
+        columns = ['stage', 'depth', 'seconds', 'rows_in', 'rows_out', 'memory_mb', 'cache']
+        rows = [{**record, 'cache': ", ".join(f"{k} {v}" for k, v in record['notes'].items())}
+                for record in self.records]
+        return pd.DataFrame(rows, columns=columns)
+
+    def to_json(self, **extra) -> str:
+        return json.dumps({**extra, 'stages': self.records}, indent=2, default=str)
+
+    def log_lines(self, prefix: str = ""):
+        for record in self.records:
+            notes = "".join(f" {k}={v}" for k, v in record['notes'].items())
+            rows = f" rows {_or_dash(record['rows_in'])}->{_or_dash(record['rows_out'])}"
+            memory = f" {record['memory_mb']} MB" if record['memory_mb'] is not None else ""
+            yield f"{prefix}{'  ' * record['depth']}{record['stage']}: {record['seconds']:.3f}s{rows}{memory}{notes}"
+
+    def log(self, prefix: str = "", level: int = logging.INFO):
+        for line in self.log_lines(prefix):
+            logger.log(level, line)
+
+
+@contextlib.contextmanager
+def profiling(profile):
+    """Makes profile the one stages record into for the enclosed block; a profile of None records nothing."""
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, rows_in=None):
+    """Times the enclosed block as a stage; yields its record (or None when not profiling)."""
+    profile = _active_profile.get()
+    if profile is None:
+        yield None
+        return
+    parent = _active_record.get()
+    record = {'stage': name, 'depth': parent['depth'] + 1 if parent else 0, 'seconds': None,
+              'rows_in': rows_in, 'rows_out': None, 'memory_mb': None, 'notes': {}}
+    profile.records.append(record)
+    token = _active_record.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - started, 5)
+        _active_record.reset(token)
+
+
+def note(key: str, value):
+    """Attaches key=value (e.g. cache='hit') to the innermost running stage, if any."""
+    record = _active_record.get()
+    if record is not None:
+        record['notes'][key] = value
+
+
+def stage(name: str):
+    """Decorator recording each call as a stage; rows_in comes from the first DataFrame argument."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_profile.get() is None:
+                return func(*args, **kwargs)
+            rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+            with span(name, rows_in) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = _rows(result)
+                record['memory_mb'] = _memory_mb(result)
+            return result
+        return wrapper
+    return decorator
+
+# --- END OF FILE halfspaces_profile.py ---
@@ -0,0 +1,92 @@
+# --- START OF FILE halfspaces_schema.py ---
+"""Compact event schema shared by the CSV -> Parquet converter and the app loader."""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Low-cardinality strings are stored as dictionary (Arrow) / categorical (pandas) columns
+CATEGORICAL_COLUMNS = ['league', 'team', 'player', 'type', 'outcomeType', 'period']
+# Pitch coordinates need no more than float32 precision
+FLOAT32_COLUMNS = ['x', 'y', 'endX', 'endY']
+# Match clock columns fit in int16 (falls back to float32 when values are missing)
+INT16_COLUMNS = ['minute', 'second', 'expandedMinute']
+
+# Fixed Arrow types of the event files written to the warehouse, whatever the source (streamed CSV or DataFrame),
+# so every file of a partition shares one schema; league/season become the partition keys
+EVENT_COLUMN_TYPES = {
+    **{col: pa.dictionary(pa.int32(), pa.string()) for col in CATEGORICAL_COLUMNS if col != 'league'},
+    'league': pa.string(),
+    'season': pa.int32(),
+    'gameId': pa.int64(),
+    'teamId': pa.int64(),
+    'playerId': pa.int64(),
+    **{col: pa.float32() for col in FLOAT32_COLUMNS},
+    **{col: pa.int16() for col in INT16_COLUMNS},
+}
+
+
+def _compact_arrow_column(name, col):
+    if name in CATEGORICAL_COLUMNS and (pa.types.is_string(col.type) or pa.types.is_large_string(col.type)):
+        return pc.dictionary_encode(col)
+    if name in FLOAT32_COLUMNS and pa.types.is_floating(col.type):
+        return pc.cast(col, pa.float32())
+    if name in INT16_COLUMNS and (pa.types.is_integer(col.type) or pa.types.is_floating(col.type)):
+        if col.null_count == 0:
+            try:
+                return pc.cast(col, pa.int16()) # Safe cast: raises on overflow or fractional values
+            except pa.ArrowInvalid:
+                pass
+        return pc.cast(col, pa.float32())
+    return col
+
+
+def compact_table(table):
+    """Casts an Arrow Table or RecordBatch to the compact event types."""
+    arrays = [_compact_arrow_column(name, table.column(name)) for name in table.column_names]
+    return type(table).from_arrays(arrays, names=table.column_names)
+
+
+def to_event_types(table):
+    """Casts the known columns of an Arrow Table or RecordBatch to EVENT_COLUMN_TYPES (other columns as-is)."""
+    arrays = []
+    for name in table.column_names:
+        col, target = table.column(name), EVENT_COLUMN_TYPES.get(name)
+        if target is not None and col.type != target:
+            if pa.types.is_dictionary(target) and not pa.types.is_dictionary(col.type):
+                col = pc.dictionary_encode(pc.cast(col, target.value_type))
+            col = pc.cast(col, target)
+        arrays.append(col)
+    return type(table).from_arrays(arrays, names=table.column_names)
+
+
+def compact_events(df):
+    """Casts an event DataFrame to the compact event types (categorical strings, float32/int16 numbers)."""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype) and (
+                pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])):
+            df[col] = df[col].astype('category')
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype(np.float32)
+    for col in INT16_COLUMNS:
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            values = df[col].to_numpy(dtype=np.float64)
+            fits_int16 = (np.isfinite(values).all() and (values == np.round(values)).all()
+                          and values.min(initial=0) >= np.iinfo(np.int16).min
+                          and values.max(initial=0) <= np.iinfo(np.int16).max)
+            df[col] = df[col].astype(np.int16 if fits_int16 else np.float32)
+    return df
+
+
+def with_categories(series, *values):
+    """Adds categories to a categorical Series (no-op for other dtypes) so new values keep its dtype."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        missing = [value for value in values if value not in series.cat.categories]
+        if missing:
+            return series.cat.add_categories(missing)
+    return series
+
+# --- END OF FILE halfspaces_schema.py ---
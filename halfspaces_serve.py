@@ -0,0 +1,319 @@
+# --- START OF FILE halfspaces_serve.py ---
+"""Local JSON query service over the precomputed tables: python -m halfspaces serve --port 8502
+
+GET /leagues                                              leagues and their seasons
+GET /tables?league=...&season=2425[&team=...][&min_90s=10][&columns=a,b][&sort=col][&limit=n]
+GET /actions?league=...&season=2425&player_id=123[&team=...][&frame=prog_rhs_passes][&columns=a,b]
+
+Tables are served from memory-mapped Arrow copies of the store entries, so a query is a pyarrow filter
+and never a pandas pipeline run. Responses carry an ETag derived from the league/season fingerprint and
+the query, are cached in memory under the same key, and a matching If-None-Match gets a 304.
+"""
+
+import hashlib
+import http.server
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import halfspaces_cache
+import halfspaces_pipeline
+import halfspaces_store
+from halfspaces_pipeline import EVENTS_PATH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8502
+DEFAULT_WORKERS = 8
+# Seconds an idle keep-alive connection may hold its worker thread before it is closed
+KEEP_ALIVE_TIMEOUT = 5.0
+FINGERPRINT_TTL = 5.0 # Seconds a league/season fingerprint is trusted before the partition is checked again
+RESPONSE_CACHE_BYTES = 256 * 2**20
+ACTION_FRAMES = halfspaces_store.FRAME_NAMES[1:]
+DEFAULT_ACTION_COLUMNS = ['gameId', 'period', 'expandedMinute', 'team', 'type', 'x', 'y', 'endX', 'endY']
+
+
+class QueryError(Exception):
+    """A request the service cannot answer; status is the HTTP status to reply with."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LeagueTables:
+    """One league/season's memory-mapped frames, plus playerId offsets into each (player-sorted) action frame."""
+
+    def __init__(self, fingerprint: str, tables):
+        self.fingerprint = fingerprint
+        self.combined = tables['combined_prog_df']
+        self.actions = {name: tables[name] for name in ACTION_FRAMES}
+        self._player_ids = {}
+        for name, table in self.actions.items():
+            ids = table['playerId']
+            # Rows without a playerId are sorted last and never looked up
+            self._player_ids[name] = ids.drop_null().to_numpy() if ids.null_count else ids.to_numpy()
+
+    def player_actions(self, name: str, player_id, team=None):
+        """A player's rows of an action frame; with team, only those made for that club (one table row)."""
+        ids = self._player_ids[name]
+        start, stop = np.searchsorted(ids, player_id, side='left'), np.searchsorted(ids, player_id, side='right')
+        actions = self.actions[name].slice(start, stop - start)
+        if team is None:
+            return actions
+        return actions.filter(pc.equal(actions['team'].cast(pa.string()), team))
+
+
+class TableSource:
+    """Finds the current fingerprint of each league/season and keeps its Arrow frames mapped.
+
+    A league/season whose store entry or Arrow copy is missing or stale is built once through the
+    pipeline (load_halfspace_tables), then served from its Arrow files.
+    """
+
+    def __init__(self, data_path: str = EVENTS_PATH, store_dir: str = halfspaces_store.STORE_DIR,
+                 fingerprint_ttl: float = FINGERPRINT_TTL, registry=None):
+        self.data_path = data_path
+        self.store_dir = store_dir
+        self.registry = halfspaces_pipeline.ZONES if registry is None else registry
+        self.fingerprint_ttl = fingerprint_ttl
+        self._fingerprints = {} # (league, season) -> (fingerprint, checked at)
+        self._tables = {} # (league, season) -> LeagueTables
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._leagues = None
+
+    def league_seasons(self) -> dict:
+        with self._lock:
+            leagues, checked = self._leagues or (None, 0.0)
+        if leagues is None or time.monotonic() - checked > self.fingerprint_ttl:
+            leagues = halfspaces_pipeline.league_seasons(self.data_path)
+            with self._lock:
+                self._leagues = (leagues, time.monotonic())
+        return leagues
+
+    def fingerprint(self, league: str, season) -> str:
+        if season not in self.league_seasons().get(league, []):
+            raise QueryError(404, f"No events for league {league!r}, season {season}.")
+        with self._lock:
+            fingerprint, checked = self._fingerprints.get((league, season), (None, 0.0))
+        if fingerprint is None or time.monotonic() - checked > self.fingerprint_ttl:
+            fingerprint = halfspaces_pipeline.tables_fingerprint(league, season, self.data_path,
+                                                                 registry=self.registry)
+            with self._lock:
+                self._fingerprints[(league, season)] = (fingerprint, time.monotonic())
+        return fingerprint
+
+    def tables(self, league: str, season, fingerprint: str) -> LeagueTables:
+        with self._lock:
+            tables = self._tables.get((league, season))
+        if tables is not None and tables.fingerprint == fingerprint:
+            return tables
+        with self._build_lock: # One build at a time; requests for other leagues still hit the cache
+            tables = self._tables.get((league, season))
+            if tables is not None and tables.fingerprint == fingerprint:
+                return tables
+            mapped = halfspaces_store.open_arrow_frames(league, season, fingerprint, self.store_dir)
+            if mapped is None:
+                _, frames = halfspaces_pipeline.load_halfspace_tables(self.data_path, league, season, fingerprint,
+                                                                      self.store_dir, registry=self.registry)
+                if frames is None:
+                    raise QueryError(404, f"No events for league {league!r}, season {season}.")
+                combined_prog_df, *indexes = frames
+                halfspaces_store.write_arrow_frames(league, season, fingerprint,
+                                                    (combined_prog_df, *(index.frame for index in indexes)),
+                                                    self.store_dir)
+                mapped = halfspaces_store.open_arrow_frames(league, season, fingerprint, self.store_dir)
+            tables = LeagueTables(fingerprint, mapped)
+            with self._lock:
+                self._tables[(league, season)] = tables
+            return tables
+
+
+# --- Queries ---
+def _param(params, name: str, convert=str, default=None, required: bool = False):
+    values = params.get(name)
+    if not values:
+        if required:
+            raise QueryError(400, f"Missing query parameter {name!r}.")
+        return default
+    try:
+        return convert(values[0])
+    except ValueError:
+        raise QueryError(400, f"Invalid value for {name!r}: {values[0]!r}.") from None
+
+
+def _columns(params, table, default=None):
+    requested = _param(params, 'columns')
+    columns = requested.split(',') if requested else (default or table.column_names)
+    unknown = [col for col in columns if col not in table.column_names]
+    if unknown:
+        raise QueryError(400, f"Unknown columns {unknown}.")
+    return columns
+
+
+def _records(table):
+    # Dictionary (categorical) columns come out as plain strings
+    return table.to_pylist()
+
+
+def query_tables(tables: LeagueTables, params):
+    """Rows of the league table, optionally filtered by team(s) and minimum 90s, sorted and truncated."""
+    table = tables.combined
+    mask = None
+    teams = params.get('team')
+    if teams:
+        mask = pc.is_in(table['team'].cast(pa.string()), value_set=pa.array(teams, type=pa.string()))
+    min_90s = _param(params, 'min_90s', float)
+    if min_90s is not None:
+        at_least = pc.fill_null(pc.greater_equal(table['90s'], min_90s), False)
+        mask = at_least if mask is None else pc.and_(mask, at_least)
+    if mask is not None:
+        table = table.filter(mask)
+    sort = _param(params, 'sort')
+    if sort is not None:
+        if sort not in table.column_names:
+            raise QueryError(400, f"Unknown sort column {sort!r}.")
+        table = table.sort_by([(sort, 'descending')])
+    limit = _param(params, 'limit', int)
+    if limit is not None:
+        table = table.slice(0, max(limit, 0))
+    table = table.select(_columns(params, table))
+    return {'rows': len(table), 'data': _records(table)}
+
+
+def query_actions(tables: LeagueTables, params):
+    """A player's progressive actions from each requested action frame (of every club, unless team is given)."""
+    player_id = _param(params, 'player_id', int, required=True)
+    team = _param(params, 'team')
+    names = params.get('frame') or list(ACTION_FRAMES)
+    unknown = [name for name in names if name not in ACTION_FRAMES]
+    if unknown:
+        raise QueryError(400, f"Unknown frames {unknown}. Choose from {list(ACTION_FRAMES)}.")
+    result = {}
+    for name in names:
+        actions = tables.player_actions(name, player_id, team)
+        result[name] = _records(actions.select(_columns(params, actions, DEFAULT_ACTION_COLUMNS)))
+    return {'player_id': player_id, 'team': team, 'data': result}
+
+
+QUERIES = {'/tables': query_tables, '/actions': query_actions}
+
+
+class QueryService:
+    """Answers GET requests as (status, headers, body); shared by every worker thread."""
+
+    def __init__(self, source: TableSource, cache_bytes: int = RESPONSE_CACHE_BYTES):
+        self.source = source
+        self.responses = halfspaces_cache.ByteBudgetLRU(cache_bytes)
+
+    def handle(self, path: str, query: str, if_none_match=None):
+        try:
+            params = urllib.parse.parse_qs(query)
+            if path == '/leagues':
+                leagues = self.source.league_seasons()
+                version = json.dumps(leagues, sort_keys=True)
+                return self._respond(('leagues', version), if_none_match, lambda: leagues)
+            if path not in QUERIES:
+                raise QueryError(404, f"Unknown path {path!r}. Use /leagues, /tables or /actions.")
+            league = _param(params, 'league', required=True)
+            season = _param(params, 'season', int, required=True)
+            fingerprint = self.source.fingerprint(league, season)
+            # The fingerprint is part of the key: any change to the events or minutes gives new ETags
+            canonical = urllib.parse.urlencode(sorted((k, v) for k, values in params.items() for v in values))
+            return self._respond((path, canonical, fingerprint), if_none_match,
+                                 lambda: QUERIES[path](self.source.tables(league, season, fingerprint), params))
+        except QueryError as e:
+            return self._error(e.status, str(e))
+        except Exception as e:
+            logger.exception("Failed to answer %s?%s", path, query)
+            return self._error(500, f"Internal error: {e}")
+
+    def _respond(self, key, if_none_match, compute):
+        etag = '"' + hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest() + '"'
+        if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, {'ETag': etag}, b""
+        body = self.responses.get(key)
+        if body is None:
+            body = json.dumps(compute(), default=str).encode()
+            self.responses.put(key, body)
+        return 200, {'ETag': etag, 'Content-Type': 'application/json', 'Cache-Control': 'no-cache'}, body
+
+    @staticmethod
+    def _error(status: int, message: str):
+        return status, {'Content-Type': 'application/json'}, json.dumps({'error': message}).encode()
+
+
+# --- HTTP Server ---
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTP server answering each connection on a fixed pool of worker threads.
+
+    A connection holds its worker while it is open, so handlers close connections that stay idle for
+    longer than their timeout (see make_handler).
+    """
+
+    def __init__(self, address, handler, workers: int = DEFAULT_WORKERS):
+        super().__init__(address, handler)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="halfspaces-serve")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def make_handler(service: QueryService, keep_alive: float = KEEP_ALIVE_TIMEOUT):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive, so dashboards can reuse connections
+        timeout = keep_alive # An idle connection is closed after this, freeing its worker for other clients
+
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            status, headers, body = service.handle(url.path.rstrip('/') or '/', url.query,
+                                                   self.headers.get('If-None-Match'))
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Keep-Alive', f"timeout={keep_alive:g}")
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+          data_path: str = EVENTS_PATH, store_dir: str = halfspaces_store.STORE_DIR, registry=None,
+          keep_alive: float = KEEP_ALIVE_TIMEOUT):
+    """Runs the query service until interrupted."""
+    service = QueryService(TableSource(data_path, store_dir, registry=registry))
+    server = PooledHTTPServer((host, port), make_handler(service, keep_alive), workers=workers)
+    logger.info("Serving half-space tables on http://%s:%d with %d workers", host, server.server_port, workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# --- END OF FILE halfspaces_serve.py ---
@@ -0,0 +1,127 @@
+# --- START OF FILE halfspaces_similarity.py ---
+"""Player similarity over half-space profiles: feature vectors per (playerId, team) and a KD-tree over them."""
+
+import numpy as np
+import pandas as pd
+
+import halfspaces_cache
+
+SIMILARITY_MIN_90S = 5.0
+KDTREE_NODE_BYTES = 72 # Approximate size of one cKDTree node (bounds, children, index range)
+# Location grid on the 120x80 pitch the action frames are scaled to
+GRID_X_BINS, GRID_Y_BINS = 6, 4
+PITCH_LENGTH, PITCH_WIDTH = 120.0, 80.0
+
+
+def _grid_bins(x, y):
+    bx = np.clip((np.asarray(x, dtype=float) / PITCH_LENGTH * GRID_X_BINS).astype(np.int64), 0, GRID_X_BINS - 1)
+    by = np.clip((np.asarray(y, dtype=float) / PITCH_WIDTH * GRID_Y_BINS).astype(np.int64), 0, GRID_Y_BINS - 1)
+    return bx * GRID_Y_BINS + by
+
+
+def _location_shares(rows, n_players, x, y):
+    """Share of each player's actions per grid cell (rows: player row of each action, -1 to skip)."""
+    keep = rows >= 0
+    cells = GRID_X_BINS * GRID_Y_BINS
+    counts = np.bincount(rows[keep] * cells + _grid_bins(x[keep], y[keep]),
+                         minlength=n_players * cells).reshape(n_players, cells).astype(float)
+    totals = counts.sum(axis=1, keepdims=True)
+    return np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+
+
+def feature_blocks(combined_prog_df, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries):
+    """Feature blocks of each player in combined_prog_df, as {block name: DataFrame aligned with its rows}.
+
+    rates: per-90 progressive actions by zone and side (every *_p90 column); split: per-90 passes and
+    carries per half-space; start/end: share of the player's plotted actions starting/ending in each cell
+    of a 6x4 pitch grid.
+    """
+    players = combined_prog_df.reset_index(drop=True)
+    nineties = players['90s'].to_numpy(dtype=float)
+    rates = players[[col for col in players.columns if col.endswith('_p90')]].astype(float)
+
+    split_cols = ['prog_rhs_passes', 'prog_rhs_carries', 'prog_lhs_passes', 'prog_lhs_carries']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        split = players[split_cols].to_numpy(dtype=float) / nineties[:, None]
+    split = pd.DataFrame(np.where(np.isfinite(split), split, 0.0), columns=[f"{col}_p90" for col in split_cols])
+
+    actions = pd.concat([frame.frame if hasattr(frame, 'frame') else frame
+                         for frame in (prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries)],
+                        ignore_index=True)
+    index = pd.MultiIndex.from_arrays([players['playerId'].to_numpy(), players['team'].astype(str).to_numpy()])
+    rows = index.get_indexer(pd.MultiIndex.from_arrays([actions['playerId'].to_numpy(),
+                                                        actions['team'].astype(str).to_numpy()]))
+    cell_names = [f"{x}_{y}" for x in range(GRID_X_BINS) for y in range(GRID_Y_BINS)]
+    start = _location_shares(rows, len(players), actions['x'].to_numpy(), actions['y'].to_numpy())
+    end = _location_shares(rows, len(players), actions['endX'].to_numpy(), actions['endY'].to_numpy())
+    return {
+        'rates': rates,
+        'split': split,
+        'start': pd.DataFrame(start, columns=[f"start_{cell}" for cell in cell_names]),
+        'end': pd.DataFrame(end, columns=[f"end_{cell}" for cell in cell_names]),
+    }
+
+
+def player_features(combined_prog_df, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries):
+    """One row per player: the key/identity columns followed by every feature column."""
+    blocks = feature_blocks(combined_prog_df, prog_rhs_passes, prog_lhs_passes, prog_rhs_carries, prog_lhs_carries)
+    identity = [col for col in ['playerId', 'player', 'team', 'position', '90s'] if col in combined_prog_df.columns]
+    features = pd.concat([combined_prog_df[identity].reset_index(drop=True)]
+                         + [block.add_prefix(f"{name}:") for name, block in blocks.items()], axis=1)
+    return features.astype({col: str for col in ['player', 'team', 'position'] if col in features.columns})
+
+
+class SimilarityIndex:
+    """KD-tree over standardized player features; each feature block weighs the same in the distance.
+
+    features is a player_features() table of several leagues concatenated, with a 'league' column; players
+    below min_90s are left out, since their rates and locations rest on too few actions.
+    """
+
+    def __init__(self, features, min_90s: float = SIMILARITY_MIN_90S):
+        features = features[features['90s'].to_numpy(dtype=float) >= min_90s].reset_index(drop=True)
+        feature_cols = [col for col in features.columns if ':' in col]
+        values = features[feature_cols].to_numpy(dtype=float)
+        mean = values.mean(axis=0) if len(values) else np.zeros(len(feature_cols))
+        std = values.std(axis=0) if len(values) else np.ones(len(feature_cols))
+        # Blocks have very different widths (5 rates vs 24 grid cells); scale each to unit total weight
+        blocks = pd.Series([col.split(':', 1)[0] for col in feature_cols], dtype=object)
+        block_sizes = blocks.map(blocks.value_counts()).to_numpy(dtype=float)
+        self._scale = 1.0 / (np.where(std > 0, std, 1.0) * np.sqrt(block_sizes))
+        self.players = features.drop(columns=feature_cols)
+        self._vectors = (values - mean) * self._scale
+        from scipy.spatial import cKDTree # scipy is only needed once an index is built, not at app startup
+
+        self._tree = cKDTree(self._vectors) if len(self._vectors) else None
+        keys = zip(self.players['league'].astype(str), self.players['playerId'], self.players['team'].astype(str))
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.players)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the feature matrix, KD-tree and player table (what the byte-bounded caches count)."""
+        tree = 0
+        if self._tree is not None:
+            # cKDTree keeps the vectors by reference when it can; its index array and nodes are its own
+            if not np.shares_memory(self._tree.data, self._vectors):
+                tree += self._tree.data.nbytes
+            tree += self._tree.indices.nbytes + self._tree.size * KDTREE_NODE_BYTES
+        return int(self._vectors.nbytes + self._scale.nbytes + tree
+                   + halfspaces_cache.estimate_nbytes(self.players) + halfspaces_cache.estimate_nbytes(self._rows))
+
+    def query(self, league: str, player_id, team, k: int = 10):
+        """The k players closest to a league's (player_id, team), nearest first, with their distance.
+
+        Empty if the player is not in the index (e.g. below min_90s).
+        """
+        pos = self._rows.get((str(league), player_id, str(team)))
+        if pos is None:
+            return self.players.iloc[0:0].assign(distance=pd.Series(dtype=float))
+        distances, rows = self._tree.query(self._vectors[pos], k=min(k + 1, len(self)))
+        distances, rows = np.atleast_1d(distances), np.atleast_1d(rows)
+        keep = rows != pos # The player itself is its own nearest neighbour
+        return self.players.iloc[rows[keep][:k]].assign(distance=distances[keep][:k].round(3)).reset_index(drop=True)
+
+# --- END OF FILE halfspaces_similarity.py ---
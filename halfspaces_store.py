@@ -0,0 +1,264 @@
+# --- START OF FILE halfspaces_store.py ---
+"""On-disk store of precomputed half-space tables, keyed by league, season, zone registry and source fingerprint."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+STORE_DIR = "precomputed"
+STORE_VERSION = 8
+
+# Frames produced by process_halfspace_data, in the order it returns them
+FRAME_NAMES = ("combined_prog_df", "prog_rhs_passes", "prog_lhs_passes", "prog_rhs_carries", "prog_lhs_carries")
+# Event columns kept for the progressive-action frames (enough for plotting and exports)
+ACTION_COLUMNS = [
+    "gameId", "period", "expandedMinute", "teamId", "team", "playerId", "player",
+    "type", "outcomeType", "x", "y", "endX", "endY", "possession_id"
+]
+# Raw per-player counts before the minutes join; incremental ingests add new games' counts to these
+COUNTS_NAME = "player_counts"
+# Per-player location grids (see halfspaces_heatmaps.HeatmapGrids.to_arrays), saved as one .npz
+HEATMAPS_NAME = "heatmaps"
+# Season-wide tables built from every league's entry: cross-league percentile pools and similarity features
+DISTRIBUTION_NAME = "percentile_pools"
+SIMILARITY_FEATURES_NAME = "similarity_features"
+# Uncompressed Arrow IPC copies of an entry's frames, memory-mapped by the query service (halfspaces_serve)
+ARROW_DIR = "arrow"
+
+_HASH_CHUNK = 1 << 20  # Bytes hashed from each end of the source file
+
+
+def source_fingerprint(path: str) -> str:
+    """Fingerprints a local or remote file from its size, mtime and a hash of its first/last megabyte.
+
+    A directory dataset is fingerprinted from the names, sizes and mtimes of its files.
+    """
+    fs, fs_path = fsspec.core.url_to_fs(path)
+    info = fs.info(fs_path)
+    if info.get("type") == "directory":
+        digest = hashlib.blake2b(digest_size=16)
+        for file_path, file_info in sorted(fs.find(fs_path, detail=True).items()):
+            mtime = file_info.get("mtime") or file_info.get("LastModified") or file_info.get("updated") or ""
+            digest.update(f"{os.path.relpath(file_path, fs_path)}:{file_info.get('size')}:{mtime};".encode())
+        return digest.hexdigest()
+    size = info.get("size") or 0
+    mtime = info.get("mtime") or info.get("LastModified") or info.get("updated") or info.get("ETag") or ""
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{size}:{mtime}".encode())
+    with fs.open(fs_path, "rb") as f:
+        digest.update(f.read(_HASH_CHUNK))
+        if size > 2 * _HASH_CHUNK:
+            f.seek(size - _HASH_CHUNK)
+            digest.update(f.read(_HASH_CHUNK))
+    return digest.hexdigest()
+
+
+def combine_fingerprints(fingerprints) -> str:
+    """One fingerprint for an ordered sequence of fingerprints (or other identifying strings)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for fingerprint in fingerprints:
+        digest.update(fingerprint.encode())
+    return digest.hexdigest()
+
+
+def combined_fingerprint(*paths: str) -> str:
+    """Fingerprints several source files together (e.g. event file + minutes CSV)."""
+    return combine_fingerprints(source_fingerprint(path) for path in paths)
+
+
+def entry_dir(league: str, season, store_dir: str = STORE_DIR, zones: str = None) -> str:
+    """Returns the directory holding the entry for a league/season.
+
+    zones is the signature of the zone registry the entry counts, so each registry keeps its own entry.
+    """
+    safe_league = "".join(ch if ch.isalnum() else "_" for ch in str(league))
+    name = f"{safe_league}__{season}" if zones is None else f"{safe_league}__{season}__{zones}"
+    return os.path.join(store_dir, name)
+
+
+def read_meta(league: str, season, store_dir: str = STORE_DIR, zones: str = None):
+    """Reads an entry's metadata, or None if the entry does not exist."""
+    meta_path = os.path.join(entry_dir(league, season, store_dir, zones), "meta.json")
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def load_entry(league: str, season, fingerprint: str, store_dir: str = STORE_DIR, zones: str = None):
+    """Loads a stored entry as (meta, frames) if present and built from the same fingerprint, else None."""
+    meta = read_meta(league, season, store_dir, zones)
+    if meta is None or meta.get("fingerprint") != fingerprint or meta.get("version") != STORE_VERSION:
+        return None
+
+    path = entry_dir(league, season, store_dir, zones)
+    try:
+        frames = tuple(pd.read_parquet(os.path.join(path, f"{name}.parquet")) for name in FRAME_NAMES)
+    except (FileNotFoundError, OSError):
+        return None
+    return meta, frames
+
+
+def is_current(league: str, season, fingerprint: str, store_dir: str = STORE_DIR, zones: str = None) -> bool:
+    """Whether the stored entry exists and was built from fingerprint (reads only its metadata)."""
+    meta = read_meta(league, season, store_dir, zones)
+    return meta is not None and meta.get("fingerprint") == fingerprint and meta.get("version") == STORE_VERSION
+
+
+def load_frame(league: str, season, name: str, store_dir: str = STORE_DIR, zones: str = None):
+    """Loads a single frame of an entry (e.g. "combined_prog_df"), or None if the entry has none."""
+    try:
+        return pd.read_parquet(os.path.join(entry_dir(league, season, store_dir, zones), f"{name}.parquet"))
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def load_arrays(league: str, season, name: str, store_dir: str = STORE_DIR, zones: str = None):
+    """Loads a dict of arrays saved with an entry (e.g. HEATMAPS_NAME), or None if the entry has none."""
+    try:
+        with np.load(os.path.join(entry_dir(league, season, store_dir, zones), f"{name}.npz")) as arrays:
+            return {key: arrays[key] for key in arrays.files}
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def load_counts(league: str, season, store_dir: str = STORE_DIR, zones: str = None):
+    """Loads an entry's raw per-player counts, or None if the entry has none."""
+    return load_frame(league, season, COUNTS_NAME, store_dir, zones)
+
+
+def write_entry(league: str, season, fingerprint: str, frames, teams, store_dir: str = STORE_DIR,
+                counts=None, game_ids=(), heatmaps=None, zones: str = None):
+    """Writes the precomputed frames for a league/season, replacing any previous entry atomically.
+
+    heatmaps is an optional dict of arrays, saved compressed next to the frames.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    final_path = entry_dir(league, season, store_dir, zones)
+    tmp_path = tempfile.mkdtemp(prefix=".building_", dir=store_dir)
+    try:
+        for name, df in zip(FRAME_NAMES, frames):
+            if name != "combined_prog_df":
+                df = df[[col for col in ACTION_COLUMNS if col in df.columns]]
+            df.reset_index(drop=True).to_parquet(
+                os.path.join(tmp_path, f"{name}.parquet"), index=False, compression="zstd"
+            )
+        if counts is not None:
+            counts.reset_index(drop=True).to_parquet(
+                os.path.join(tmp_path, f"{COUNTS_NAME}.parquet"), index=False, compression="zstd"
+            )
+        if heatmaps is not None:
+            np.savez_compressed(os.path.join(tmp_path, f"{HEATMAPS_NAME}.npz"), **heatmaps)
+
+        meta = {
+            "version": STORE_VERSION,
+            "league": league,
+            "season": season,
+            "zones": zones,
+            "fingerprint": fingerprint,
+            "teams": sorted(str(team) for team in teams),
+            "game_ids": sorted(int(game_id) for game_id in game_ids),
+        }
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        if os.path.exists(final_path):
+            shutil.rmtree(final_path)
+        os.replace(tmp_path, final_path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return final_path
+
+
+def _season_table_path(name: str, season, store_dir: str) -> str:
+    return os.path.join(store_dir, f"{name}__{season}.parquet")
+
+
+def load_season_table(name: str, season, fingerprint: str, store_dir: str = STORE_DIR):
+    """Loads a season-wide table (e.g. DISTRIBUTION_NAME) if it was built from fingerprint, else None."""
+    path = _season_table_path(name, season, store_dir)
+    try:
+        meta = pq.read_schema(path).metadata or {}
+        if meta.get(b"fingerprint", b"").decode() != fingerprint:
+            return None
+        return pd.read_parquet(path)
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def write_season_table(name: str, season, fingerprint: str, df, store_dir: str = STORE_DIR) -> str:
+    """Writes a season-wide table built from several entries, tagged with the fingerprint of those entries."""
+    os.makedirs(store_dir, exist_ok=True)
+    path = _season_table_path(name, season, store_dir)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"fingerprint": fingerprint.encode()})
+    fd, tmp_path = tempfile.mkstemp(prefix=".building_", suffix=".parquet", dir=store_dir)
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def _arrow_path(league: str, season, fingerprint: str, store_dir: str) -> str:
+    return os.path.join(store_dir, ARROW_DIR, f"{os.path.basename(entry_dir(league, season))}__{fingerprint}")
+
+
+def write_arrow_frames(league: str, season, fingerprint: str, frames, store_dir: str = STORE_DIR) -> str:
+    """Writes frames (FRAME_NAMES order) as Arrow IPC files for fingerprint, dropping older fingerprints' copies."""
+    final_path = _arrow_path(league, season, fingerprint, store_dir)
+    if os.path.isdir(final_path):
+        return final_path
+    arrow_dir = os.path.dirname(final_path)
+    os.makedirs(arrow_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=".building_", dir=arrow_dir)
+    try:
+        for name, df in zip(FRAME_NAMES, frames):
+            if name != "combined_prog_df":
+                df = df[[col for col in ACTION_COLUMNS if col in df.columns]]
+            table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+            # Uncompressed, so readers map the file instead of decoding it
+            with pa.OSFile(os.path.join(tmp_path, f"{name}.arrow"), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        os.replace(tmp_path, final_path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.isdir(final_path): # Not just another process writing the same copy first
+            raise
+    prefix = os.path.basename(entry_dir(league, season)) + "__"
+    for old in os.listdir(arrow_dir):
+        if old.startswith(prefix) and old != os.path.basename(final_path):
+            shutil.rmtree(os.path.join(arrow_dir, old), ignore_errors=True)
+    return final_path
+
+
+def open_arrow_frames(league: str, season, fingerprint: str, store_dir: str = STORE_DIR):
+    """Memory-maps the Arrow copies of an entry's frames as {name: pyarrow.Table}, or None if not written."""
+    path = _arrow_path(league, season, fingerprint, store_dir)
+    try:
+        return {name: pa.ipc.open_file(pa.memory_map(os.path.join(path, f"{name}.arrow"))).read_all()
+                for name in FRAME_NAMES}
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def remove_entry(league: str, season, store_dir: str = STORE_DIR, zones: str = None):
+    """Deletes a league/season entry so the next load rebuilds it."""
+    shutil.rmtree(entry_dir(league, season, store_dir, zones), ignore_errors=True)
+
+# --- END OF FILE halfspaces_store.py ---
@@ -0,0 +1,141 @@
+# --- START OF FILE halfspaces_synthetic.py ---
+"""Synthetic WhoScored-style events and minutes, for benchmarks and offline runs without the Drive files."""
+
+import numpy as np
+import pandas as pd
+
+from halfspaces_pipeline import LEAGUES, REQUIRED_EVENT_COLUMNS
+
+# Rough WhoScored mix of event types; passes carry end coordinates, other events mostly do not
+EVENT_TYPES = np.array(['Pass', 'BallRecovery', 'TakeOn', 'Tackle', 'Interception', 'Clearance',
+                        'Aerial', 'Foul', 'BallTouch', 'Dispossessed', 'SavedShot', 'MissedShots'])
+EVENT_WEIGHTS = np.array([0.56, 0.07, 0.04, 0.04, 0.03, 0.04, 0.05, 0.03, 0.06, 0.03, 0.02, 0.03])
+POSITIONS = np.array(['D(C)', 'D(LR)', 'DMC', 'M(C)', 'AM(CLR)', 'FW'])
+FIRST_NAMES = np.array(['Luca', 'Mateo', 'João', 'Kai', 'Noah', 'Ilkay', 'Théo', 'Jude', 'Pedri', 'Leroy',
+                        'Martin', 'Sergi', 'Florian', 'Nico', 'Bruno', 'Rafael'])
+LAST_NAMES = np.array(['Silva', 'Müller', 'García', 'Rossi', 'Martin', 'Dubois', 'Smith', 'Fernández',
+                       'Kovač', 'Jensen', 'Costa', 'Ødegaard', 'Schmidt', 'Moreno', 'Bianchi', 'Wright'])
+
+
+def _league_names(n_leagues: int):
+    return [LEAGUES[i] if i < len(LEAGUES) else f"XXX-League {i}" for i in range(n_leagues)]
+
+
+def _season_values(n_seasons: int, last_season: int = 2425):
+    # 2425, 2324, 2223, ... (two-digit start/end years)
+    return [last_season - 101 * i for i in range(n_seasons)]
+
+
+def generate_events(leagues: int = 1, seasons: int = 1, teams: int = 20, games=None, events_per_game: int = 1600,
+                    players_per_team: int = 25, seed: int = 0, club=None):
+    """Events for leagues x seasons, each with `games` games (default: a full double round robin).
+
+    With club (a team index), each season is that club's fixtures only: home and away against every
+    other team (38 games in a 20-team league).
+
+    Rows are in event order within each game. Possessions alternate between the two teams, the ball moves
+    forward within a possession and passes end near the next action, so carries, progressive actions and
+    half-space entries all occur at realistic rates.
+    """
+    rng = np.random.default_rng(seed)
+    games = games if games is not None else teams * (teams - 1)
+    if club is not None:
+        opponents = np.delete(np.arange(teams), club)
+        club_home = np.r_[np.full(teams - 1, club), opponents]
+        club_away = np.r_[opponents, np.full(teams - 1, club)]
+        games = len(club_home)
+    frames = []
+    next_game_id, next_team_id = 1_000_000, 1
+    for league in _league_names(leagues):
+        team_ids = np.arange(next_team_id, next_team_id + teams)
+        next_team_id += teams
+        team_names = np.array([f"{league.split('-', 1)[-1]} Club {i}" for i in range(teams)])
+        player_ids = team_ids[:, None] * 1000 + np.arange(players_per_team)[None, :]
+        names = (FIRST_NAMES[player_ids % len(FIRST_NAMES)].astype(object) + ' '
+                 + LAST_NAMES[(player_ids // len(FIRST_NAMES)) % len(LAST_NAMES)].astype(object)
+                 + ' ' + (player_ids % 100000).astype(str).astype(object))
+        for season in _season_values(seasons):
+            if club is not None:
+                order = rng.permutation(games)
+                home, away = club_home[order], club_away[order]
+            else:
+                home = rng.integers(0, teams, games)
+                away = (home + rng.integers(1, teams, games)) % teams
+            frames.append(_generate_games(rng, league, season, next_game_id, home, away, team_ids, team_names,
+                                          player_ids, names, events_per_game))
+            next_game_id += games
+    return pd.concat(frames, ignore_index=True)
+
+
+def _generate_games(rng, league, season, first_game_id, home, away, team_ids, team_names, player_ids, names,
+                    events_per_game):
+    n_games, n = len(home), len(home) * events_per_game
+    game = np.repeat(np.arange(n_games), events_per_game)
+    index_in_game = np.tile(np.arange(events_per_game), n_games)
+
+    # Possessions: a new one starts with probability 1/5; most change the team in possession
+    new_possession = (rng.random(n) < 0.2) | (index_in_game == 0)
+    side = (np.cumsum(new_possession & (rng.random(n) < 0.85)) + game) % 2
+    team_idx = np.where(side == 0, home[game], away[game])
+    possession_start = np.maximum.accumulate(np.where(new_possession, np.arange(n), 0))
+
+    # Ball moves forward within a possession (coordinates per acting team, 0-100 attacking left to right)
+    start_x = rng.uniform(5, 60, n)[possession_start]
+    start_y = rng.uniform(5, 95, n)[possession_start]
+    advance = np.cumsum(rng.uniform(-4, 16, n))
+    drift = np.cumsum(rng.normal(0, 8, n))
+    x = np.clip(start_x + advance - advance[possession_start], 0, 100)
+    y = np.clip(start_y + drift - drift[possession_start], 0, 100)
+
+    event_type = EVENT_TYPES[rng.choice(len(EVENT_TYPES), n, p=EVENT_WEIGHTS / EVENT_WEIGHTS.sum())]
+    is_pass = event_type == 'Pass'
+    outcome = np.where(rng.random(n) < np.where(is_pass, 0.82, 0.6), 'Successful', 'Unsuccessful')
+    # Passes end where the receiver picks the ball up; in ~60% of cases the receiver then carries it on
+    next_x, next_y = np.roll(x, -1), np.roll(y, -1)
+    carried = rng.random(n) < 0.6
+    end_x = np.where(is_pass, np.clip(next_x - carried * rng.uniform(0, 12, n), 0, 100), np.nan)
+    end_y = np.where(is_pass, np.clip(next_y + carried * rng.normal(0, 4, n), 0, 100), np.nan)
+
+    # Starters (first 11) make most actions; the goalkeeper (player 0) few
+    weights = np.r_[0.2, np.ones(10), np.full(player_ids.shape[1] - 11, 0.08)]
+    slot = rng.choice(player_ids.shape[1], n, p=weights / weights.sum())
+
+    second_half = index_in_game >= events_per_game // 2
+    half_index = np.where(second_half, index_in_game - events_per_game // 2, index_in_game)
+    half_events = np.where(second_half, events_per_game - events_per_game // 2, events_per_game // 2)
+    seconds = (half_index / half_events * 47 * 60).astype(np.int64) + second_half * 45 * 60
+    minute = seconds // 60
+    return pd.DataFrame({
+        'league': league,
+        'season': season,
+        'gameId': first_game_id + game,
+        'period': np.where(second_half, 'SecondHalf', 'FirstHalf'),
+        'minute': minute,
+        'second': seconds % 60,
+        'expandedMinute': minute + second_half * 2,
+        'type': event_type,
+        'outcomeType': outcome,
+        'teamId': team_ids[team_idx],
+        'team': team_names[team_idx],
+        'playerId': player_ids[team_idx, slot],
+        'player': names[team_idx, slot],
+        'x': x, 'y': y, 'endX': end_x, 'endY': end_y,
+    })[REQUIRED_EVENT_COLUMNS]
+
+
+def generate_minutes(events, seed: int = 0):
+    """Minutes table in the T5 minutes CSV layout for every (player, team) in events."""
+    rng = np.random.default_rng(seed)
+    players = events[['playerId', 'player', 'team']].drop_duplicates(['playerId', 'team']).reset_index(drop=True)
+    is_keeper = players['playerId'].to_numpy() % 1000 == 0
+    mins = rng.integers(90, 3420, len(players))
+    return pd.DataFrame({
+        'player': players['player'].astype(str),
+        'team': players['team'].astype(str),
+        'age': rng.integers(18, 36, len(players)),
+        'position': np.where(is_keeper, 'GK', POSITIONS[rng.integers(0, len(POSITIONS), len(players))]),
+        'Mins': mins,
+        '90s': mins / 90.0,
+    })
+
+# --- END OF FILE halfspaces_synthetic.py ---
@@ -0,0 +1,115 @@
+# --- START OF FILE halfspaces_warehouse.py ---
+"""Hive-partitioned event warehouse (league=<league>/season=<season>/) shared by the converter and the loader."""
+
+import os
+import urllib.parse
+import uuid
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from halfspaces_schema import to_event_types
+
+WAREHOUSE_PATH = os.environ.get("HALFSPACES_WAREHOUSE", "warehouse") # Local path or any fsspec URL
+PARTITIONING = ds.partitioning(pa.schema([("league", pa.string()), ("season", pa.int32())]), flavor="hive")
+# Games are clustered so a gameId predicate reads few row groups; the stable sort keeps each game's event
+# order, which carry detection depends on (sorting by playerId too would interleave a game's events)
+SORT_COLUMNS = ["gameId"]
+ROW_GROUP_ROWS = 64_000 # Matches the loader's scan batch size
+
+# The monolithic per-league files the warehouse replaces (see migrate_files)
+LEGACY_LEAGUE_FILES = {
+    'ESP-La Liga': 'La_Liga_24_25.parquet',
+    'ENG-Premier League': 'Premier_League_2425.parquet',
+    'ITA-Serie A': 'Serie_A_2425.parquet',
+    'GER-Bundesliga': 'Bundesliga_2425.parquet',
+    'FRA-Ligue 1': 'Ligue_1_2425.parquet'
+}
+
+
+def open_dataset(path: str = WAREHOUSE_PATH):
+    """Opens the warehouse (or a legacy single file) as a dataset whose league/season filters prune partitions."""
+    fs, fs_path = fsspec.core.url_to_fs(path)
+    # A legacy file keeps league/season as ordinary columns
+    partitioning = PARTITIONING if fs.isdir(fs_path) else None
+    return ds.dataset(fs_path, format="parquet", filesystem=fs, partitioning=partitioning)
+
+
+def partition_path(league: str, season, path: str = WAREHOUSE_PATH) -> str:
+    """Directory of one league/season partition, encoded the way pyarrow writes it."""
+    return f"{path.rstrip('/')}/league={urllib.parse.quote(str(league), safe='')}/season={int(season)}"
+
+
+def discover_partitions(path: str = WAREHOUSE_PATH) -> dict:
+    """Maps every league in the warehouse to its seasons (newest first), from directory names alone."""
+    fs, fs_path = fsspec.core.url_to_fs(path)
+    if not fs.isdir(fs_path):
+        return {}
+    partitions = {}
+    for league_dir in fs.ls(fs_path, detail=False):
+        key, _, league = os.path.basename(league_dir.rstrip('/')).partition('=')
+        if key != "league" or not fs.isdir(league_dir):
+            continue
+        seasons = []
+        for season_dir in fs.ls(league_dir, detail=False):
+            key, _, season = os.path.basename(season_dir.rstrip('/')).partition('=')
+            if key == "season" and season.isdigit() and fs.isdir(season_dir):
+                seasons.append(int(season))
+        if seasons:
+            partitions[urllib.parse.unquote(league)] = sorted(seasons, reverse=True)
+    return partitions
+
+
+def season_label(season) -> str:
+    """Display name of an internal season value, e.g. 2425 -> '2024/2025'."""
+    season = int(season)
+    return f"20{season // 100:02d}/20{season % 100:02d}"
+
+
+def write_events(events, path: str = WAREHOUSE_PATH, replace: bool = True):
+    """Writes events into their league/season partitions, clustered by gameId in ROW_GROUP_ROWS row groups.
+
+    replace=True swaps out every partition present in events (a full re-conversion); replace=False adds
+    the rows as new files next to the existing ones (incremental ingestion).
+    """
+    sort_columns = [col for col in SORT_COLUMNS if col in events.columns]
+    if sort_columns:
+        events = events.sort_values(sort_columns, kind='stable')
+    table = to_event_types(pa.Table.from_pandas(events, preserve_index=False))
+
+    fs, fs_path = fsspec.core.url_to_fs(path)
+    if not replace:
+        table = _cast_to_existing(table, fs, fs_path)
+    ds.write_dataset(
+        table, fs_path, filesystem=fs, format="parquet", partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="delete_matching" if replace else "overwrite_or_ignore",
+        max_rows_per_group=ROW_GROUP_ROWS, min_rows_per_group=ROW_GROUP_ROWS // 4,
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+def _cast_to_existing(table, fs, fs_path):
+    # Appended files must match the files already stored, or the dataset schema becomes inconsistent
+    if not fs.isdir(fs_path) or not fs.find(fs_path):
+        return table
+    schema = ds.dataset(fs_path, format="parquet", filesystem=fs, partitioning=PARTITIONING).schema
+    return pa.table({field.name: (table.column(field.name) if field.name in table.column_names
+                                   else pa.nulls(table.num_rows, field.type)) for field in schema}).cast(schema)
+
+
+def migrate_files(files=None, path: str = WAREHOUSE_PATH):
+    """Copies monolithic per-league Parquet files into the warehouse, one file at a time."""
+    files = files or list(LEGACY_LEAGUE_FILES.values())
+    written = []
+    for file in files:
+        fs, fs_path = fsspec.core.url_to_fs(file)
+        if not fs.exists(fs_path):
+            continue
+        write_events(pd.read_parquet(fs_path, filesystem=fs), path)
+        written.append(file)
+    return written
+
+# --- END OF FILE halfspaces_warehouse.py ---
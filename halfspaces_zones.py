@@ -0,0 +1,212 @@
+# --- START OF FILE halfspaces_zones.py ---
+"""Zone registry: named pitch regions classified through a precomputed grid-cell lookup table."""
+
+import abc
+import hashlib
+import json
+
+import numpy as np
+
+# StatsBomb pitch dimensions (coordinates after prepare_data scaling)
+PITCH_LENGTH, PITCH_WIDTH = 120, 80
+CELL_SIZE = 0.5  # Grid resolution; zone edges on multiples of this are exact
+MAX_ZONES = 64   # One bit per zone in the uint64 lookup table
+
+
+class Zone(abc.ABC):
+    """A named pitch region; subclasses implement a vectorised contains(x, y)."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abc.abstractmethod
+    def contains(self, x, y):
+        """Boolean array: which (x, y) points lie in the zone."""
+
+    @abc.abstractmethod
+    def definition(self) -> str:
+        """Stable text description, used to fingerprint a registry."""
+
+
+class RectZone(Zone):
+    """Axis-aligned rectangle, half-open on its max edges (x_min <= x < x_max, y_min <= y < y_max) unless
+    inclusive_max, which closes them (x_min <= x <= x_max, ...) like pandas' between."""
+
+    def __init__(self, name: str, x_min: float, x_max: float, y_min: float, y_max: float,
+                 inclusive_max: bool = False):
+        super().__init__(name)
+        self.x_min, self.x_max, self.y_min, self.y_max = x_min, x_max, y_min, y_max
+        self.inclusive_max = inclusive_max
+
+    def contains(self, x, y):
+        if self.inclusive_max:
+            return (x >= self.x_min) & (x <= self.x_max) & (y >= self.y_min) & (y <= self.y_max)
+        return (x >= self.x_min) & (x < self.x_max) & (y >= self.y_min) & (y < self.y_max)
+
+    def definition(self) -> str:
+        closed = ":closed" if self.inclusive_max else ""
+        return f"rect:{self.name}:{self.x_min},{self.x_max},{self.y_min},{self.y_max}{closed}"
+
+
+class PolygonZone(Zone):
+    """Arbitrary simple polygon given as [(x, y), ...] vertices (even-odd rule)."""
+
+    def __init__(self, name: str, vertices):
+        super().__init__(name)
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        if self.vertices.ndim != 2 or self.vertices.shape[1] != 2 or len(self.vertices) < 3:
+            raise ValueError(f"Polygon zone '{name}' needs at least three (x, y) vertices.")
+
+    def contains(self, x, y):
+        inside = np.zeros(np.shape(x), dtype=bool)
+        vx, vy = self.vertices[:, 0], self.vertices[:, 1]
+        j = len(vx) - 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(len(vx)):
+                crosses = ((vy[i] > y) != (vy[j] > y)) & (x < (vx[j] - vx[i]) * (y - vy[i]) / (vy[j] - vy[i]) + vx[i])
+                inside ^= crosses
+                j = i
+        return inside
+
+    def definition(self) -> str:
+        return f"polygon:{self.name}:" + ";".join(f"{px},{py}" for px, py in self.vertices)
+
+
+class ZoneRegistry:
+    """Ordered set of zones; classify() maps coordinates to a uint64 bitmask of the zones they fall in."""
+
+    def __init__(self, zones=(), cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+        self.n_x = int(np.ceil(PITCH_LENGTH / cell_size))
+        self.n_y = int(np.ceil(PITCH_WIDTH / cell_size))
+        self._zones = {}
+        self._table = None
+        self.closed_bits = np.uint64(0) # Zones closed on their max edges (RectZone inclusive_max)
+        for zone in zones:
+            self.register(zone)
+
+    def register(self, zone: Zone) -> int:
+        """Adds a zone and returns its bit index."""
+        if zone.name in self._zones:
+            raise ValueError(f"Zone '{zone.name}' is already registered.")
+        if len(self._zones) >= MAX_ZONES:
+            raise ValueError(f"A registry holds at most {MAX_ZONES} zones.")
+        self._zones[zone.name] = zone
+        self._table = None # Rebuilt lazily on next classify()
+        bit = len(self._zones) - 1
+        if getattr(zone, 'inclusive_max', False):
+            self.closed_bits |= np.uint64(1) << np.uint64(bit)
+        return bit
+
+    @property
+    def names(self):
+        return list(self._zones)
+
+    def __iter__(self):
+        return iter(self._zones.values())
+
+    def __len__(self):
+        return len(self._zones)
+
+    def __contains__(self, name):
+        return name in self._zones
+
+    def bit(self, name: str) -> np.uint64:
+        """Bitmask of a single zone."""
+        return np.uint64(1) << np.uint64(self.names.index(name))
+
+    def signature(self) -> str:
+        """Short hash of the zone definitions and grid, for cache/store keys."""
+        text = f"{self.cell_size}|" + "|".join(zone.definition() for zone in self)
+        return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+    @property
+    def lookup_table(self):
+        """(n_x, n_y) uint64 table: bit k of a cell is set when the cell centre lies in zone k."""
+        if self._table is None:
+            centres_x = (np.arange(self.n_x) + 0.5) * self.cell_size
+            centres_y = (np.arange(self.n_y) + 0.5) * self.cell_size
+            grid_x, grid_y = np.meshgrid(centres_x, centres_y, indexing="ij")
+            table = np.zeros((self.n_x, self.n_y), dtype=np.uint64)
+            for bit, zone in enumerate(self):
+                table[zone.contains(grid_x, grid_y)] |= np.uint64(1) << np.uint64(bit)
+            self._table = table
+        return self._table
+
+    def classify(self, x, y):
+        """O(1) per point: zone bitmask for each coordinate pair (0 for missing coordinates)."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = np.isfinite(x) & np.isfinite(y)
+        # Off-pitch points are clamped to the border cells
+        ix = np.clip(np.floor(np.where(valid, x, 0) / self.cell_size), 0, self.n_x - 1).astype(np.intp)
+        iy = np.clip(np.floor(np.where(valid, y, 0) / self.cell_size), 0, self.n_y - 1).astype(np.intp)
+        table = self.lookup_table
+        masks = table[ix, iy]
+        if self.closed_bits:
+            # A point exactly on a cell's lower edge also lies on the max edge of a closed zone covering the
+            # cell below (cell centres alone would leave it out)
+            on_x = valid & (ix > 0) & (x == ix * self.cell_size)
+            on_y = valid & (iy > 0) & (y == iy * self.cell_size)
+            masks[on_x] |= table[ix[on_x] - 1, iy[on_x]] & self.closed_bits
+            masks[on_y] |= table[ix[on_y], iy[on_y] - 1] & self.closed_bits
+            on_both = on_x & on_y
+            masks[on_both] |= table[ix[on_both] - 1, iy[on_both] - 1] & self.closed_bits
+        masks[~valid] = 0
+        return masks
+
+    def membership(self, masks, name: str):
+        """Boolean array: which bitmasks include the named zone."""
+        return (masks & self.bit(name)) != 0
+
+
+# --- Zone Library ---
+# Closed on every edge, as the app's original pandas between() checks were
+RIGHT_HALFSPACE = RectZone("rhs", 60, 102, 18, 30, inclusive_max=True)
+LEFT_HALFSPACE = RectZone("lhs", 60, 102, 50, 62, inclusive_max=True)
+ZONE_14 = RectZone("zone14", 80, 102, 30, 50, inclusive_max=True)
+RIGHT_CHANNEL = RectZone("right_channel", 0, PITCH_LENGTH, 0, 18, inclusive_max=True)
+LEFT_CHANNEL = RectZone("left_channel", 0, PITCH_LENGTH, 62, PITCH_WIDTH, inclusive_max=True)
+FINAL_THIRD = RectZone("final_third", 80, PITCH_LENGTH, 0, PITCH_WIDTH, inclusive_max=True)
+
+HALFSPACE_ZONES = (RIGHT_HALFSPACE, LEFT_HALFSPACE)
+STANDARD_ZONES = HALFSPACE_ZONES + (ZONE_14, RIGHT_CHANNEL, LEFT_CHANNEL, FINAL_THIRD)
+
+
+def halfspace_registry() -> ZoneRegistry:
+    """The registry the app uses: right and left half-spaces only."""
+    return ZoneRegistry(HALFSPACE_ZONES)
+
+
+def standard_registry(extra_zones=()) -> ZoneRegistry:
+    """Half-spaces plus zone 14, the wide channels, the final third and any custom zones."""
+    return ZoneRegistry(STANDARD_ZONES + tuple(extra_zones))
+
+
+REGISTRIES = {'halfspaces': halfspace_registry, 'standard': standard_registry}
+
+
+def zones_from_json(path: str):
+    """Custom zones from a JSON list of {"name": ..., "rect": [x_min, x_max, y_min, y_max]} (plus an optional
+    "inclusive_max": true) or {"name": ..., "polygon": [[x, y], ...]} objects, in 120x80 pitch coordinates."""
+    with open(path) as f:
+        specs = json.load(f)
+    zones = []
+    for spec in specs:
+        if 'rect' in spec:
+            zones.append(RectZone(spec['name'], *spec['rect'], inclusive_max=spec.get('inclusive_max', False)))
+        elif 'polygon' in spec:
+            zones.append(PolygonZone(spec['name'], spec['polygon']))
+        else:
+            raise ValueError(f"Zone {spec.get('name')!r} in {path} needs a 'rect' or a 'polygon'.")
+    return zones
+
+
+def load_registry(spec: str = None) -> ZoneRegistry:
+    """The registry named by spec: 'halfspaces' (default), 'standard', or a JSON file of custom zones,
+    which are added to the standard ones."""
+    if not spec or spec in REGISTRIES:
+        return REGISTRIES[spec or 'halfspaces']()
+    return standard_registry(zones_from_json(spec))
+
+# --- END OF FILE halfspaces_zones.py ---
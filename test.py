@@ -1,29 +1,38 @@
-import gdown
+import argparse
+import logging
+
 import pandas as pd
 
+from halfspaces_download import DOWNLOAD_DIR, DRIVE_URL, LEAGUE_SOURCES, convert_csv, download, refresh
+from halfspaces_warehouse import WAREHOUSE_PATH
+
+
+def download_csv_and_convert_to_parquet(file_id: str, warehouse: str = WAREHOUSE_PATH, url_template: str = DRIVE_URL):
+    """Replaces the league/season partitions contained in the downloaded CSV (streamed, not loaded whole)."""
+    convert_csv(download(file_id, url_template=url_template), warehouse)
+    return warehouse
+
+
+def download_csv_and_ingest(file_id: str, league: str, season_internal: int, warehouse: str = WAREHOUSE_PATH,
+                            url_template: str = DRIVE_URL):
+    """Weekly refresh: only games missing from the league/season partition are appended and processed."""
+    from halfspaces_ingest import ingest_games
+
+    csv_filename = download(file_id, url_template=url_template)
+    return ingest_games(warehouse, league, season_internal, pd.read_csv(csv_filename))
+
+
+if __name__ == "__main__":
+    # All five leagues download concurrently; rerunning after an interruption resumes the partial files
+    parser = argparse.ArgumentParser(description="Download the league event CSVs into the event warehouse")
+    parser.add_argument("--leagues", nargs="*", choices=list(LEAGUE_SOURCES), help="Default: all leagues")
+    parser.add_argument("--warehouse", default=WAREHOUSE_PATH)
+    parser.add_argument("--download-dir", default=DOWNLOAD_DIR)
+    parser.add_argument("--url-template", default=DRIVE_URL, help="e.g. http://localhost:8000/{file_id}.csv")
+    parser.add_argument("--max-downloads", type=int, default=len(LEAGUE_SOURCES))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
-def download_csv_and_convert_to_parquet(file_id: str, parquet_filename: str):
-    url = f"https://drive.google.com/uc?export=download&id={file_id}"
-    csv_filename = "temp_download.csv"
-    gdown.download(url, csv_filename, quiet=False)
-    df = pd.read_csv(csv_filename)
-    df.to_parquet(parquet_filename, index=False)
-    return parquet_filename
-
-
-# Example usage:
-parquet_path = download_csv_and_convert_to_parquet(
-    "1z_Bb2kf48NqwrRO_ZSZeJLhE9mJ1ps71", "Bundesliga_2425.parquet"
-)
-parquet_path = download_csv_and_convert_to_parquet(
-    "1zeJtDsuTNwd3EKc9fY5FhNBdfl9sV9an", "La_Liga_24_25.parquet"
-)
-parquet_path = download_csv_and_convert_to_parquet(
-    "154GIano_ASZIGf3cOayy7OCIF9NjJx2x", "Ligue_1_2425.parquet"
-)
-parquet_path = download_csv_and_convert_to_parquet(
-    "1mCq0wlrlnohawuuYCZPTulvkQwqdeYt6", "Premier_League_2425.parquet"
-)
-parquet_path = download_csv_and_convert_to_parquet(
-    "1OVkg5E2whpoE_snZT2fxkN_8mMgnSU0i", "Serie_A_2425.parquet"
-)
+    sources = {league: LEAGUE_SOURCES[league] for league in args.leagues or LEAGUE_SOURCES}
+    refreshed = refresh(sources, args.warehouse, args.download_dir, args.url_template, args.max_downloads)
+    raise SystemExit(0 if len(refreshed) == len(sources) else 1)
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The halfspaces_* modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import halfspaces_pipeline
+import halfspaces_synthetic
+
+LEAGUE, SEASON = 'ESP-La Liga', 2425 # What generate_events names its first league and season
+
+
+@pytest.fixture
+def synthetic_events():
+    """Twelve games of a four-team league, small enough to run the whole pipeline in a test."""
+    return halfspaces_synthetic.generate_events(teams=4, games=12, events_per_game=600, players_per_team=16)
+
+
+@pytest.fixture
+def minutes_csv(tmp_path, synthetic_events, monkeypatch):
+    """Minutes CSV of the synthetic players, installed as the pipeline's minutes file."""
+    path = str(tmp_path / "mins.csv")
+    halfspaces_synthetic.generate_minutes(synthetic_events).to_csv(path, index=False)
+    monkeypatch.setattr(halfspaces_pipeline, 'MINS_CSV_PATH', path)
+    return path
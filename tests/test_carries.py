@@ -0,0 +1,87 @@
+"""Array carry detection against the earlier shift(-1) frame comparison."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import halfspaces_carries
+import halfspaces_synthetic
+from halfspaces_carries import CarryThresholds
+
+
+def _shift_carries(events, thresholds):
+    """The earlier rule: compare each row with the shifted next row of the whole frame."""
+    df = events.reset_index(drop=True)
+    time_seconds = df['minute'].astype(np.float64) * 60 + df['second']
+    nxt = df.shift(-1)
+    dist_sq = (df['endX'] - nxt['x']) ** 2 + (df['endY'] - nxt['y']) ** 2
+    dt = time_seconds.shift(-1) - time_seconds
+    carries = ((df['gameId'] == nxt['gameId']) & (df['teamId'] == nxt['teamId']) & (df['period'] == nxt['period'])
+               & (dist_sq >= thresholds.min_distance ** 2) & (dist_sq <= thresholds.max_distance ** 2)
+               & (dt < thresholds.max_seconds))
+    return carries.fillna(False).to_numpy(dtype=bool)
+
+
+def _events():
+    """Two games exercising every condition that ends a carry chain."""
+    rows = [
+        # gameId, period, teamId, minute, second, x, y, endX, endY
+        (1, 1, 10, 0, 0, 50.0, 50.0, 60.0, 50.0),
+        (1, 1, 10, 0, 3, 70.0, 50.0, 75.0, 40.0), # 10 from the last end: carry
+        (1, 1, 10, 0, 5, 75.0, 44.0, 80.0, 30.0), # 4 away: below min_distance
+        (1, 1, 10, 0, 8, 80.0, 60.0, 90.0, 60.0), # Exactly 30 away: max_distance is inclusive
+        (1, 1, 10, 0, 20, 92.0, 60.0, 95.0, 55.0), # 12 s later: too slow
+        (1, 1, 20, 0, 22, 5.0, 45.0, 30.0, 45.0), # Possession change
+        (1, 1, 20, 0, 24, 66.0, 45.0, 70.0, 45.0), # 36 away: beyond max_distance
+        (1, 2, 20, 45, 0, 70.0, 50.0, 75.0, 50.0), # New period
+        (1, 2, 20, 45, 2, 85.0, 50.0, np.nan, np.nan), # Carry; no end location for the next one
+        (1, 2, 20, 45, 4, 60.0, 50.0, 65.0, 50.0),
+        (2, 1, 20, 0, 1, 72.0, 50.0, 80.0, 50.0), # New game, same team and period
+        (2, 1, 20, 0, 5, 90.0, 50.0, 95.0, 50.0), # Carry
+        (2, 1, 20, 0, 9, 95.0, 60.0, 99.0, 60.0), # Carry: exactly 10 away
+    ]
+    df = pd.DataFrame(rows, columns=['gameId', 'period', 'teamId', 'minute', 'second', 'x', 'y', 'endX', 'endY'])
+    return df.assign(
+        expandedMinute=df['minute'], team=df['teamId'].map({10: 'Home', 20: 'Away'}), playerId=np.arange(len(df)) + 100,
+        player=[f"Player {i}" for i in range(len(df))], type='Pass', outcomeType='Successful')
+
+
+THRESHOLDS = CarryThresholds(min_distance=5.0, max_distance=30.0, max_seconds=10.0)
+
+
+def _check_inserted_after_source(events, thresholds):
+    expected = _shift_carries(events, thresholds)
+    with_carries = halfspaces_carries.add_carries(events, thresholds)
+    is_carry = (with_carries['type'] == 'Carry').to_numpy()
+    assert is_carry.sum() == expected.sum()
+
+    # Events keep their order, and each carry sits right after the event whose end location it starts from
+    originals = with_carries[~is_carry]
+    assert originals['playerId'].tolist() == events['playerId'].tolist()
+    source = np.flatnonzero(is_carry) - 1
+    assert not is_carry[source].any()
+    assert with_carries['playerId'].to_numpy()[source].tolist() == events['playerId'].to_numpy()[expected].tolist()
+    carries = with_carries[is_carry]
+    np.testing.assert_array_equal(carries['x'].to_numpy(), events['endX'].to_numpy()[expected])
+    np.testing.assert_array_equal(carries['endX'].to_numpy(), events['x'].to_numpy()[np.flatnonzero(expected) + 1])
+    assert carries['playerId'].tolist() == events['playerId'].to_numpy()[np.flatnonzero(expected) + 1].tolist()
+    return expected
+
+
+def test_detect_carries_matches_shift_rule_at_every_boundary():
+    events = _events()
+    expected = _check_inserted_after_source(events, THRESHOLDS)
+    assert np.flatnonzero(expected).tolist() == [0, 2, 7, 10, 11]
+
+
+@pytest.mark.parametrize('thresholds', [halfspaces_carries.DEFAULT_THRESHOLDS, THRESHOLDS])
+def test_detect_carries_matches_shift_rule_on_synthetic_games(thresholds):
+    events = halfspaces_synthetic.generate_events(teams=4, games=4, events_per_game=400, players_per_team=16)
+    _check_inserted_after_source(events.reset_index(drop=True), thresholds)
+
+
+def test_possession_ids_restart_each_game():
+    events = _events()
+    ids = halfspaces_carries.possession_ids(events['gameId'].to_numpy(), events['teamId'].to_numpy(),
+                                            events['period'].to_numpy())
+    assert ids.tolist() == [0, 0, 0, 0, 0, 1, 1, 2, 2, 2, 0, 0, 0]
@@ -0,0 +1,87 @@
+"""Resuming interrupted downloads with Range requests."""
+
+import http.server
+import os
+import threading
+
+import pytest
+
+import halfspaces_download
+
+BODY = b"".join(f"{i},event {i},{i * 0.5}\n".encode() for i in range(20000))
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serves BODY, cutting the first full response short and answering Range requests with the rest."""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        type(self).requests.append(range_header)
+        if range_header is None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY[:len(BODY) // 3])
+            self.close_connection = True # The client sees the connection drop mid-body
+            return
+        start = int(range_header.removeprefix("bytes=").rstrip("-"))
+        if start >= len(BODY):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(BODY)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(206)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        self.send_header("Content-Length", str(len(BODY) - start))
+        self.end_headers()
+        self.wfile.write(BODY[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (_Handler,), {"requests": []})
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{httpd.server_address[1]}/{{file_id}}.csv"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_interrupted_download_resumes_from_the_range_offset(tmp_path, server):
+    handler, url = server
+    path = halfspaces_download.download("league", str(tmp_path), url)
+    assert _read(path) == BODY
+    assert not os.path.exists(f"{path}.part")
+    assert handler.requests == [None, f"bytes={len(BODY) // 3}-"]
+
+
+def test_complete_part_file_is_finished_on_416(tmp_path, server):
+    handler, url = server
+    with open(tmp_path / "league.csv.part", "wb") as f:
+        f.write(BODY)
+    path = halfspaces_download.download("league", str(tmp_path), url)
+    assert _read(path) == BODY
+    assert handler.requests == [f"bytes={len(BODY)}-"]
+
+
+def test_existing_download_is_not_fetched_again(tmp_path, server):
+    handler, url = server
+    (tmp_path / "league.csv").write_bytes(BODY)
+    path = halfspaces_download.download("league", str(tmp_path), url)
+    assert _read(path) == BODY
+    assert handler.requests == []
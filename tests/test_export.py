@@ -0,0 +1,89 @@
+"""Exported files read back in every format."""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+import halfspaces_export
+import halfspaces_pipeline
+import halfspaces_store
+import halfspaces_synthetic
+import halfspaces_warehouse
+from conftest import LEAGUE, SEASON
+from halfspaces_export import EXPORT_FORMATS
+from halfspaces_pipeline import MINS_CSV_PATH
+
+
+def _read(path, fmt):
+    if fmt == 'parquet':
+        return pq.read_table(path)
+    if fmt == 'arrow':
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all()
+    return pa_csv.read_csv(path)
+
+
+@pytest.fixture
+def warehouse(tmp_path, synthetic_events, monkeypatch):
+    monkeypatch.chdir(tmp_path) # The minutes CSV is read from its default relative path
+    halfspaces_synthetic.generate_minutes(synthetic_events).to_csv(MINS_CSV_PATH, index=False)
+    halfspaces_warehouse.write_events(synthetic_events, "warehouse")
+    return "warehouse"
+
+
+def _stored_tables(store_dir):
+    zones = halfspaces_pipeline.ZONES.signature()
+    return [halfspaces_store.load_frame(LEAGUE, SEASON, name, store_dir, zones) for name in halfspaces_store.FRAME_NAMES]
+
+
+@pytest.mark.parametrize('fmt', EXPORT_FORMATS)
+def test_export_reads_back_the_filtered_players_and_their_actions(warehouse, fmt):
+    players_path, actions_path = halfspaces_export.export_seasons(
+        "out", [LEAGUE], [SEASON], min_90s=1.0, fmt=fmt, data_path=warehouse, store_dir="store")
+    combined_prog_df, *action_frames = _stored_tables("store")
+    expected = combined_prog_df[combined_prog_df['90s'] >= 1.0]
+
+    players = _read(players_path, fmt).to_pandas()
+    assert len(players) == len(expected) > 0
+    assert players[['league', 'season']].drop_duplicates().values.tolist() == [[LEAGUE, SEASON]]
+    assert sorted(players['playerId'].tolist()) == sorted(expected['playerId'].tolist())
+    assert players['prog_HS_actions'].sum() == expected['prog_HS_actions'].sum()
+
+    actions = _read(actions_path, fmt).to_pandas()
+    keys = set(zip(expected['playerId'], expected['team'].astype(str)))
+    for name, frame in zip(halfspaces_export.ACTION_FRAMES, action_frames):
+        exported = actions[actions['frame'] == name]
+        wanted = frame[[key in keys for key in zip(frame['playerId'], frame['team'].astype(str))]]
+        assert len(exported) == len(wanted)
+        assert exported['x'].sum() == pytest.approx(wanted['x'].astype(float).sum())
+
+
+@pytest.mark.parametrize('fmt', EXPORT_FORMATS)
+def test_export_with_no_matching_players_writes_empty_readable_files(warehouse, fmt):
+    paths = halfspaces_export.export_seasons("out", [LEAGUE], [SEASON], teams=["No Such Club"], fmt=fmt,
+                                             data_path=warehouse, store_dir="store")
+    players, actions = (_read(path, fmt) for path in paths)
+    assert players.num_rows == actions.num_rows == 0
+    # The header survives, so the empty files still describe their columns
+    assert {'league', 'season', 'playerId', 'prog_HS_actions'} <= set(players.column_names)
+    assert {'league', 'season', 'frame', 'playerId', 'x'} <= set(actions.column_names)
+
+
+def test_float_player_ids_match_their_string_keys(warehouse):
+    halfspaces_export.export_seasons("out", [LEAGUE], [SEASON], data_path=warehouse, store_dir="store")
+    combined_prog_df, *action_frames = _stored_tables("store")
+    zones = halfspaces_pipeline.ZONES.signature()
+    # An entry written from events whose ids were read as floats (a column with gaps)
+    as_float = [frame.astype({'playerId': 'float64'}) for frame in (combined_prog_df, *action_frames)]
+    halfspaces_store.write_entry(LEAGUE, SEASON, "float-ids", as_float, [], "float_store", zones=zones)
+
+    players = combined_prog_df.head(5)
+    float_actions, actions = (
+        pq.read_table(pa.BufferReader(halfspaces_export.to_bytes(
+            halfspaces_export.stored_action_batches(LEAGUE, SEASON, entry_players, store_dir, zones=zones)))).to_pandas()
+        for entry_players, store_dir in ((as_float[0].head(5), "float_store"), (players, "store")))
+    assert len(float_actions) == len(actions) > 0
+    assert set(float_actions['playerId'].astype('int64')) <= set(players['playerId'])
+    pd.testing.assert_series_equal(float_actions['x'], actions['x'])
@@ -0,0 +1,56 @@
+"""Per-(playerId, team) slicing of the action indexes: a transferred player's clubs stay apart."""
+
+import pandas as pd
+import pyarrow as pa
+
+import halfspaces_plot
+import halfspaces_serve
+from halfspaces_index import PlayerIndex
+
+MOVED_ID, OTHER_ID = 7, 3
+
+
+def _actions():
+    # Player 7 moved from Wolves to Reims mid-season; player 3 stayed at Wolves
+    return pd.DataFrame({
+        'playerId': [MOVED_ID, OTHER_ID, MOVED_ID, MOVED_ID, MOVED_ID],
+        'team': pd.Categorical(['Wolves', 'Wolves', 'Reims', 'Wolves', 'Reims']),
+        'x': [70.0, 71.0, 80.0, 72.0, 81.0],
+        'y': [20.0, 21.0, 55.0, 22.0, 56.0],
+        'endX': [90.0, 91.0, 100.0, 92.0, 101.0],
+        'endY': [25.0, 26.0, 57.0, 27.0, 58.0],
+    })
+
+
+def test_get_without_team_returns_every_club():
+    index = PlayerIndex(_actions())
+    assert len(index.get(MOVED_ID)) == 4
+    assert index.get(99).empty
+
+
+def test_get_with_team_keeps_that_club_only():
+    index = PlayerIndex(_actions())
+    wolves = index.get(MOVED_ID, 'Wolves')
+    reims = index.get(MOVED_ID, 'Reims')
+    assert wolves['x'].tolist() == [70.0, 72.0]
+    assert reims['x'].tolist() == [80.0, 81.0]
+    assert index.get(MOVED_ID, 'Napoli').empty
+    assert index.get(OTHER_ID, 'Wolves')['x'].tolist() == [71.0]
+
+
+def test_plot_args_use_the_rows_club():
+    indexes = [PlayerIndex(_actions()) for _ in range(4)]
+    player_data = pd.Series({'player': 'Moved', 'team': 'Reims', 'prog_act_HS_p90': 1.0})
+    title, pass_frames, carry_frames = halfspaces_plot.player_plot_args(player_data, MOVED_ID, *indexes,
+                                                                        "All Half-Space Actions")
+    assert all(frame['x'].tolist() == [80.0, 81.0] for frame in pass_frames + carry_frames)
+
+
+def test_served_actions_filter_by_team():
+    frame = PlayerIndex(_actions()).frame
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    tables = halfspaces_serve.LeagueTables("fp", {'combined_prog_df': table,
+                                                  **{name: table for name in halfspaces_serve.ACTION_FRAMES}})
+    assert tables.player_actions('prog_rhs_passes', MOVED_ID).num_rows == 4
+    wolves = tables.player_actions('prog_rhs_passes', MOVED_ID, 'Wolves')
+    assert wolves['x'].to_pylist() == [70.0, 72.0]
@@ -0,0 +1,56 @@
+"""Incremental ingestion against a full rebuild of the same games."""
+
+import pandas as pd
+
+import halfspaces_ingest
+import halfspaces_pipeline
+import halfspaces_store
+import halfspaces_synthetic
+import halfspaces_warehouse
+from conftest import LEAGUE, SEASON
+from halfspaces_pipeline import MINS_CSV_PATH
+
+
+def _stored(warehouse, store_dir):
+    fingerprint = halfspaces_pipeline.tables_fingerprint(LEAGUE, SEASON, warehouse)
+    zones = halfspaces_pipeline.ZONES.signature()
+    meta, frames = halfspaces_store.load_entry(LEAGUE, SEASON, fingerprint, store_dir, zones)
+    return meta, frames, halfspaces_store.load_counts(LEAGUE, SEASON, store_dir, zones)
+
+
+def _assert_same_rows(df, other, keys):
+    # Categories are listed in the order games were seen, so compare values rather than dtypes
+    pd.testing.assert_frame_equal(df.sort_values(keys, kind='stable').reset_index(drop=True),
+                                  other.sort_values(keys, kind='stable').reset_index(drop=True),
+                                  check_like=True, check_dtype=False, check_categorical=False)
+
+
+def test_ingesting_new_games_matches_a_full_rebuild(tmp_path, synthetic_events, monkeypatch):
+    monkeypatch.chdir(tmp_path) # The minutes CSV is read from its default relative path
+    halfspaces_synthetic.generate_minutes(synthetic_events).to_csv(MINS_CSV_PATH, index=False)
+    game_ids = synthetic_events['gameId'].unique()
+    first_games = synthetic_events[synthetic_events['gameId'].isin(game_ids[:6])]
+
+    # Incremental: build the first half of the season, then ingest the whole season on top
+    halfspaces_warehouse.write_events(first_games, "incremental")
+    halfspaces_pipeline.load_halfspace_tables("incremental", LEAGUE, SEASON,
+                                              halfspaces_pipeline.tables_fingerprint(LEAGUE, SEASON, "incremental"),
+                                              "incremental_store")
+    assert halfspaces_ingest.ingest_games("incremental", LEAGUE, SEASON, synthetic_events,
+                                          store_dir="incremental_store") == len(game_ids) - 6
+
+    # Full: every game written and built at once
+    halfspaces_warehouse.write_events(synthetic_events, "full")
+    halfspaces_pipeline.load_halfspace_tables("full", LEAGUE, SEASON,
+                                              halfspaces_pipeline.tables_fingerprint(LEAGUE, SEASON, "full"),
+                                              "full_store")
+
+    meta, (combined, *frames), counts = _stored("incremental", "incremental_store")
+    full_meta, (full_combined, *full_frames), full_counts = _stored("full", "full_store")
+    assert not combined.empty and all(len(frame) for frame in frames)
+    assert sorted(meta['game_ids']) == sorted(full_meta['game_ids'])
+    assert meta['teams'] == full_meta['teams']
+    _assert_same_rows(counts, full_counts, ['playerId', 'team'])
+    _assert_same_rows(combined, full_combined, ['playerId', 'team'])
+    for frame, full_frame in zip(frames, full_frames):
+        _assert_same_rows(frame, full_frame, ['gameId', 'period', 'expandedMinute', 'playerId', 'x', 'y', 'endX', 'endY'])
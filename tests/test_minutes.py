@@ -0,0 +1,63 @@
+"""Resolution of minutes rows to event players (MinutesIndex)."""
+
+import numpy as np
+import pandas as pd
+
+from halfspaces_minutes import MinutesIndex
+
+
+def _events(rows):
+    return pd.DataFrame(rows, columns=['playerId', 'player', 'team'])
+
+
+def _minutes(rows):
+    return pd.DataFrame(rows, columns=['player', 'team', '90s', 'position'])
+
+
+def _nineties(index, player_id, team):
+    nineties, _ = index.lookup([player_id], [team])
+    return nineties[0]
+
+
+def test_exact_club_row_beats_earlier_name_only_row():
+    # Danilo is listed at Juventus before Nottingham Forest; only the Forest row belongs to these events
+    events = _events([(1, 'Danilo', 'Nottingham Forest'), (2, 'Chris Wood', 'Nottingham Forest')])
+    minutes = _minutes([('Danilo', 'Juventus', 20.0, 'DF'), ('Danilo', 'Nottingham Forest', 3.1, 'DF'),
+                        ('Chris Wood', 'Nottingham Forest', 30.0, 'FW')])
+    index = MinutesIndex(minutes, events)
+    assert _nineties(index, 1, 'Nottingham Forest') == 3.1
+    assert index.conflicts[['player', 'team']].values.tolist() == [['Danilo', 'Juventus']]
+
+
+def test_normalized_club_row_beats_name_only_row():
+    # Accents differ from the events, so the club row matches on normalized names (pass two) only
+    events = _events([(5, 'Scott McTominay', 'Napoli')])
+    minutes = _minutes([('Scott McTominay', 'Man Utd', 0.19, 'MF'), ('Scott McTominày', 'NAPOLI', 32.7, 'MF')])
+    index = MinutesIndex(minutes, events)
+    assert _nineties(index, 5, 'Napoli') == 32.7
+
+
+def test_name_only_pass_skips_rows_of_another_event_club():
+    # Munetsi's Wolves row must not be given to the Reims player when Wolves is also in the events
+    events = _events([(9, 'Marshall Munetsi', 'Reims'), (10, 'Matheus Cunha', 'Wolves')])
+    minutes = _minutes([('Marshall Munetsi', 'Wolves', 12.0, 'MF'), ('Matheus Cunha', 'Wolves', 25.0, 'FW')])
+    index = MinutesIndex(minutes, events)
+    assert np.isnan(_nineties(index, 9, 'Reims'))
+    assert index.unmatched[['player', 'team']].values.tolist() == [['Marshall Munetsi', 'Wolves']]
+
+
+def test_name_only_match_still_resolves_differently_spelled_club():
+    events = _events([(4, 'Bruno Fernandes', 'Manchester United')])
+    minutes = _minutes([('Bruno Fernandes', 'Man Utd', 33.0, 'MF')])
+    index = MinutesIndex(minutes, events)
+    assert _nineties(index, 4, 'Manchester United') == 33.0
+    assert index.conflicts.empty
+
+
+def test_player_at_two_clubs_in_the_events_gets_each_clubs_minutes():
+    events = _events([(7, 'Marshall Munetsi', 'Wolves'), (7, 'Marshall Munetsi', 'Reims')])
+    minutes = _minutes([('Marshall Munetsi', 'Wolves', 12.0, 'MF'), ('Marshall Munetsi', 'Reims', 18.8, 'MF')])
+    index = MinutesIndex(minutes, events)
+    nineties, positions = index.lookup([7, 7], ['Wolves', 'Reims'])
+    assert nineties.tolist() == [12.0, 18.8]
+    assert positions.tolist() == ['MF', 'MF']
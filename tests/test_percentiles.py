@@ -0,0 +1,27 @@
+"""Reference pools of the league and cross-league percentiles."""
+
+import pandas as pd
+
+import halfspaces_percentiles
+from halfspaces_percentiles import PCT_SUFFIX
+
+
+def _table():
+    return pd.DataFrame({
+        'position': ['M(C)'] * 4,
+        '90s': [10.0, 10.0, 10.0, 2.0],
+        'prog_HS_actions': [10, 20, 0, 50],
+        'prog_act_HS_p90': [1.0, 2.0, 0.0, 25.0],
+    })
+
+
+def test_pool_is_players_with_enough_90s_and_half_space_actions():
+    table = halfspaces_percentiles.add_position_percentiles(_table())
+    # Pool: the first two players; the zero-action row and the 2-90s cameo are looked up but not pooled
+    assert table['prog_act_HS_p90' + PCT_SUFFIX].tolist() == [25.0, 75.0, 0.0, 100.0]
+    assert table['prog_act_HS_p90_rank'].tolist()[:2] == [2.0, 1.0]
+
+
+def test_cross_league_pool_matches_league_pool():
+    dist = halfspaces_percentiles.distribution([_table()])
+    assert dist['value'].tolist() == [1.0, 2.0]
@@ -0,0 +1,69 @@
+"""Stored tables rebuilt after the events change, kept per zone registry, and pipeline reporting."""
+
+import threading
+
+import numpy as np
+
+import halfspaces_pipeline
+import halfspaces_schema
+import halfspaces_store
+import halfspaces_warehouse
+import halfspaces_zones
+from conftest import LEAGUE, SEASON
+
+
+def _build(warehouse, store_dir, minutes_csv):
+    fingerprint = halfspaces_pipeline.tables_fingerprint(LEAGUE, SEASON, warehouse, minutes_csv)
+    _, frames = halfspaces_pipeline.load_halfspace_tables(warehouse, LEAGUE, SEASON, fingerprint, store_dir)
+    return fingerprint, frames
+
+
+def test_rebuild_after_partition_rewrite_reads_the_new_events(tmp_path, synthetic_events, minutes_csv):
+    warehouse, store_dir = str(tmp_path / "warehouse"), str(tmp_path / "store")
+    first_games = synthetic_events[synthetic_events['gameId'].isin(synthetic_events['gameId'].unique()[:3])]
+    halfspaces_warehouse.write_events(first_games, warehouse)
+    old_fingerprint, _ = _build(warehouse, store_dir, minutes_csv)
+
+    halfspaces_warehouse.write_events(synthetic_events, warehouse) # Replaces the partition
+    fingerprint, (combined_prog_df, *indexes) = _build(warehouse, store_dir, minutes_csv)
+    assert fingerprint != old_fingerprint
+
+    expected, *expected_frames = halfspaces_pipeline.compute_halfspace_tables(
+        halfspaces_schema.compact_events(synthetic_events.reset_index(drop=True)),
+        halfspaces_pipeline.read_minutes_data(minutes_csv))
+    assert combined_prog_df['prog_HS_actions'].sum() == expected['prog_HS_actions'].sum()
+    assert [len(index) for index in indexes] == [len(frame) for frame in expected_frames]
+    meta = halfspaces_store.read_meta(LEAGUE, SEASON, store_dir, halfspaces_pipeline.ZONES.signature())
+    assert sorted(meta['game_ids']) == sorted(np.unique(synthetic_events['gameId']).tolist())
+
+
+def test_each_zone_registry_keeps_its_own_entry(tmp_path, synthetic_events, minutes_csv):
+    warehouse, store_dir = str(tmp_path / "warehouse"), str(tmp_path / "store")
+    halfspaces_warehouse.write_events(synthetic_events, warehouse)
+    registries = (halfspaces_zones.halfspace_registry(), halfspaces_zones.standard_registry())
+    for registry in registries:
+        fingerprint = halfspaces_pipeline.tables_fingerprint(LEAGUE, SEASON, warehouse, minutes_csv, registry=registry)
+        halfspaces_pipeline.load_halfspace_tables(warehouse, LEAGUE, SEASON, fingerprint, store_dir, registry=registry)
+
+    # Building the standard tables left the half-space entry in place
+    for registry in registries:
+        fingerprint = halfspaces_pipeline.tables_fingerprint(LEAGUE, SEASON, warehouse, minutes_csv, registry=registry)
+        entry = halfspaces_store.load_entry(LEAGUE, SEASON, fingerprint, store_dir, registry.signature())
+        assert entry is not None
+        _, (combined_prog_df, *_) = entry
+        assert ('prog_zone14_actions' in combined_prog_df.columns) == ('zone14' in registry)
+
+
+def test_reporter_only_receives_its_own_threads_messages(caplog):
+    received = []
+    halfspaces_pipeline.set_reporter(lambda level, message: received.append((level, message)))
+    try:
+        # Like the warm-up thread, which has no Streamlit script context for st.* calls
+        worker = threading.Thread(target=halfspaces_pipeline._report, args=('warning', "from the warm-up"))
+        worker.start()
+        worker.join()
+        halfspaces_pipeline._report('error', "from the script")
+    finally:
+        halfspaces_pipeline.set_reporter(None)
+    assert received == [('error', "from the script")]
+    assert "from the warm-up" in caplog.text
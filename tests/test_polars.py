@@ -0,0 +1,27 @@
+"""The Polars engine against the pandas engine on the same partition."""
+
+import numpy as np
+import pytest
+
+import halfspaces_polars
+import halfspaces_warehouse
+import halfspaces_zones
+from conftest import LEAGUE, SEASON
+
+
+@pytest.mark.parametrize('registry', [halfspaces_zones.halfspace_registry(), halfspaces_zones.standard_registry()],
+                         ids=['halfspaces', 'standard'])
+def test_engines_agree_with_missing_and_edge_coordinates(tmp_path, synthetic_events, registry):
+    events = synthetic_events.reset_index(drop=True)
+    rows = np.arange(len(events))
+    # Missing start or end locations, and actions starting exactly on the half-space edges (x=102, y=30/62 scaled)
+    events.loc[rows % 37 == 0, 'x'] = np.nan
+    events.loc[rows % 41 == 0, 'endY'] = np.nan
+    events.loc[rows % 43 == 0, ['x', 'y']] = [85.0, 37.5]
+    events.loc[rows % 47 == 0, ['x', 'y']] = [85.0, 77.5]
+    warehouse = str(tmp_path / "warehouse")
+    halfspaces_warehouse.write_events(events, warehouse)
+
+    assert halfspaces_polars.compare_engines(warehouse, LEAGUE, SEASON, registry) == []
+    _, _, counts, *_ = halfspaces_polars.compute_halfspace_counts(warehouse, LEAGUE, SEASON, registry)
+    assert counts['prog_HS_actions'].sum() > 0
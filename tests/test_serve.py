@@ -0,0 +1,44 @@
+"""The query service's worker pool under idle keep-alive connections."""
+
+import http.client
+import threading
+import time
+
+import halfspaces_serve
+
+
+class _Source:
+    def league_seasons(self):
+        return {'ENG-Premier League': [2425]}
+
+
+def _start(workers: int, keep_alive: float):
+    service = halfspaces_serve.QueryService(_Source())
+    server = halfspaces_serve.PooledHTTPServer(('127.0.0.1', 0), halfspaces_serve.make_handler(service, keep_alive),
+                                               workers=workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _get(port: int, timeout: float = 10.0):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    connection.request('GET', '/leagues')
+    response = connection.getresponse()
+    response.read()
+    return connection, response.status
+
+
+def test_idle_keep_alive_connections_release_their_workers():
+    server = _start(workers=2, keep_alive=0.5)
+    try:
+        port = server.server_port
+        idle = [_get(port)[0] for _ in range(2)] # Both workers now hold an open, idle connection
+        started = time.monotonic()
+        connection, status = _get(port)
+        assert status == 200
+        assert time.monotonic() - started < 5.0
+        for conn in idle + [connection]:
+            conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,18 @@
+"""Synthetic events used by the benchmarks."""
+
+import numpy as np
+
+import halfspaces_bench
+import halfspaces_synthetic
+
+
+def test_team_size_is_one_clubs_fixtures():
+    events = halfspaces_synthetic.generate_events(events_per_game=200, **halfspaces_bench.SIZES['team'])
+    games = events.groupby('gameId')['team'].unique()
+    assert len(games) == 38
+    in_every_game = set.intersection(*(set(teams) for teams in games))
+    assert len(in_every_game) == 1
+    club = in_every_game.pop()
+    opponents = np.concatenate([[team for team in teams if team != club] for teams in games])
+    assert len(set(opponents)) == 19
+    assert (np.unique(opponents, return_counts=True)[1] == 2).all()
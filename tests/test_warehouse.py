@@ -0,0 +1,43 @@
+"""Migrating legacy files into the warehouse and appending games with a different schema."""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import halfspaces_ingest
+import halfspaces_warehouse
+from conftest import LEAGUE, SEASON
+
+
+def test_appended_games_are_cast_to_the_migrated_partition(tmp_path, synthetic_events):
+    events = synthetic_events.reset_index(drop=True)
+    game_ids = events['gameId'].unique()
+    legacy = events[events['gameId'].isin(game_ids[:6])].copy()
+    # As read from an old per-league file: ids with gaps come back as floats, plus a column the new feed lacks
+    legacy['playerId'] = legacy['playerId'].astype('float64')
+    legacy.loc[legacy.index[::50], 'playerId'] = np.nan
+    legacy['qualifiers'] = 'legacy'
+    legacy_file = str(tmp_path / "La_Liga_24_25.parquet")
+    legacy.to_parquet(legacy_file, index=False)
+
+    warehouse = str(tmp_path / "warehouse")
+    assert halfspaces_warehouse.migrate_files([legacy_file, str(tmp_path / "missing.parquet")], warehouse) == [legacy_file]
+
+    # New games without the legacy column, with an unknown one, and with wider coordinates
+    new = events[events['gameId'].isin(game_ids[6:])].copy()
+    new['x'] = new['x'].astype('float64')
+    new['feed_version'] = 2
+    halfspaces_warehouse.write_events(new, warehouse, replace=False)
+
+    dataset = halfspaces_warehouse.open_dataset(warehouse)
+    table = dataset.to_table(filter=(ds.field('league') == LEAGUE) & (ds.field('season') == SEASON))
+    assert table.num_rows == len(events)
+    assert table.schema.field('playerId').type == pa.int64()
+    assert table.schema.field('x').type == dataset.schema.field('x').type
+    assert 'feed_version' not in table.column_names
+    qualifiers = table.column('qualifiers').to_pandas()
+    game = table.column('gameId').to_numpy()
+    assert (qualifiers[np.isin(game, game_ids[:6])] == 'legacy').all()
+    assert qualifiers[np.isin(game, game_ids[6:])].isna().all()
+    assert table.column('playerId').null_count == len(legacy.index[::50])
+    assert halfspaces_ingest.stored_game_ids(warehouse, LEAGUE, SEASON) == set(game_ids.tolist())
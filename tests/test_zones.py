@@ -0,0 +1,63 @@
+"""Grid-lookup zone classification against the app's original between() checks."""
+
+import numpy as np
+import polars as pl
+
+import halfspaces_pipeline
+import halfspaces_polars
+import halfspaces_zones
+from halfspaces_zones import STANDARD_ZONES
+
+# Raw Opta coordinates on (and either side of) every built-in zone edge: 50/85/100 -> 60/102/120 across,
+# 22.5/37.5/62.5/77.5 -> 18/30/50/62 wide
+RAW_X = [0, 49.9, 50, 50.1, 66.6, 66.7, 84.9, 85, 85.1, 100]
+RAW_Y = [0, 22.4, 22.5, 22.6, 37.4, 37.5, 37.6, 62.5, 77.4, 77.5, 77.6, 100]
+
+
+def _points():
+    raw_x, raw_y = (a.ravel() for a in np.meshgrid(RAW_X, RAW_Y))
+    return raw_x, raw_y
+
+
+def _baseline(zone, x, y):
+    return (x >= zone.x_min) & (x <= zone.x_max) & (y >= zone.y_min) & (y <= zone.y_max)
+
+
+def test_built_in_zones_are_closed_on_every_edge():
+    registry = halfspaces_zones.standard_registry()
+    raw_x, raw_y = _points()
+    x, y = raw_x * 1.2, raw_y * .8
+    masks = registry.classify(x, y)
+    for zone in STANDARD_ZONES:
+        expected = _baseline(zone, x, y)
+        assert np.array_equal(registry.membership(masks, zone.name), expected), zone.name
+        assert np.array_equal(zone.contains(x, y), expected), zone.name
+
+    # The edges the half-open rectangles used to drop
+    on_edge = registry.classify([102.0, 70.0, 70.0], [25.0, 30.0, 62.0])
+    assert registry.membership(on_edge, 'rhs').tolist() == [True, True, False]
+    assert registry.membership(on_edge, 'lhs').tolist() == [False, False, True]
+
+
+def test_custom_rect_zones_stay_half_open():
+    registry = halfspaces_zones.ZoneRegistry([halfspaces_zones.RectZone('box', 96, 102, 18, 62)])
+    masks = registry.classify([96.0, 101.5, 102.0, 100.0], [18.0, 61.5, 40.0, 62.0])
+    assert registry.membership(masks, 'box').tolist() == [True, True, False, False]
+
+
+def test_engines_classify_boundary_points_alike():
+    registry = halfspaces_zones.standard_registry()
+    raw_x, raw_y = _points()
+    n = len(raw_x)
+    kind, start_zones, end_zones, _ = halfspaces_pipeline.classify_actions(
+        raw_x, raw_y, raw_y, raw_x, np.array(['Pass'] * n), np.array(['Successful'] * n), registry)
+
+    actions = pl.DataFrame({'x': raw_x, 'y': raw_y, 'endX': raw_y, 'endY': raw_x,
+                            'type': ['Pass'] * n, 'outcomeType': ['Successful'] * n})
+    masks = (actions.with_row_index('row')
+             .pipe(halfspaces_polars.classify, registry)
+             .select('row', 'start_zones', 'end_zones'))
+    touching = (start_zones | end_zones) != 0
+    assert masks['row'].to_list() == np.flatnonzero(touching).tolist()
+    assert masks['start_zones'].to_numpy().tolist() == start_zones[touching].tolist()
+    assert masks['end_zones'].to_numpy().tolist() == end_zones[touching].tolist()